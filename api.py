@@ -1,12 +1,24 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, g
 from flask_cors import CORS
 from support_ai.pipeline import SupportPipeline
 from support_ai.data_loader import TicketDataLoader
-from support_ai.email_service import EmailService
+from support_ai.alerts import alert_ticket
+from support_ai.drafts import stored_draft
+from support_ai.digest import get_digest_log
+from support_ai.similarity import get_index, get_pairwise
+from support_ai.llm.client import get_client
+from support_ai.semantic_cache import get_semantic_cache
+from support_ai.sessions import get_session_store
+from support_ai.events import get_event_bus
+from support_ai.metrics import REGISTRY, flatten_stats, span
+from support_ai.profiling import install_flask_profiling
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import json
 import os
 import logging
+import time
+import uuid
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -14,11 +26,18 @@ load_dotenv()
 
 app = Flask(__name__)
 CORS(app)
+# Per-request profiling on demand ("X-Profile: cprofile|sample"), only with SUPPORT_AI_PROFILE_HEADER=1
+# and the shared SUPPORT_AI_PROFILE_TOKEN in "X-Profile-Token"
+install_flask_profiling(app)
 logging.basicConfig(level=logging.INFO)
 
-RESULTS_DIR = "ticket_results"
+RESULTS_DIR = os.environ.get("TICKET_RESULTS_DIR", "ticket_results")
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
+# Model turns for the event-stream transport run here, off the request threads
+CHAT_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.environ.get("CHAT_WORKERS", 8)), thread_name_prefix="chat")
+SSE_HEARTBEAT = float(os.environ.get("SSE_HEARTBEAT", 15))
+
 # Global variable to hold the pipeline and a startup error message
 pipeline = None
 startup_error = None
@@ -28,12 +47,66 @@ try:
     historical_data = data_loader.get_training_data()
     if not historical_data.get('issues'):
         raise FileNotFoundError("Historical data is empty. Check the CSV file and path.")
+    # Build the shared, read-only similarity indexes before serving any requests
+    get_index(historical_data)
+    get_pairwise(historical_data)
     pipeline = SupportPipeline()
     logging.info("Pipeline and historical data loaded successfully.")
 except Exception as e:
     logging.error(f"FATAL: Could not initialize backend pipeline. Error: {e}")
     startup_error = str(e)
 
+HTTP_REQUESTS = REGISTRY.counter("support_ai_http_requests_total", "HTTP requests by endpoint and status")
+HTTP_SECONDS = REGISTRY.histogram("support_ai_http_request_duration_seconds", "HTTP request latency by endpoint")
+HTTP_IN_FLIGHT = REGISTRY.gauge("support_ai_http_requests_in_flight", "HTTP requests currently being served")
+
+def _component_stats():
+    stats = flatten_stats("support_ai_model", get_client().stats())
+    cache = get_semantic_cache()
+    if cache is not None:
+        flatten_stats("support_ai_semantic_cache", cache.stats(), stats)
+    if pipeline and pipeline.speculative is not None:
+        flatten_stats("support_ai_speculative", pipeline.speculative.stats(), stats)
+    if pipeline and pipeline.upgrader is not None:
+        flatten_stats("support_ai_upgrades", pipeline.upgrader.stats(), stats)
+    if pipeline and pipeline.drafts is not None:
+        flatten_stats("support_ai_drafts", pipeline.drafts.stats(), stats)
+    if get_digest_log() is not None:
+        flatten_stats("support_ai_digest_events", get_digest_log().stats(), stats)
+    flatten_stats("support_ai_sessions", get_session_store().stats(), stats)
+    flatten_stats("support_ai_events", get_event_bus().stats(), stats)
+    return stats
+
+REGISTRY.register_collector(_component_stats)
+
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+    g.in_flight_endpoint = request.endpoint or "unknown"
+    HTTP_IN_FLIGHT.inc(endpoint=g.in_flight_endpoint)
+
+@app.after_request
+def _record_request(response):
+    endpoint = request.endpoint or "unknown"
+    if 'request_start' in g:
+        HTTP_SECONDS.observe(time.perf_counter() - g.request_start, endpoint=endpoint)
+    HTTP_REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    return response
+
+@app.teardown_request
+def _end_in_flight(exc):
+    # Runs for every request, including those that raised and never reached after_request
+    endpoint = g.pop('in_flight_endpoint', None)
+    if endpoint is not None:
+        HTTP_IN_FLIGHT.dec(endpoint=endpoint)
+
+def _conversation_text(conversation_list):
+    return "\n".join([f"{msg['role'].title()}: {msg['content']}" for msg in conversation_list])
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.expose(), mimetype="text/plain; version=0.0.4")
+
 
 @app.route('/chat', methods=['POST'])
 def chat():
@@ -45,15 +118,102 @@ def chat():
             error_message += "An unknown error occurred during initialization."
         return jsonify({"error": error_message}), 500
 
-    conversation_list = request.get_json().get('conversation_history', [])
-    conversation_text = "\n".join([f"{msg['role'].title()}: {msg['content']}" for msg in conversation_list])
+    data = request.get_json()
+    if 'message' in data:
+        return _chat_in_session(data)
+
+    conversation_list = data.get('conversation_history', [])
+    # Clients that send a stable conversation_id (and the same one on submit) opt in to speculative analysis
+    conversation_id = data.get('conversation_id')
+    conversation_text = _conversation_text(conversation_list)
     try:
         agent_reply = pipeline.analyzer.generate_solution(conversation_text)
+        # Analyze the conversation as the client will submit it (with this reply)
+        # while the customer reads and types, so submission only refreshes what changed
+        reply_turn = [{"role": "agent", "content": agent_reply}]
+        pipeline.speculate(conversation_id, _conversation_text(conversation_list + reply_turn), historical_data)
         return jsonify({"agent_reply": agent_reply})
     except Exception as e:
         logging.error(f"Error in /chat endpoint: {e}")
         return jsonify({"error": f"Failed to generate response: {e}"}), 500
 
+SESSION_MISSING = "Chat session expired or not found. Please start a new chat."
+
+def _chat_in_session(data):
+    """Session mode: the server keeps the history and the client sends only the new message"""
+    sessions = get_session_store()
+    user_turn = {"role": "user", "content": data['message']}
+    if data.get('session_id'):
+        session = sessions.append(data['session_id'], **user_turn)
+        if session is None:
+            return jsonify({"error": SESSION_MISSING}), 404
+    else:
+        # Seed turns are whatever the client already shows, e.g. its greeting
+        session = sessions.create(data.get('conversation_history', []) + [user_turn])
+    try:
+        with session.lock:
+            agent_reply = pipeline.analyzer.generate_solution(session.text)
+            session = sessions.append(session.session_id, "agent", agent_reply)
+        if session is None:
+            return jsonify({"error": SESSION_MISSING}), 404
+        pipeline.speculate(session.session_id, session.text, historical_data)
+        return jsonify({"agent_reply": agent_reply, "session_id": session.session_id})
+    except Exception as e:
+        logging.error(f"Error in /chat endpoint: {e}")
+        return jsonify({"error": f"Failed to generate response: {e}"}), 500
+
+@app.route('/sessions', methods=['POST'])
+def create_session():
+    """Start a chat session for the event-stream transport"""
+    data = request.get_json(silent=True) or {}
+    session = get_session_store().create(data.get('conversation_history', []))
+    return jsonify({"session_id": session.session_id}), 201
+
+@app.route('/events/<session_id>', methods=['GET'])
+def session_events(session_id):
+    """Server-Sent Events stream for one session: typing, reply, reply_error, ticket_submitted"""
+    if get_session_store().get(session_id) is None:
+        return jsonify({"error": SESSION_MISSING}), 404
+    bus = get_event_bus()
+    subscription = bus.subscribe(session_id, request.headers.get("Last-Event-ID"))
+    response = Response(bus.stream(subscription, SSE_HEARTBEAT), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # Stop reverse proxies (nginx) from buffering the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+@app.route('/sessions/<session_id>/messages', methods=['POST'])
+def post_message(session_id):
+    """Accept a customer message; the reply arrives on /events/<session_id>"""
+    if not pipeline:
+        return jsonify({"error": "Backend not available"}), 500
+    message = (request.get_json(silent=True) or {}).get('message')
+    if not message:
+        return jsonify({"error": "message is required"}), 400
+    if get_session_store().append(session_id, "user", message) is None:
+        return jsonify({"error": SESSION_MISSING}), 404
+    CHAT_EXECUTOR.submit(_reply_in_background, session_id)
+    return jsonify({"accepted": True}), 202
+
+def _reply_in_background(session_id):
+    sessions, bus = get_session_store(), get_event_bus()
+    session = sessions.get(session_id)
+    if session is None:
+        return
+    with session.lock:
+        bus.publish(session_id, "typing", {})
+        try:
+            agent_reply = pipeline.analyzer.generate_solution(session.text)
+            session = sessions.append(session_id, "agent", agent_reply)
+            if session is None:
+                bus.publish(session_id, "reply_error", {"error": SESSION_MISSING})
+                return
+            bus.publish(session_id, "reply", {"agent_reply": agent_reply})
+            pipeline.speculate(session_id, session.text, historical_data)
+        except Exception as e:
+            logging.error(f"Error generating reply for session {session_id}: {e}")
+            bus.publish(session_id, "reply_error", {"error": f"Failed to generate response: {e}"})
+
 @app.route('/generate_draft', methods=['POST'])
 def generate_draft():
     if not pipeline:
@@ -61,7 +221,8 @@ def generate_draft():
         
     try:
         ticket_data = request.get_json()
-        draft = pipeline.analyzer.generate_email_draft(ticket_data)
+        # Pre-generated when the ticket was saved, unless its solution has changed since
+        draft = stored_draft(ticket_data) or pipeline.analyzer.generate_email_draft(ticket_data)
         return jsonify({"draft": draft})
     except Exception as e:
          logging.error(f"Error generating draft: {e}")
@@ -77,67 +238,55 @@ def submit_ticket():
             error_message += "An unknown error occurred during initialization."
         return jsonify({"error": error_message}), 500
 
-    conversation_list = request.get_json().get('conversation_history', [])
-    conversation_text = "\n".join([f"{msg['role'].title()}: {msg['content']}" for msg in conversation_list])
+    data = request.get_json()
+    session_id = data.get('session_id')
+    if session_id:
+        session = get_session_store().get(session_id)
+        if session is None:
+            return jsonify({"error": SESSION_MISSING}), 404
+        conversation_list = list(session.turns)
+        conversation_id = session_id
+        conversation_text = session.text
+    else:
+        conversation_list = data.get('conversation_history', [])
+        conversation_id = data.get('conversation_id')
+        conversation_text = _conversation_text(conversation_list)
     try:
+        # Optional per-request budget in seconds; slow model stages fall back and the ticket is upgraded later
+        deadline = request.headers.get('X-Request-Deadline', type=float)
         # Use pipeline.process to satisfy correct key mapping (extracted_issue, priority_level, etc.)
-        final_analysis = pipeline.process(conversation_text, historical_data)
+        final_analysis = pipeline.process(conversation_text, historical_data, conversation_id=conversation_id,
+                                          deadline=deadline)
+        if conversation_id and pipeline.speculative is not None:
+            pipeline.speculative.discard(conversation_id)
 
-        ticket_id = f"TICKET_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        # Suffix keeps IDs (and result files) unique for concurrent submissions in the same second
+        created_at = datetime.now()
+        ticket_id = f"TICKET_{created_at.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
         final_analysis['ticket_id'] = ticket_id
+        final_analysis['created_at'] = created_at.isoformat()
         final_analysis['conversation_history'] = conversation_list
         
-        # Auto-Email Alert Logic
-        priority = str(final_analysis.get('priority_level', '')).title() # Ensure Title Case (High, Critical)
-        issue_text = final_analysis.get('extracted_issue', '').lower()
-        summary_text = final_analysis.get('summary', '').lower()
-        # Also check the raw conversation just in case
-        raw_text = conversation_text.lower()
-        
-        is_critical = priority == 'Critical'
-        is_high = priority == 'High'
-        
-        feature_keywords = ["new feature", "feature request", "add feature", "enhancement", "suggest a feature", "idea for app"]
-        
-        is_new_feature = any(kw in issue_text for kw in feature_keywords) or \
-                         any(kw in summary_text for kw in feature_keywords) or \
-                         any(kw in raw_text for kw in feature_keywords)
-        
-        logging.info(f"Auto-Email Check: Priority={priority}, NewFeature={is_new_feature}")
-
-        if is_critical or is_high or is_new_feature:
-            try:
-                email_service = EmailService()
-                target_email = "prashik2927@gmail.com" # Explicitly requested by user
-                
-                if is_critical:
-                    # Critical alerts usually go to boss_email defined in env, but for consistency with request:
-                    # We will ensure specific attention.
-                    # Original send_critical_alert uses boss_email. 
-                    # Let's use send_email with is_critical flag logic or just update send_critical_alert?
-                    # User said "agar kuch 'new feature' ya high priority rahega toh woh apne aap prashik2927@gmail.com ko jaye"
-                    # So let's force it.
-                    
-                    email_service.send_email(final_analysis, note="Auto-Trigger: Critical Priority", recipient=target_email)
-                    
-                elif is_high or is_new_feature:
-                    reason = []
-                    if is_high: reason.append("High Priority")
-                    if is_new_feature: reason.append("Potential New Feature Request")
-                    
-                    note = f"Auto-Notification Trigger: {', '.join(reason)}"
-                    email_service.send_email(final_analysis, note=note, recipient=target_email)
-                    
-                    logging.info(f"Auto-email sent to {target_email}")
-                    
-            except Exception as e:
-                logging.error(f"Could not send email alert: {e}")
+        # Auto-Email Alert Logic (Critical/High priority or a feature request)
+        alert_ticket(final_analysis, conversation_text)
 
         file_path = os.path.join(RESULTS_DIR, f'{ticket_id}.json')
-        with open(file_path, 'w') as f:
+        with span("result_write"), open(file_path, 'w') as f:
             json.dump(final_analysis, f, indent=4)
 
         logging.info(f"Ticket submitted and saved to {file_path}")
+        digest_log = get_digest_log()
+        if digest_log is not None:
+            digest_log.record_created(final_analysis)
+        if final_analysis.get('partial'):
+            pipeline.schedule_upgrade(file_path, conversation_text, historical_data)
+        else:
+            pipeline.schedule_draft(file_path, final_analysis)
+        if session_id:
+            get_session_store().close(session_id)
+            # Tell any open event streams for this chat, then end them
+            get_event_bus().publish(session_id, "ticket_submitted", {"ticket_id": ticket_id})
+            get_event_bus().close(session_id)
         return jsonify({"message": "Ticket submitted successfully", "ticket_id": ticket_id}), 200
     except Exception as e:
         logging.error(f"Error submitting ticket: {e}")
@@ -153,7 +302,7 @@ if __name__ == '__main__':
         print("Common issues include:")
         print("  - Missing or incorrect path to 'Historical_ticket_data.csv'")
         print("  - Errors within the pandas library reading the CSV")
-        print("  - Problems with the 'ollama' AI model service.")
+        print("  - A misconfigured model backend (check MODEL_PROVIDER and its settings).")
         print("="*80)
     else:
-        app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
+        app.run(host='0.0.0.0', port=int(os.environ.get("PORT", 5000)))
\ No newline at end of file
@@ -0,0 +1,77 @@
+"""Compare running the agents one after another with the dependency-graph orchestrator.
+
+Uses the stub model with a fixed latency per call. The serial baseline runs
+extractor -> summarizer -> recommender (plus an extra model-backed agent with
+--extra-agent); the orchestrator overlaps whatever does not depend on
+something else. A second run of the same conversation shows memoized nodes.
+
+Usage: python -m benchmarks.agents_check [--latency 0.2] [--extra-agent]
+"""
+import argparse
+import sys
+import time
+from typing import Any, Dict
+
+from support_ai.agents.base import BaseAgent
+from support_ai.agents.extractor import IssueExtractorAgent
+from support_ai.agents.orchestrator import AgentOrchestrator
+from support_ai.agents.recommender import RecommenderAgent
+from support_ai.agents.summarizer import SummarizerAgent
+from support_ai.llm.client import ModelClient, set_client
+from support_ai.llm.providers import StubProvider
+from support_ai.llm.resilience import ResilientCaller
+from tools.synthetic_data import iter_conversations
+
+SAMPLE_HISTORY = {
+    "issues": ["App crashes on startup", "Payment charged twice", "Cannot reset password"],
+    "solutions": ["Reinstall the latest version", "Refund the duplicate charge", "Send a reset link"],
+    "sentiments": ["Negative", "Negative", "Neutral"],
+    "priorities": ["High", "High", "Medium"],
+}
+
+
+class SentimentAgent(BaseAgent):
+    """Stands in for a newly added agent that only needs the chat"""
+    inputs = ("chat_text",)
+    outputs = ("sentiment",)
+
+    def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        reply = self.query_gemini(f"Sentiment (one word) of:\n\n{input_data['chat_text']}", task="sentiment")
+        return {"sentiment": reply.strip()}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub model latency per call")
+    parser.add_argument("--extra-agent", action="store_true", help="add a fourth, independent model-backed agent")
+    args = parser.parse_args()
+
+    set_client(ModelClient(backend=StubProvider(latency=args.latency),
+                           resilience=ResilientCaller(rate=1e6, burst=10**6, max_concurrency=16, initial_concurrency=16)))
+    agents = [IssueExtractorAgent(), SummarizerAgent(), RecommenderAgent()]
+    if args.extra_agent:
+        agents.append(SentimentAgent())
+    conversation = next(iter_conversations(1, seed=3))
+    chat_text = "\n".join(f"{turn['role'].title()}: {turn['content']}" for turn in conversation["turns"])
+    inputs = {"chat_text": chat_text, "ticket_data": SAMPLE_HISTORY}
+
+    start = time.perf_counter()
+    context = dict(inputs)
+    for agent in agents:
+        context.update(agent.run(context))
+    serial = time.perf_counter() - start
+    print(f"Serial:       {serial:.3f}s for {len(agents)} agents")
+
+    orchestrator = AgentOrchestrator(agents)
+    for label in ("Orchestrated", "Re-run"):
+        run = orchestrator.run(inputs, conversation_id=conversation["conversation_id"])
+        print(f"{label + ':':<13} {run.elapsed:.3f}s")
+        for name, timing in sorted(run.timings.items(), key=lambda item: item[1]["started"]):
+            print(f"    {name:<20} start +{timing['started']:.3f}s  took {timing['seconds']:.3f}s"
+                  f"{'  (memoized)' if timing['reused'] else ''}")
+    print(orchestrator.stats())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""Benchmark RecommenderAgent-style top-k selection over large histories.
+
+Compares the old approach (refit TF-IDF over the whole history on every query)
+with the shared prefit SimilarityIndex + argpartition selection.
+
+Usage: python -m benchmarks.bench_recommender [sizes...] [--queries N] [--legacy-max N]
+"""
+import argparse
+import random
+import time
+from typing import Dict, List
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from support_ai.similarity import SimilarityIndex
+
+CATEGORIES = [
+    "Software Installation Failure", "Network Connectivity Issue", "Device Compatibility Error",
+    "Account Synchronization Bug", "Payment Gateway Integration Failure",
+]
+DETAILS = [
+    "unknown error at 75%", "no internet connection", "app crashes on launch", "sync token corrupted",
+    "invalid ssl certificate", "tls handshake failed", "antivirus blocks installer", "permissions reset",
+]
+
+QUERIES = [
+    "installation keeps failing with an unknown error",
+    "payment api rejects our ssl certificate",
+    "app says no internet connection but wifi works",
+    "project data not syncing between laptop and tablet",
+]
+
+
+def make_history(n: int, seed: int = 0) -> Dict[str, List[str]]:
+    rng = random.Random(seed)
+    issues = [f"{rng.choice(CATEGORIES)} {rng.choice(DETAILS)} {rng.randint(0, n)}" for _ in range(n)]
+    return {"issues": issues, "solutions": [f"solution {i}" for i in range(n)]}
+
+
+def legacy_top_k(query: str, issues: List[str], k: int = 3):
+    vectorizer = TfidfVectorizer()
+    matrix = vectorizer.fit_transform(issues + [query])
+    similarities = cosine_similarity(matrix[-1:], matrix[:-1])[0]
+    return similarities.argsort()[-k:][::-1]
+
+
+def run(sizes: List[int], queries: int, legacy_max: int) -> None:
+    print(f"{'rows':>10} {'build s':>9} {'index ms/q':>11} {'legacy ms/q':>12}")
+    for n in sizes:
+        history = make_history(n)
+        start = time.perf_counter()
+        index = SimilarityIndex(history["issues"])
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for q in range(queries):
+            index.top_k(QUERIES[q % len(QUERIES)], k=3)
+        indexed = (time.perf_counter() - start) / queries * 1000
+
+        legacy = float("nan")
+        if n <= legacy_max:
+            start = time.perf_counter()
+            for q in range(queries):
+                legacy_top_k(QUERIES[q % len(QUERIES)], history["issues"])
+            legacy = (time.perf_counter() - start) / queries * 1000
+
+        print(f"{n:>10} {build:>9.2f} {indexed:>11.3f} {legacy:>12.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sizes", nargs="*", type=int, default=[10**3, 10**4, 10**5, 10**6])
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--legacy-max", type=int, default=10**5,
+                        help="skip the refit-per-query baseline above this many rows")
+    args = parser.parse_args()
+    np.random.seed(0)
+    run(args.sizes, args.queries, args.legacy_max)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Cost of a daily digest as ticket history grows: rescanning ticket files vs running aggregates.
+
+Writes N synthetic ticket files spread over the last two weeks (plus their
+events), then times one digest run each way after 100 new tickets arrive:
+the rescan loads every ticket file and aggregates it; the incremental path
+folds the 100 new events into the persisted aggregates, merges the 24 hourly
+buckets and renders through the report sender.
+
+Usage: python -m benchmarks.digest_check [--sizes 1000,5000,20000]
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+from support_ai.digest import DigestLog, DigestStore
+from utils.report_sender import ReportGenerator
+
+TEAMS = ["Technical", "Billing", "Account", "Product"]
+PRIORITIES = ["Critical", "High", "Medium", "Low"]
+SENTIMENTS = ["Negative", "Neutral", "Positive"]
+
+
+def write_tickets(directory: str, log: DigestLog, count: int, rng: random.Random, start: float, end: float) -> None:
+    for i in range(count):
+        created = rng.uniform(start, end)
+        ticket = {
+            "ticket_id": f"TICKET_{datetime.fromtimestamp(created).strftime('%Y%m%d_%H%M%S')}_{i:06x}",
+            "created_at": datetime.fromtimestamp(created).isoformat(),
+            "assigned_team": rng.choice(TEAMS), "priority_level": rng.choice(PRIORITIES),
+            "sentiment": rng.choice(SENTIMENTS), "confidence_score": round(rng.random(), 2),
+            "summary": "Customer reported a problem " * 10, "suggested_solution": "Try this " * 20,
+        }
+        with open(os.path.join(directory, f"{ticket['ticket_id']}.json"), 'w') as f:
+            json.dump(ticket, f, indent=4)
+        log.record_created(ticket)
+
+
+def rescan(directory: str, since: float) -> dict:
+    """What a digest costs without aggregates: read every ticket"""
+    counts = {"created": 0, "team": {}, "priority": {}, "sentiment": {}, "confidence": [0] * 10}
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        with open(path, 'r') as f:
+            ticket = json.load(f)
+        if datetime.fromisoformat(ticket["created_at"]).timestamp() < since:
+            continue
+        counts["created"] += 1
+        for field, key in (("team", "assigned_team"), ("priority", "priority_level"), ("sentiment", "sentiment")):
+            counts[field][ticket[key]] = counts[field].get(ticket[key], 0) + 1
+        counts["confidence"][min(int(ticket["confidence_score"] * 10), 9)] += 1
+    return counts
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,5000,20000", help="ticket history sizes")
+    args = parser.parse_args()
+    generator = ReportGenerator({})
+    print(f"{'history':>8} {'rescan':>10} {'incremental':>12} {'state.json':>11}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        directory = tempfile.mkdtemp(prefix="digest_check_")
+        try:
+            rng = random.Random(size)
+            log = DigestLog(os.path.join(directory, "digest"))
+            now = time.time()
+            write_tickets(directory, log, size, rng, now - 13 * 86400, now - 3600)
+            store = DigestStore(log.directory)
+            store.refresh()
+            # The next day's tickets arrive, then the digest job runs
+            write_tickets(directory, log, 100, rng, now - 3600, now)
+
+            start = time.perf_counter()
+            rescan(directory, now - 86400)
+            rescan_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            store = DigestStore(log.directory)
+            store.refresh()
+            generator.generate_digest_report(store.daily(now + 3600), title="Daily Triage Digest")
+            incremental_seconds = time.perf_counter() - start
+
+            state_kb = os.path.getsize(store.state_path) / 1024
+            print(f"{size:>8} {rescan_seconds * 1000:>8.1f}ms {incremental_seconds * 1000:>10.1f}ms {state_kb:>9.1f}KB")
+        finally:
+            shutil.rmtree(directory)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,88 @@
+"""Measure what request hedging does to model-call tail latency, and what it costs.
+
+A stub backend answers most calls quickly but a small fraction very slowly
+(a heavy tail). The same call sequence runs without and with hedging; the
+report compares p50/p99/max and counts the extra backend calls.
+
+Usage: python -m benchmarks.hedge_check [--calls 600] [--concurrency 8]
+           [--fast 0.05] [--slow 1.0] [--slow-fraction 0.03] [--percentile 0.95] [--max-rate 0.1]
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from support_ai.llm.client import ModelClient
+from support_ai.llm.hedging import Hedger
+from support_ai.llm.providers import ModelProvider
+from support_ai.llm.resilience import ResilientCaller
+
+
+class TailProvider(ModelProvider):
+    name = "tail"
+
+    def __init__(self, fast: float, slow: float, slow_fraction: float, seed: int):
+        self.fast, self.slow, self.slow_fraction = fast, slow, slow_fraction
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def generate(self, model_name: str, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+            slow = self._random.random() < self.slow_fraction
+        time.sleep(self.slow if slow else self.fast)
+        return f"reply to {prompt}"
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def run(args, hedged: bool):
+    provider = TailProvider(args.fast, args.slow, args.slow_fraction, args.seed)
+    resilience = ResilientCaller(rate=1e6, burst=10**6, max_concurrency=64, initial_concurrency=64, max_retries=0)
+    hedger = Hedger(percentile=args.percentile, max_rate=args.max_rate) if hedged else None
+    client = ModelClient(backend=provider, resilience=resilience, hedger=hedger)
+    # Ignore MODEL_HEDGE_ENABLED from the environment for the unhedged baseline
+    client.hedger = hedger
+
+    def call(i: int) -> float:
+        start = time.perf_counter()
+        client.generate(f"prompt {i}")
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        latencies = list(pool.map(call, range(args.calls)))
+    return latencies, provider.calls, client.stats()["hedging"]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--fast", type=float, default=0.05, help="typical backend latency")
+    parser.add_argument("--slow", type=float, default=1.0, help="latency of the slow tail")
+    parser.add_argument("--slow-fraction", type=float, default=0.03)
+    parser.add_argument("--percentile", type=float, default=0.95, help="hedge after this percentile of recent latency")
+    parser.add_argument("--max-rate", type=float, default=0.1, help="most calls that may be hedged")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    for hedged in (False, True):
+        latencies, backend_calls, stats = run(args, hedged)
+        print(f"{'Hedged' if hedged else 'Unhedged':<9} p50 {percentile(latencies, 0.5):.3f}s  "
+              f"p99 {percentile(latencies, 0.99):.3f}s  max {max(latencies):.3f}s  "
+              f"backend calls {backend_calls} (+{backend_calls / args.calls - 1:.1%})")
+        if stats:
+            print(f"          hedged {stats['hedged']}  hedge won {stats['hedge_won']}  "
+                  f"losers cancelled before the backend {stats['loser_cancelled_early']}  "
+                  f"hedge delay {stats['delay_seconds']}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""End-to-end load test for api.py against a fake model backend and SMTP sink.
+
+Starts tools/fake_model_server.py and tools/smtp_sink.py in-process, launches
+api.py (or serve_prefork.py) as a subprocess wired to them with
+MODEL_PROVIDER=local, then drives a weighted mix of /chat, /submit_ticket and
+/generate_draft with synthetic conversations at increasing concurrency. Each
+step reports throughput, latency percentiles and error rate per endpoint; the
+saturation point is the first step where adding clients stops adding
+throughput (or errors pass --max-error-rate).
+
+Usage: python -m benchmarks.load_test [--concurrency 1 2 4 8 16 32] [--duration 10]
+           [--mix chat=6,submit_ticket=3,generate_draft=1] [--min-turns 3] [--max-turns 9]
+           [--model-latency 0.2] [--model-max-rps 0] [--prefork 0]
+           [--env MODEL_RATE_LIMIT=50 ...] [--output results.json]
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Tuple
+
+from tools import fake_model_server, smtp_sink
+from tools.synthetic_data import iter_conversations
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENDPOINTS = ("chat", "submit_ticket", "generate_draft")
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}' in --mix (expected {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def build_payload(endpoint: str, conversation: Dict, rng: random.Random) -> Dict:
+    turns = conversation["turns"]
+    if endpoint == "chat":
+        # A conversation in progress: cut after some customer turn
+        user_turns = [i for i, turn in enumerate(turns) if turn["role"] == "user"]
+        return {"conversation_history": turns[:rng.choice(user_turns) + 1]}
+    if endpoint == "submit_ticket":
+        return {"conversation_history": turns}
+    agent_turns = [turn["content"] for turn in turns if turn["role"] == "agent"] or [""]
+    return {"ticket_id": conversation["conversation_id"], "extracted_issue": turns[0]["content"],
+            "suggested_solution": agent_turns[-1]}
+
+
+class ApiProcess:
+    """api.py (or serve_prefork.py) running in its own process group"""
+
+    def __init__(self, port: int, env: Dict[str, str], prefork: int, log_path: str):
+        if prefork:
+            command = [sys.executable, "serve_prefork.py", "--workers", str(prefork),
+                       "--host", "127.0.0.1", "--port", str(port)]
+        else:
+            command = [sys.executable, "api.py"]
+        self.base_url = f"http://127.0.0.1:{port}"
+        self.log = open(log_path, "w")
+        self.process = subprocess.Popen(command, cwd=REPO_ROOT, env=env, stdout=self.log,
+                                        stderr=subprocess.STDOUT, start_new_session=True)
+
+    def wait_ready(self, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"API process exited with status {self.process.returncode}; see {self.log.name}")
+            try:
+                with urllib.request.urlopen(self.base_url + "/metrics", timeout=1):
+                    return
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                time.sleep(0.2)
+        raise RuntimeError(f"API did not become ready within {timeout:.0f}s; see {self.log.name}")
+
+    def stop(self) -> None:
+        if self.process.poll() is None:
+            os.killpg(self.process.pid, signal.SIGTERM)
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                os.killpg(self.process.pid, signal.SIGKILL)
+                self.process.wait()
+        self.log.close()
+
+
+def run_step(base_url: str, concurrency: int, duration: float, mix: Dict[str, float],
+             conversations: List[Dict], seed: int, timeout: float) -> Dict:
+    samples: List[Tuple[str, float, bool]] = []
+    lock = threading.Lock()
+    names, weights = list(mix), list(mix.values())
+    deadline = time.monotonic() + duration
+
+    def client(worker: int) -> None:
+        rng = random.Random(seed * 1000 + worker)
+        local = []
+        while time.monotonic() < deadline:
+            endpoint = rng.choices(names, weights)[0]
+            body = json.dumps(build_payload(endpoint, rng.choice(conversations), rng)).encode("utf-8")
+            req = urllib.request.Request(f"{base_url}/{endpoint}", data=body,
+                                         headers={"Content-Type": "application/json"})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(req, timeout=timeout) as response:
+                    response.read()
+                    ok = response.status == 200
+            except Exception:
+                ok = False
+            local.append((endpoint, time.perf_counter() - start, ok))
+        with lock:
+            samples.extend(local)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return summarize(samples, elapsed, concurrency)
+
+
+def summarize(samples: List[Tuple[str, float, bool]], elapsed: float, concurrency: int) -> Dict:
+    def stats(rows):
+        latencies = [latency for _, latency, ok in rows if ok]
+        errors = sum(1 for _, _, ok in rows if not ok)
+        return {
+            "requests": len(rows),
+            "throughput_per_second": len(latencies) / elapsed,
+            "error_rate": errors / len(rows) if rows else 0.0,
+            "p50_seconds": percentile(latencies, 0.5),
+            "p95_seconds": percentile(latencies, 0.95),
+            "p99_seconds": percentile(latencies, 0.99),
+        }
+
+    result = {"concurrency": concurrency, "elapsed_seconds": elapsed, **stats(samples), "endpoints": {}}
+    for endpoint in ENDPOINTS:
+        rows = [s for s in samples if s[0] == endpoint]
+        if rows:
+            result["endpoints"][endpoint] = stats(rows)
+    return result
+
+
+def find_saturation(steps: List[Dict], min_gain: float, max_error_rate: float) -> Dict:
+    """First step where throughput stopped scaling with clients, or errors crossed the limit"""
+    for previous, step in zip(steps, steps[1:]):
+        if step["error_rate"] > max_error_rate:
+            return {"concurrency": step["concurrency"], "reason": f"error rate {step['error_rate']:.1%}",
+                    "throughput_per_second": previous["throughput_per_second"]}
+        gain = step["throughput_per_second"] / max(previous["throughput_per_second"], 1e-9) - 1
+        if gain < min_gain:
+            return {"concurrency": previous["concurrency"],
+                    "reason": f"throughput {gain:+.0%} going to {step['concurrency']} clients "
+                              f"while p95 went {previous['p95_seconds']:.3f}s -> {step['p95_seconds']:.3f}s",
+                    "throughput_per_second": previous["throughput_per_second"]}
+    return {}
+
+
+def model_stats(server) -> Dict[str, int]:
+    with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/stats", timeout=5) as response:
+        return json.loads(response.read())
+
+
+def print_step(step: Dict) -> None:
+    print(f"  c={step['concurrency']:<4} {step['throughput_per_second']:8.1f} req/s  "
+          f"err {step['error_rate']:6.1%}  p50 {step['p50_seconds']:.3f}s  "
+          f"p95 {step['p95_seconds']:.3f}s  p99 {step['p99_seconds']:.3f}s")
+    for endpoint, stats in step["endpoints"].items():
+        print(f"      {endpoint:<15} {stats['throughput_per_second']:8.1f} req/s  err {stats['error_rate']:6.1%}  "
+              f"p50 {stats['p50_seconds']:.3f}s  p95 {stats['p95_seconds']:.3f}s  p99 {stats['p99_seconds']:.3f}s")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency step")
+    parser.add_argument("--mix", default="chat=6,submit_ticket=3,generate_draft=1")
+    parser.add_argument("--conversations", type=int, default=500, help="synthetic conversation pool size")
+    parser.add_argument("--min-turns", type=int, default=3)
+    parser.add_argument("--max-turns", type=int, default=9)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request client timeout")
+    parser.add_argument("--model-latency", type=float, default=0.2)
+    parser.add_argument("--model-jitter", type=float, default=0.05)
+    parser.add_argument("--model-error-rate", type=float, default=0.0)
+    parser.add_argument("--model-max-rps", type=float, default=0.0, help="fake provider quota (0 = none)")
+    parser.add_argument("--smtp-latency", type=float, default=0.0)
+    parser.add_argument("--prefork", type=int, default=0, help="serve with serve_prefork.py and this many workers")
+    parser.add_argument("--semantic-cache", action="store_true", help="leave the semantic cache enabled")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra environment for the API process (e.g. MODEL_RATE_LIMIT=50)")
+    parser.add_argument("--min-gain", type=float, default=0.10,
+                        help="throughput gain below which a step counts as saturated")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--output", help="write the full report as JSON")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    conversations = list(iter_conversations(args.conversations, args.seed, args.min_turns, args.max_turns))
+
+    model = fake_model_server.make_server(port=0, latency=args.model_latency, jitter=args.model_jitter,
+                                          error_rate=args.model_error_rate, max_rps=args.model_max_rps,
+                                          seed=args.seed)
+    smtp = smtp_sink.make_server(port=0, latency=args.smtp_latency)
+    for server in (model, smtp):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    workdir = tempfile.mkdtemp(prefix="support_ai_load_")
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        "MODEL_PROVIDER": "local",
+        "LOCAL_MODEL_URL": f"http://127.0.0.1:{model.server_address[1]}",
+        "SMTP_SERVER": "127.0.0.1",
+        "SMTP_PORT": str(smtp.server_address[1]),
+        "SMTP_STARTTLS": "0",
+        "SMTP_EMAIL": "loadtest@example.com",
+        "SMTP_PASSWORD": "loadtest",
+        "BOSS_EMAIL": "boss@example.com",
+        "TICKET_RESULTS_DIR": os.path.join(workdir, "tickets"),
+        "PORT": str(port),
+    })
+    if not args.semantic_cache:
+        env["SEMANTIC_CACHE_ENABLED"] = "0"
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    api = ApiProcess(port, env, args.prefork, os.path.join(workdir, "api.log"))
+    steps, backend_stats = [], {}
+    try:
+        api.wait_ready(timeout=120)
+        print(f"api.py ready on {api.base_url} (logs and tickets in {workdir})")
+        for concurrency in args.concurrency:
+            step = run_step(api.base_url, concurrency, args.duration, mix, conversations,
+                            args.seed, args.timeout)
+            steps.append(step)
+            print_step(step)
+    finally:
+        api.stop()
+        backend_stats = model_stats(model)
+        model.shutdown()
+        smtp.shutdown()
+
+    saturation = find_saturation(steps, args.min_gain, args.max_error_rate)
+    if saturation:
+        print(f"\nSaturation begins at {saturation['concurrency']} clients "
+              f"(~{saturation['throughput_per_second']:.1f} req/s): {saturation['reason']}")
+    else:
+        print("\nNo saturation within the tested concurrency range")
+    report = {
+        "params": {k: v for k, v in vars(args).items() if k != "output"},
+        "steps": steps,
+        "saturation": saturation,
+        "model_backend": backend_stats,
+        "smtp": smtp.stats.snapshot(),
+    }
+    print(f"Model backend: {report['model_backend']}  SMTP sink: {report['smtp']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
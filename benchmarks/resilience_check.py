@@ -0,0 +1,74 @@
+"""Exercise the model client's rate limiter, AIMD concurrency, retries and
+circuit breaker against tools/fake_model_server.py with injected latency,
+errors and provider quota (429s).
+
+Usage: python -m benchmarks.resilience_check [--calls 200] [--threads 32]
+       [--max-rps 20] [--error-rate 0.05] [--latency 0.1]
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from support_ai.llm.client import ModelClient
+from support_ai.llm.providers import OpenAICompatibleProvider
+from support_ai.llm.resilience import ResilientCaller
+from tools.fake_model_server import make_server
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--max-rps", type=float, default=20.0, help="fake provider quota")
+    parser.add_argument("--client-rate", type=float, default=25.0, help="client token bucket rate")
+    args = parser.parse_args()
+
+    server = make_server(port=0, latency=args.latency, jitter=args.latency / 2,
+                         error_rate=args.error_rate, max_rps=args.max_rps)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    client = ModelClient(
+        backend=OpenAICompatibleProvider(base_url),
+        resilience=ResilientCaller(rate=args.client_rate, burst=int(args.client_rate), max_concurrency=32,
+                                   latency_target=args.latency * 10, max_retries=4),
+    )
+
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def one(i: int) -> None:
+        start = time.perf_counter()
+        try:
+            client.generate(f"Summarize ticket {i}")
+            with lock:
+                latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            with lock:
+                errors.append(type(e).__name__)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(one, range(args.calls)))
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    print(f"{args.calls} calls in {elapsed:.2f}s ({args.calls / elapsed:.1f}/s)")
+    print(f"ok: {len(latencies)}  failed: {len(errors)} {sorted(set(errors))}")
+    print(f"latency p50 {percentile(latencies, 0.5):.3f}s  p99 {percentile(latencies, 0.99):.3f}s")
+    print(json.dumps(client.stats(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""Reproducible benchmark suite for the triage pipeline.
+
+Runs against the deterministic stub model (configurable latency) and synthetic
+historical CSVs, and measures:
+
+- TicketDataLoader load time
+- similarity index build time and find_similar_cases latency
+- SupportPipeline.process latency
+- batch throughput (conversations/second across a thread pool)
+- /submit_ticket requests/second and latency percentiles (Flask test client)
+
+Results are written as JSON (default benchmarks/results/<commit>.json) so runs
+can be compared across commits with --compare.
+
+Usage: python -m benchmarks.run [--sizes 1000 10000 100000 1000000] [--latency 0.05]
+                                [--output PATH] [--compare BASELINE.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+# Measure the real analysis path, not cache hits
+os.environ.setdefault("SEMANTIC_CACHE_ENABLED", "0")
+
+from support_ai.data_loader import TicketDataLoader
+from support_ai.llm.client import ModelClient, set_client
+from support_ai.llm.providers import StubProvider
+from support_ai.llm.resilience import ResilientCaller
+from support_ai.pipeline import SupportPipeline
+from support_ai.similarity import get_index
+from tools.synthetic_data import write_tickets_csv
+
+CONVERSATIONS = [
+    "Customer: My installer fails at 75% with an unknown error.\nAgent: Disable your antivirus and retry.",
+    "Customer: Urgent! Your API rejects our payment gateway, invalid SSL certificate.\nAgent: Upgrade to TLS 1.3.",
+    "Customer: The app says no internet connection but Wi-Fi works.\nAgent: Enable Local Network permission.",
+    "Customer: Project data isn't syncing between laptop and tablet.\nAgent: Force a full sync from Settings.",
+    "Customer: The app crashes on launch on my Android 14 phone.\nAgent: Clear the cache and update the app.",
+]
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"mean": sum(ordered) / len(ordered), "p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99)}
+
+
+def timed(fn, repeat: int) -> List[float]:
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_size(rows: int, workdir: str, args) -> Dict[str, float]:
+    path = os.path.join(workdir, f"history_{rows}.csv")
+    if not os.path.exists(path):
+        write_tickets_csv(path, rows, seed=args.seed)
+    result: Dict[str, float] = {}
+
+    start = time.perf_counter()
+    loader = TicketDataLoader(path)
+    result["loader_load_seconds"] = time.perf_counter() - start
+    historical_data = loader.get_training_data()
+
+    start = time.perf_counter()
+    get_index(historical_data)
+    result["index_build_seconds"] = time.perf_counter() - start
+
+    pipeline = SupportPipeline()
+    issues = ["installation fails with unknown error", "ssl certificate rejected by payment api",
+              "no internet connection in the app", "data not syncing across devices"]
+    samples = timed(lambda i: pipeline.analyzer.find_similar_cases(issues[i % len(issues)], historical_data),
+                    args.repeat)
+    result.update({f"find_similar_cases_{k}_seconds": v for k, v in percentiles(samples).items()})
+
+    samples = timed(lambda i: pipeline.process(CONVERSATIONS[i % len(CONVERSATIONS)], historical_data),
+                    args.repeat)
+    result.update({f"pipeline_process_{k}_seconds": v for k, v in percentiles(samples).items()})
+
+    batch = [CONVERSATIONS[i % len(CONVERSATIONS)] + f"\nCustomer: ref {i}" for i in range(args.batch)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(lambda text: pipeline.process(text, historical_data), batch))
+    result["batch_throughput_per_second"] = len(batch) / (time.perf_counter() - start)
+
+    result.update(bench_submit_ticket(historical_data, workdir, args))
+    return result
+
+
+def bench_submit_ticket(historical_data, workdir: str, args) -> Dict[str, float]:
+    import api
+    api.historical_data = historical_data
+    client = api.app.test_client()
+
+    def submit(i: int) -> float:
+        text = CONVERSATIONS[i % len(CONVERSATIONS)].split("\n")
+        history = [{"role": "user", "content": text[0].split(": ", 1)[1] + f" (ref {i})"},
+                   {"role": "agent", "content": text[1].split(": ", 1)[1]}]
+        start = time.perf_counter()
+        response = client.post("/submit_ticket", json={"conversation_history": history})
+        if response.status_code != 200:
+            raise RuntimeError(f"/submit_ticket returned {response.status_code}")
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        samples = list(pool.map(submit, range(args.requests)))
+    elapsed = time.perf_counter() - start
+    result = {"submit_ticket_requests_per_second": len(samples) / elapsed}
+    result.update({f"submit_ticket_{k}_seconds": v for k, v in percentiles(samples).items()})
+    return result
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(current: Dict, baseline_path: str, tolerance: float) -> int:
+    """Print per-metric change against a baseline run; returns the number of regressions"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = 0
+    print(f"\nComparison against {baseline_path} ({baseline['meta'].get('commit')}):")
+    for size, metrics in current["results"].items():
+        for name, value in metrics.items():
+            old = baseline["results"].get(size, {}).get(name)
+            if not old:
+                continue
+            change = (value - old) / old
+            # Throughput regresses when it drops; everything else when it grows
+            worse = -change if name.endswith("per_second") else change
+            flag = "REGRESSION" if worse > tolerance else ""
+            regressions += bool(flag)
+            print(f"  {size:>8} {name:<42} {old:>12.5f} -> {value:>12.5f} ({change:+.1%}) {flag}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10**3, 10**4, 10**5, 10**6])
+    parser.add_argument("--latency", type=float, default=0.05, help="stub model latency per call (seconds)")
+    parser.add_argument("--repeat", type=int, default=20, help="samples per latency measurement")
+    parser.add_argument("--batch", type=int, default=50, help="conversations in the throughput batch")
+    parser.add_argument("--requests", type=int, default=100, help="/submit_ticket requests")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="where synthetic CSVs are cached (default: a temp dir)")
+    parser.add_argument("--output", help="results JSON (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="relative change flagged as a regression")
+    args = parser.parse_args()
+
+    unthrottled = ResilientCaller(rate=1e6, burst=10**6, max_concurrency=1024, initial_concurrency=1024)
+    set_client(ModelClient(backend=StubProvider(latency=args.latency), resilience=unthrottled))
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="support_ai_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    # api loads .env when imported but never overrides variables already set: keep real
+    # SMTP credentials (alerts for Critical stub tickets) and the real ticket store out of the run
+    os.environ.update({"SMTP_EMAIL": "", "SMTP_PASSWORD": "",
+                       "TICKET_RESULTS_DIR": os.path.join(workdir, "tickets"),
+                       "DIGEST_DIR": os.path.join(workdir, "tickets", "digest")})
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "workdir")},
+        },
+        "results": {},
+    }
+    for rows in args.sizes:
+        print(f"Benchmarking {rows} historical rows...", flush=True)
+        report["results"][str(rows)] = bench_size(rows, workdir, args)
+        for name, value in report["results"][str(rows)].items():
+            print(f"  {name:<42} {value:.5f}")
+
+    output = args.output or os.path.join("benchmarks", "results", f"{report['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        return 1 if compare(report, args.compare, args.tolerance) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
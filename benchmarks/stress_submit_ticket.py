@@ -0,0 +1,102 @@
+"""Concurrency stress test for /submit_ticket.
+
+Hammers the shared pipeline in api.py from many threads with the deterministic
+stub model backend, then checks that every submission of the same
+conversation produced an identical analysis and that no ticket was lost.
+
+Usage: python -m benchmarks.stress_submit_ticket [--threads 32] [--requests 400]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from support_ai.llm.client import ModelClient, set_client
+from support_ai.llm.providers import StubProvider
+from support_ai.llm.resilience import ResilientCaller
+
+CONVERSATIONS = [
+    [
+        {"role": "user", "content": "My installer fails at 75% with an unknown error on Windows 11."},
+        {"role": "agent", "content": "Please disable your antivirus and retry."},
+    ],
+    [
+        {"role": "user", "content": "Your API rejects our payment gateway: invalid SSL certificate. Urgent!"},
+        {"role": "agent", "content": "We require TLS 1.3, please upgrade your server."},
+    ],
+    [
+        {"role": "user", "content": "Project data isn't syncing between my laptop and tablet."},
+        {"role": "agent", "content": "Go to Settings > Sync > Force Full Sync."},
+    ],
+]
+
+# Fields that legitimately differ between submissions (drafts are attached in the background)
+VOLATILE_FIELDS = {"ticket_id", "created_at", "conversation_history", "email_draft"}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=400)
+    args = parser.parse_args()
+
+    # No client-side throttling: the stub backend has no quota to protect
+    unthrottled = ResilientCaller(rate=1e6, burst=10**6, max_concurrency=1024, initial_concurrency=1024)
+    set_client(ModelClient(backend=StubProvider(), resilience=unthrottled))
+
+    # api loads .env when imported but never overrides variables already set: keep real
+    # SMTP credentials (alerts for Critical stub tickets) and the real ticket store out of the run
+    results_dir = tempfile.mkdtemp(prefix="stress_tickets_")
+    os.environ.update({"SMTP_EMAIL": "", "SMTP_PASSWORD": "", "TICKET_RESULTS_DIR": results_dir,
+                       "DIGEST_DIR": os.path.join(results_dir, "digest")})
+
+    try:
+        import api
+        if not api.pipeline:
+            print(f"Pipeline failed to start: {api.startup_error}")
+            return 1
+        client = api.app.test_client()
+
+        def submit(i: int):
+            conversation = CONVERSATIONS[i % len(CONVERSATIONS)]
+            response = client.post("/submit_ticket", json={"conversation_history": conversation})
+            return i % len(CONVERSATIONS), response.status_code, response.get_json()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            responses = list(pool.map(submit, range(args.requests)))
+        elapsed = time.perf_counter() - start
+
+        failures = [r for r in responses if r[1] != 200]
+        ticket_ids = {r[2]["ticket_id"] for r in responses if r[1] == 200}
+
+        results = defaultdict(set)
+        for conversation_idx, status, body in responses:
+            if status != 200:
+                continue
+            with open(os.path.join(api.RESULTS_DIR, f"{body['ticket_id']}.json")) as f:
+                ticket = json.load(f)
+            stable = {k: v for k, v in ticket.items() if k not in VOLATILE_FIELDS}
+            results[conversation_idx].add(json.dumps(stable, sort_keys=True))
+
+        print(f"{args.requests} requests, {args.threads} threads: {elapsed:.2f}s "
+              f"({args.requests / elapsed:.1f} req/s)")
+        print(f"failures: {len(failures)}, unique ticket ids: {len(ticket_ids)}")
+        nondeterministic = {idx: len(variants) for idx, variants in results.items() if len(variants) > 1}
+        print(f"distinct results per conversation: { {idx: len(v) for idx, v in results.items()} }")
+
+        ok = not failures and len(ticket_ids) == args.requests and not nondeterministic
+        print("PASS" if ok else "FAIL")
+        return 0 if ok else 1
+    finally:
+        # Background upgrades may still be writing; nothing in here is worth keeping
+        shutil.rmtree(results_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Benchmark the compiled templates against the per-message f-string/format code they replaced.
+
+The previous implementations are loaded from git (by default the parent of
+the commit that added support_ai/templates.py; HEAD before that is
+committed), outputs are checked to be identical for the same tickets, and
+then each is timed on single emails, single reports and a batch of reports.
+utils/report_sender_new.py is left out of the comparison: its old template
+could not be formatted at all (unescaped CSS braces).
+
+Usage: python -m benchmarks.template_bench [--tickets 2000] [--repeat 3] [--baseline REV]
+"""
+import argparse
+import subprocess
+import sys
+import time
+import types
+
+from support_ai.email_service import EmailService
+from utils.report_sender import ReportGenerator
+
+TIMESTAMP = "2024-01-01 00:00:00"
+
+
+def baseline_rev() -> str:
+    added = subprocess.run(["git", "log", "--diff-filter=A", "--format=%H", "--", "support_ai/templates.py"],
+                           capture_output=True, text=True).stdout.split()
+    return f"{added[-1]}~1" if added else "HEAD"
+
+
+def load_legacy(rev: str, path: str, name: str) -> types.ModuleType:
+    source = subprocess.run(["git", "show", f"{rev}:{path}"], capture_output=True, text=True, check=True).stdout
+    module = types.ModuleType(name)
+    exec(compile(source, f"{rev}:{path}", "exec"), module.__dict__)
+    return module
+
+
+class FrozenDatetime:
+    @staticmethod
+    def now():
+        return FrozenDatetime()
+
+    def strftime(self, fmt):
+        return TIMESTAMP
+
+
+def make_tickets(count: int):
+    return [{
+        "ticket_id": f"TICKET_{i:06d}",
+        "priority": ("Critical", "High", "Medium", "Low")[i % 4], "priority_level": ("Critical", "High", "Medium", "Low")[i % 4],
+        "confidence": (i % 100) / 100, "team": ("Technical", "Billing", "Security")[i % 3],
+        "assigned_team": ("Technical", "Billing", "Security")[i % 3], "sentiment": ("negative", "neutral", "positive")[i % 3],
+        "summary": f"Customer {i} reports the desktop app closes right after login on version 5.{i % 9}",
+        "issue": f"App crash on login (case {i})", "extracted_issue": f"App crash on login (case {i})",
+        "suggested_solution": "Clear the local cache, reinstall the latest build and re-authenticate",
+        "admin_comments": "Follow up within 24h" if i % 5 == 0 else "",
+    } for i in range(count)]
+
+
+def best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=None, help="git revision with the previous implementations")
+    args = parser.parse_args()
+
+    rev = args.baseline or baseline_rev()
+    legacy_email = load_legacy(rev, "support_ai/email_service.py", "legacy_email_service").EmailService()
+    legacy_reports_module = load_legacy(rev, "utils/report_sender.py", "legacy_report_sender")
+    legacy_reports_module.datetime = FrozenDatetime
+    legacy_reports = legacy_reports_module.ReportGenerator({})
+    email, reports = EmailService(), ReportGenerator({})
+    tickets = make_tickets(args.tickets)
+
+    for i, ticket in enumerate(tickets[:50]):
+        note = "Please review" if i % 2 else None
+        for critical in (False, True):
+            assert email._get_html_template("Title", ticket, note, critical) == \
+                legacy_email._get_html_template("Title", ticket, note, critical), "email output differs"
+        assert reports.generate_ticket_report(ticket, TIMESTAMP) == legacy_reports.generate_ticket_report(ticket), \
+            "report output differs"
+    print(f"Outputs identical to {rev} for 50 tickets\n")
+
+    cases = [
+        ("email body", lambda: [legacy_email._get_html_template("Ticket Update", t, "note") for t in tickets],
+         lambda: [email._get_html_template("Ticket Update", t, "note") for t in tickets]),
+        ("report, one at a time", lambda: [legacy_reports.generate_ticket_report(t) for t in tickets],
+         lambda: [reports.generate_ticket_report(t) for t in tickets]),
+        ("reports, one batch", lambda: [legacy_reports.generate_ticket_report(t) for t in tickets],
+         lambda: reports.generate_ticket_reports(tickets)),
+        ("combined report", None, lambda: reports.generate_combined_report(tickets)),
+    ]
+    print(f"{'':<24}{'previous':>12}{'compiled':>12}{'speedup':>10}   ({args.tickets} tickets, best of {args.repeat})")
+    for label, old, new in cases:
+        new_seconds = best_of(args.repeat, new)
+        if old is None:
+            print(f"{label:<24}{'-':>12}{new_seconds * 1e6 / args.tickets:>10.1f}us")
+            continue
+        old_seconds = best_of(args.repeat, old)
+        print(f"{label:<24}{old_seconds * 1e6 / args.tickets:>10.1f}us{new_seconds * 1e6 / args.tickets:>10.1f}us"
+              f"{old_seconds / new_seconds:>9.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""Pre-fork serving mode for api.py.
+
+The parent process loads the historical data and builds the similarity indexes
+once (by importing api), freezes the GC so those objects are never rewritten,
+and then forks N workers that accept on one shared listening socket. Workers
+share the read-only data copy-on-write, so memory stays roughly flat as
+workers are added. Use tools/worker_rss.py to check per-worker memory.
+
+Any worker may accept any request, so chat sessions and the chat event bus
+(SSE streams) are kept in a SQLite file all workers share (SHARED_STATE_DB,
+default --shared-state). Per-process caches (speculative analysis, semantic
+cache) still work, per worker; they just hit less often.
+
+Usage: python serve_prefork.py [--workers 4] [--host 0.0.0.0] [--port 5000] [--shared-state PATH]
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+from werkzeug.serving import make_server
+
+
+def serve_worker(app, host: str, port: int, fd: int) -> None:
+    # Restore default signal handling inherited from the parent
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    server = make_server(host, port, app, threaded=True, fd=fd)
+    logging.info(f"Worker {os.getpid()} serving on {host}:{port}")
+    server.serve_forever()
+
+
+def spawn_worker(app, host: str, port: int, fd: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        try:
+            serve_worker(app, host, port, fd)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--pid-file", help="write the parent PID here (for tools/worker_rss.py)")
+    parser.add_argument("--shared-state", help="SQLite file for chat sessions and events shared by the workers "
+                                               "(default SHARED_STATE_DB, else autotriage-<port>.sqlite3 in the temp dir)")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        print("Pre-fork mode needs os.fork(); run 'python api.py' on this platform instead.")
+        return 1
+
+    # Set before api is imported; the stores open their connections lazily, in the workers
+    os.environ["SHARED_STATE_DB"] = (args.shared_state or os.environ.get("SHARED_STATE_DB")
+                                     or os.path.join(tempfile.gettempdir(), f"autotriage-{args.port}.sqlite3"))
+
+    # Loads the historical data and builds the shared indexes in the parent
+    import api
+    if not api.pipeline:
+        print(f"FATAL: AutoTriage.AI backend could not start: {api.startup_error}")
+        return 1
+
+    # Move everything allocated so far out of the collector's reach, so GC passes
+    # in the workers don't touch (and copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(128)
+    sock.set_inheritable(True)
+
+    if args.pid_file:
+        with open(args.pid_file, "w") as f:
+            f.write(str(os.getpid()))
+
+    workers = {spawn_worker(api.app, args.host, args.port, sock.fileno()) for _ in range(args.workers)}
+    logging.info(f"Pre-fork parent {os.getpid()} started {len(workers)} workers on {args.host}:{args.port}")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            logging.warning(f"Worker {pid} exited with status {status}; restarting")
+            time.sleep(0.5)
+            workers.add(spawn_worker(api.app, args.host, args.port, sock.fileno()))
+
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
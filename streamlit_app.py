@@ -3,6 +3,10 @@ import pandas as pd
 from support_ai.pipeline import SupportPipeline
 from support_ai.email_service import EmailService
 from support_ai.data_loader import TicketDataLoader
+from support_ai.analyzer import is_cacheable
+from support_ai.drafts import attach_draft, draft_fingerprint, stored_draft
+from support_ai.digest import get_digest_log
+from support_ai.tickets import resolve_ticket, update_ticket
 import plotly.graph_objects as go
 import time
 import os
@@ -44,7 +48,7 @@ def load_data():
 def load_submitted_tickets():
     """Loads submitted tickets from the ticket_results directory."""
     tickets = []
-    results_dir = "ticket_results"
+    results_dir = os.environ.get("TICKET_RESULTS_DIR", "ticket_results")
     
     if not os.path.exists(results_dir):
         return []
@@ -64,14 +68,19 @@ def load_submitted_tickets():
             
     return tickets
 
+@st.cache_resource
+def get_pipeline():
+    # One pipeline (and its background workers) per Streamlit server
+    return SupportPipeline()
+
 def analyze_conversation(conversation_text, historical_data):
-    pipeline = SupportPipeline()
+    pipeline = get_pipeline()
     return pipeline.process(
         chat_text=conversation_text,
         ticket_data=historical_data
     )
 
-def display_metrics(result):
+def display_metrics(result, elapsed):
     col1, col2, col3 = st.columns(3)
     
     with col1:
@@ -79,8 +88,7 @@ def display_metrics(result):
     with col2:
         st.metric("Similar Cases Found", len(result.get('similar_cases', [])))
     with col3:
-        # Assuming we track processing time
-        st.metric("Processing Time", "< 1 sec")
+        st.metric("Processing Time", f"{elapsed:.2f} sec")
 
 def main():
     # Sidebar
@@ -158,13 +166,15 @@ Customer: "Upgrading worked! Thanks for the quick fix!"
                 progress_bar.progress(i + 1)
             
             # Process the conversation
+            start = time.perf_counter()
             result = analyze_conversation(conversation_text, historical_data)
+            elapsed = time.perf_counter() - start
             
             # Display results
             st.success("Analysis completed!")
             
             # Metrics
-            display_metrics(result)
+            display_metrics(result, elapsed)
             
             # Results in tabs
             tab1, tab2, tab3 = st.tabs(["📊 Analysis", "🔍 Similar Cases", "📈 Insights"])
@@ -262,6 +272,9 @@ Customer: "Upgrading worked! Thanks for the quick fix!"
                     m1.metric("Priority", ticket.get('priority_level', 'N/A'))
                     m2.metric("Team", ticket.get('assigned_team', 'Technical'))
                     m3.metric("Confidence", f"{ticket.get('confidence_score', 0.0):.2f}")
+                    if ticket.get('partial'):
+                        st.warning(f"⏳ Provisional analysis (fallbacks for: {', '.join(ticket.get('degraded_stages', []))}). "
+                                   "It is refined in the background; refresh to see the update.")
                     
                     st.divider()
                     
@@ -291,20 +304,25 @@ Customer: "Upgrading worked! Thanks for the quick fix!"
                         
                         col_draft, col_send = st.columns([1, 1])
                         with col_draft:
-                            if st.button("✨ Generate AI Draft", key=f"draft_{ticket.get('ticket_id')}"):
+                            ready_draft = stored_draft(ticket)
+                            if st.button("✨ Use AI Draft" if ready_draft else "✨ Generate AI Draft", key=f"draft_{ticket.get('ticket_id')}"):
+                                if ready_draft:
+                                    # Pre-generated in the background when the ticket was saved
+                                    st.session_state[f"note_{ticket.get('ticket_id')}"] = ready_draft
+                                    st.rerun()
                                 with st.spinner("Drafting response..."):
                                     try:
-                                        # We need to call the pipeline directly or via API if separate. 
-                                        # Since streamlit imports pipeline, we can use it directly if initialized?
-                                        # But api.py initializes it. Streamlit also initializes it in load_data/analyze?
-                                        # Streamlit initializes a NEW pipeline instance in analyze_conversation.
-                                        # Let's instantiate a temporary analyzer or reuse one.
-                                        # Better: call the analyzer from the pipeline imported.
-                                        
-                                        # Note: Creating a new pipeline instance might be heavy. 
-                                        # But for this demo let's assume valid env vars.
-                                        temp_pipeline = SupportPipeline()
-                                        draft = temp_pipeline.analyzer.generate_email_draft(ticket)
+                                        fingerprint = draft_fingerprint(ticket)
+                                        draft = get_pipeline().analyzer.generate_email_draft(ticket)
+                                        def keep_draft(stored):
+                                            # Not if the solution changed (e.g. an upgrade) while drafting
+                                            if draft_fingerprint(stored) != fingerprint:
+                                                return False
+                                            attach_draft(stored, draft, fingerprint)
+                                            return True
+                                        # Keep it with the ticket so the next visit is instant (not error text)
+                                        if is_cacheable(draft):
+                                            update_ticket(ticket['file_path'], keep_draft)
                                         st.session_state[f"note_{ticket.get('ticket_id')}"] = draft
                                         st.rerun()
                                     except Exception as e:
@@ -330,8 +348,12 @@ Customer: "Upgrading worked! Thanks for the quick fix!"
                     if st.button("✅ Mark as Resolved", key=f"resolve_{ticket.get('ticket_id')}"):
                         try:
                             # Move file to a 'resolved' folder or just delete for now
-                            # For safety in this demo, we'll rename it
-                            os.rename(ticket['file_path'], ticket['file_path'] + ".resolved")
+                            # For safety in this demo, we'll rename it (under the ticket lock, so a
+                            # background upgrade or draft can't write it back)
+                            resolve_ticket(ticket['file_path'])
+                            digest_log = get_digest_log()
+                            if digest_log is not None:
+                                digest_log.record_resolved(ticket)
                             st.balloons() # Confetti celebration!
                             st.success(f"Ticket {ticket.get('ticket_id')} resolved!")
                             time.sleep(1.5) # Let the balloons finish
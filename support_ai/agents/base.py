@@ -1,36 +1,35 @@
 from abc import ABC, abstractmethod
-import google.generativeai as genai
-import warnings
-
-# Suppress the "google.generativeai" deprecation warning
-warnings.filterwarnings("ignore", category=FutureWarning, module="google.generativeai")
-import os
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+from ..hooks import HOOKS
+from ..llm.client import MissingAPIKeyError, get_client
+from ..metrics import span
 
 class BaseAgent(ABC):
+    # Stage hook registry; subscribe to observe every agent run and model call
+    hooks = HOOKS
+    # Keys process() reads from its input and writes to its output; the
+    # orchestrator (support_ai.agents.orchestrator) wires agents together by them
+    inputs: Tuple[str, ...] = ()
+    optional_inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+
     def __init__(self):
-        if "GEMINI_API_KEY" not in os.environ:
-            # Fallback or warning could be added here, but raising helps debug
-            pass 
-        else:
-            genai.configure(api_key=os.environ["GEMINI_API_KEY"])
-            self.model = genai.GenerativeModel('gemma-3-4b-it')
+        # All agents share the process-wide model client (and its in-flight coalescing)
+        self.client = get_client()
 
-    def query_gemini(self, prompt: str) -> str:
+    def query_gemini(self, prompt: str, task: str = None) -> str:
         try:
-            if not hasattr(self, 'model'):
-                # Try to init again if somehow skipped or for safety
-                if "GEMINI_API_KEY" in os.environ:
-                    genai.configure(api_key=os.environ["GEMINI_API_KEY"])
-                    self.model = genai.GenerativeModel('gemma-3-4b-it')
-                else:
-                    return "Error: GEMINI_API_KEY not found."
-            
-            response = self.model.generate_content(prompt)
-            return response.text
+            return self.client.generate(prompt, task=task)
+        except MissingAPIKeyError:
+            return "Error: GEMINI_API_KEY not found."
         except Exception as e:
             return f"Error querying Gemini: {str(e)}"
 
+    def run(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """process() wrapped in a timed stage, announced to the stage hooks"""
+        with span(f"agent.{type(self).__name__}"):
+            return self.process(input_data)
+
     @abstractmethod
     def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        pass
\ No newline at end of file
+        pass
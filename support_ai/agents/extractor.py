@@ -2,8 +2,11 @@ from .base import BaseAgent
 from typing import Dict, Any
 
 class IssueExtractorAgent(BaseAgent):
+    inputs = ("chat_text",)
+    outputs = ("extracted_issue",)
+
     def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         chat_text = input_data['chat_text']
         prompt = f"""Extract the main issue described in this conversation:\n\n{chat_text}\n\nIssue:"""
-        issue = self.query_gemini(prompt)
+        issue = self.query_gemini(prompt, task="issue")
         return {"extracted_issue": issue.strip()}
\ No newline at end of file
@@ -0,0 +1,191 @@
+"""Run agents as a dependency graph.
+
+Each agent declares the keys it reads (`inputs`) and writes (`outputs`); an
+agent depends on whichever agents produce its inputs, and everything else is
+supplied by the caller. Agents run as soon as their inputs exist, so
+independent agents (the summarizer and the extractor, say) overlap instead of
+adding up, and a new agent only adds latency along its own dependency chain.
+
+Outputs are memoized per conversation and keyed by the content of the agent's
+inputs, so re-running a conversation recomputes only the agents whose inputs
+changed. An agent whose inputs can't be fingerprinted is not memoized.
+"""
+import contextvars
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional
+
+from ..analyzer import StageMemo
+from ..similarity import data_version
+from .base import BaseAgent
+from .extractor import IssueExtractorAgent
+from .recommender import RecommenderAgent
+from .summarizer import SummarizerAgent
+
+# Prefixes of the fallback strings BaseAgent.query_gemini returns; never memoize these
+AGENT_ERRORS = ("Error:", "Error querying")
+
+
+def _usable(outputs: Dict[str, Any]) -> bool:
+    return not any(isinstance(value, str) and value.startswith(AGENT_ERRORS) for value in outputs.values())
+
+
+class _Unhashable(Exception):
+    """An input has no content fingerprint; the agent runs without memoization"""
+
+
+def _fingerprint(value: Any) -> Hashable:
+    if isinstance(value, str):
+        return hashlib.sha256(value.encode("utf-8")).hexdigest()
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, dict) and value.get("version") is not None and "issues" in value:
+        # Historical data from TicketDataLoader: the version changes whenever its rows do
+        return data_version(value)
+    try:
+        encoded = json.dumps(value, sort_keys=True)
+    except (TypeError, ValueError) as e:
+        raise _Unhashable(str(e)) from e
+    return (type(value).__name__, hashlib.sha256(encoded.encode("utf-8")).hexdigest())
+
+
+@dataclass
+class DagRun:
+    outputs: Dict[str, Any]
+    # agent name -> {"seconds", "started" (offset into the run), "reused"}
+    timings: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+
+class AgentOrchestrator:
+    def __init__(self, agents: List[BaseAgent], max_workers: int = 8, max_conversations: int = 1000):
+        self.agents = {type(agent).__name__: agent for agent in agents}
+        if len(self.agents) != len(agents):
+            raise ValueError("Agents must be of distinct types")
+        self.producers: Dict[str, str] = {}
+        for name, agent in self.agents.items():
+            for key in agent.outputs:
+                if key in self.producers:
+                    raise ValueError(f"'{key}' is produced by both {self.producers[key]} and {name}")
+                self.producers[key] = name
+        self.dependencies = {
+            name: {self.producers[key] for key in agent.inputs if key in self.producers}
+            for name, agent in self.agents.items()
+        }
+        # Keys nobody produces must come from the caller
+        self.required_inputs = {key for agent in self.agents.values() for key in agent.inputs
+                                if key not in self.producers}
+        self._check_acyclic()
+        self.max_conversations = max_conversations
+        # Threads start lazily on first submit, so a pre-fork parent never owns any
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent")
+        self._memos: "OrderedDict[str, StageMemo]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"runs": 0, "nodes_run": 0, "nodes_reused": 0, "failed": 0}
+
+    def _check_acyclic(self) -> None:
+        done, visiting = set(), set()
+
+        def visit(name: str, path: List[str]) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Agent dependency cycle: {' -> '.join(path + [name])}")
+            visiting.add(name)
+            for dependency in self.dependencies[name]:
+                visit(dependency, path + [name])
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.agents:
+            visit(name, [])
+
+    def _memo(self, conversation_id: Optional[str]) -> Optional[StageMemo]:
+        if not conversation_id:
+            return None
+        with self._lock:
+            memo = self._memos.get(conversation_id)
+            if memo is None:
+                memo = self._memos[conversation_id] = StageMemo()
+                while len(self._memos) > self.max_conversations:
+                    self._memos.popitem(last=False)
+            self._memos.move_to_end(conversation_id)
+            return memo
+
+    def discard(self, conversation_id: str) -> None:
+        with self._lock:
+            self._memos.pop(conversation_id, None)
+
+    def _run_node(self, name: str, context: Dict[str, Any], memo: Optional[StageMemo], start: float) -> Dict[str, Any]:
+        agent = self.agents[name]
+        node_input = {key: context[key] for key in agent.inputs}
+        node_input.update({key: context[key] for key in agent.optional_inputs if key in context})
+        started = time.perf_counter()
+        reused = True
+
+        def compute() -> Dict[str, Any]:
+            nonlocal reused
+            reused = False
+            return agent.run(node_input)
+
+        try:
+            key = tuple(sorted((k, _fingerprint(v)) for k, v in node_input.items())) if memo is not None else None
+        except _Unhashable:
+            key = None
+        if key is None:
+            outputs = compute()
+        else:
+            outputs = memo.get_or_compute(name, key, compute, cacheable=_usable)
+        finished = time.perf_counter()
+        return {"outputs": outputs, "timing": {"seconds": round(finished - started, 6),
+                                               "started": round(started - start, 6), "reused": reused}}
+
+    def run(self, input_data: Dict[str, Any], conversation_id: str = None) -> DagRun:
+        """Run every agent once, each as soon as its inputs are available"""
+        missing = self.required_inputs - input_data.keys()
+        if missing:
+            raise ValueError(f"Missing inputs: {', '.join(sorted(missing))}")
+        memo = self._memo(conversation_id)
+        start = time.perf_counter()
+        context = dict(input_data)
+        timings: Dict[str, Dict[str, Any]] = {}
+        remaining = dict(self.dependencies)
+        running = {}
+        try:
+            while remaining or running:
+                ready = [name for name, deps in remaining.items() if deps <= timings.keys()]
+                for name in ready:
+                    del remaining[name]
+                    # Nodes run in a copy of the caller's context, so priority and deadline scopes carry over
+                    future = self._executor.submit(contextvars.copy_context().run, self._run_node,
+                                                   name, dict(context), memo, start)
+                    running[future] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    result = future.result()
+                    context.update(result["outputs"])
+                    timings[name] = result["timing"]
+        except Exception:
+            with self._lock:
+                self.counters["failed"] += 1
+            raise
+        with self._lock:
+            self.counters["runs"] += 1
+            self.counters["nodes_reused"] += sum(timing["reused"] for timing in timings.values())
+            self.counters["nodes_run"] += sum(not timing["reused"] for timing in timings.values())
+        return DagRun(outputs=context, timings=timings, elapsed=round(time.perf_counter() - start, 6))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.counters, "conversations": len(self._memos)}
+
+
+def default_orchestrator(**kwargs) -> AgentOrchestrator:
+    """Extractor -> recommender, with the summarizer alongside"""
+    return AgentOrchestrator([IssueExtractorAgent(), SummarizerAgent(), RecommenderAgent()], **kwargs)
@@ -1,65 +1,62 @@
 from .base import BaseAgent
 from typing import Dict, Any, List, Tuple
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from ..similarity import get_index
 
 class RecommenderAgent(BaseAgent):
-    def __init__(self):
+    inputs = ("extracted_issue", "ticket_data")
+    optional_inputs = ("top_k", "min_score")
+    outputs = ("suggested_solution", "confidence_score", "similar_cases")
+
+    def __init__(self, k: int = 3, min_score: float = 0.0):
         super().__init__()
-        self.vectorizer = TfidfVectorizer()
-        
+        self.k = k
+        self.min_score = min_score
+
+    def find_similar_cases(self, current_issue: str, historical_data: Dict[str, List[str]],
+                           k: int = None, min_score: float = None) -> List[Tuple[int, float]]:
+        """Top-k (row, score) neighbours of the issue against the shared prefit index"""
+        index = get_index(historical_data)
+        return index.top_k(
+            current_issue,
+            k=self.k if k is None else k,
+            min_score=self.min_score if min_score is None else min_score
+        )
+
     def find_similar_solution(self, current_issue: str, historical_data: Dict[str, List[str]]) -> Tuple[str, float]:
-        # Combine historical issues with their context
-        historical_contexts = [
-            f"{issue} ({sentiment}, {priority})"
-            for issue, sentiment, priority in zip(
-                historical_data['issues'],
-                historical_data['sentiments'],
-                historical_data['priorities']
-            )
-        ]
-        
-        # Add current issue to the list for vectorization
-        all_texts = historical_contexts + [current_issue]
-        
-        # Calculate TF-IDF vectors
-        tfidf_matrix = self.vectorizer.fit_transform(all_texts)
-        
-        # Calculate similarity scores
-        similarities = cosine_similarity(
-            tfidf_matrix[-1:],  # Current issue vector
-            tfidf_matrix[:-1]   # Historical issues vectors
-        )[0]
-        
-        # Find best match and round confidence score
-        best_idx = np.argmax(similarities)
-        confidence = round(float(similarities[best_idx]), 2)
-        
-        return historical_data['solutions'][best_idx], confidence
+        neighbours = self.find_similar_cases(current_issue, historical_data, k=1, min_score=0.0)
+        if not neighbours:
+            return "No solution provided", 0.0
+        best_idx, score = neighbours[0]
+        return historical_data['solutions'][best_idx], round(score, 2)
 
     def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         issue = input_data['extracted_issue']
         historical_data = input_data['ticket_data']
-        
-        solution, confidence = self.find_similar_solution(issue, historical_data)
-        
-        # Get top 3 similar cases
+
+        neighbours = self.find_similar_cases(
+            issue, historical_data,
+            k=input_data.get('top_k'),
+            min_score=input_data.get('min_score')
+        )
+
         similar_cases = [
             {
                 "issue": historical_data['issues'][i],
                 "solution": historical_data['solutions'][i],
                 "sentiment": historical_data['sentiments'][i],
-                "priority": historical_data['priorities'][i]
+                "priority": historical_data['priorities'][i],
+                "similarity": round(score, 2)
             }
-            for i in range(min(3, len(historical_data['issues'])))
+            for i, score in neighbours
         ]
-        
+
+        if similar_cases:
+            solution, confidence = similar_cases[0]["solution"], similar_cases[0]["similarity"]
+        else:
+            solution, confidence = self.find_similar_solution(issue, historical_data)
+
         return {
             "suggested_solution": solution,
             "confidence_score": confidence,
             "similar_cases": similar_cases
         }
-
-
-
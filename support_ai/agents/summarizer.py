@@ -2,8 +2,11 @@ from .base import BaseAgent
 from typing import Dict, Any
 
 class SummarizerAgent(BaseAgent):
+    inputs = ("chat_text",)
+    outputs = ("summary",)
+
     def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         chat_text = input_data['chat_text']
         prompt = f"""Summarize this customer support conversation in 1-2 lines:\n\n{chat_text}"""
-        summary = self.query_gemini(prompt)
+        summary = self.query_gemini(prompt, task="summary")
         return {"summary": summary.strip()}
\ No newline at end of file
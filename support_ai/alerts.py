@@ -0,0 +1,67 @@
+"""Automatic email alerts for urgent tickets and feature requests.
+
+Used when a ticket is saved (/submit_ticket) and again when a background
+upgrade of a provisional analysis raises its priority, so a ticket that only
+turns out to be Critical or High after the upgrade still alerts someone.
+"""
+import logging
+from typing import Any, Dict
+
+from .email_service import EmailService
+from .metrics import span
+
+ALERT_RECIPIENT = "prashik2927@gmail.com"  # Explicitly requested by user
+ALERT_PRIORITIES = ("Critical", "High")
+FEATURE_KEYWORDS = ["new feature", "feature request", "add feature", "enhancement", "suggest a feature",
+                    "idea for app"]
+_PRIORITY_RANK = {"Low": 0, "Medium": 1, "High": 2, "Critical": 3}
+
+
+def is_new_feature(ticket: Dict[str, Any], conversation_text: str = "") -> bool:
+    # Also check the raw conversation just in case
+    texts = (str(ticket.get('extracted_issue', '')).lower(), str(ticket.get('summary', '')).lower(),
+             conversation_text.lower())
+    return any(kw in text for text in texts for kw in FEATURE_KEYWORDS)
+
+
+def alert_note(ticket: Dict[str, Any], conversation_text: str = "") -> str:
+    """The alert note for a ticket, or "" if it doesn't call for one"""
+    priority = str(ticket.get('priority_level', '')).title()  # Ensure Title Case (High, Critical)
+    new_feature = is_new_feature(ticket, conversation_text)
+    logging.info(f"Auto-Email Check: Priority={priority}, NewFeature={new_feature}")
+    if priority == 'Critical':
+        return "Auto-Trigger: Critical Priority"
+    reason = []
+    if priority == 'High': reason.append("High Priority")
+    if new_feature: reason.append("Potential New Feature Request")
+    return f"Auto-Notification Trigger: {', '.join(reason)}" if reason else ""
+
+
+def send_alert(ticket: Dict[str, Any], note: str) -> bool:
+    """Email the alert; failures are logged, never raised"""
+    try:
+        with span("email_send"):
+            success, message = EmailService().send_email(ticket, note=note, recipient=ALERT_RECIPIENT)
+        if success:
+            logging.info(f"Auto-email sent to {ALERT_RECIPIENT}")
+        else:
+            logging.error(f"Could not send email alert: {message}")
+        return success
+    except Exception as e:
+        logging.error(f"Could not send email alert: {e}")
+        return False
+
+
+def alert_ticket(ticket: Dict[str, Any], conversation_text: str = "") -> bool:
+    """Send the auto-alert for a newly saved ticket if its priority or content calls for one"""
+    note = alert_note(ticket, conversation_text)
+    return send_alert(ticket, note) if note else False
+
+
+def escalation_note(previous_priority: Any, ticket: Dict[str, Any]) -> str:
+    """Alert note when a re-analysis raised the priority into the alert set, else \"\" """
+    previous = str(previous_priority or '').title()
+    priority = str(ticket.get('priority_level', '')).title()
+    if priority not in ALERT_PRIORITIES or _PRIORITY_RANK.get(priority, 0) <= _PRIORITY_RANK.get(previous, 0):
+        return ""
+    return f"Auto-Trigger: {priority} Priority (escalated from {previous or 'unknown'} after full analysis)"
@@ -1,16 +1,16 @@
+from contextlib import nullcontext
 from dataclasses import dataclass, asdict
-from typing import List, Dict, Any
-import os
-import google.generativeai as genai
-import logging
-import warnings
-
-# Suppress the "google.generativeai" deprecation warning
-warnings.filterwarnings("ignore", category=FutureWarning, module="google.generativeai")
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from typing import List, Dict, Any, Callable, Hashable, Tuple
+import hashlib
 import logging
+import threading
+from .similarity import data_version, get_index, get_pairwise
+from .llm.client import MissingAPIKeyError, get_client
+from .llm.scheduler import current_priority, priority_scope
+from .semantic_cache import get_semantic_cache
+from .deadline import Deadline, deadline_scope, run_within
+from .hooks import HOOKS
+from .metrics import REGISTRY, span
 
 logging.basicConfig(level=logging.INFO)
 
@@ -26,28 +26,112 @@ class AnalysisResult:
     similar_cases: List[Dict] = None
     action_items: List[str] = None
     sentiment: str = "Neutral"
+    # True when some model stages missed the deadline or failed and were filled in by fallbacks
+    partial: bool = False
+    degraded_stages: List[str] = None
+
+# Fallback strings returned by query_llm; never cache these
+ERROR_RESPONSES = ("Error:", "Could not generate a response")
+
+DEGRADED_STAGES = REGISTRY.counter("support_ai_degraded_stages_total",
+                                   "Model stages replaced by a fallback (deadline missed or backend error)")
+
+NEGATIVE_WORDS = ('angry', 'frustrat', 'terrible', 'unacceptable', 'ridiculous', 'worst', 'annoy', 'disappoint')
+POSITIVE_WORDS = ('thank', 'great', 'perfect', 'works now', 'resolved', 'appreciate')
+
+def is_cacheable(result: str) -> bool:
+    return bool(result) and not result.startswith(ERROR_RESPONSES)
+
+def customer_messages(conversation: str) -> List[str]:
+    messages = [line[len("User:"):].strip() for line in conversation.splitlines() if line.startswith("User:")]
+    return messages or [conversation.strip()]
+
+def customer_transcript(conversation: str) -> str:
+    """Only the customer's turns (continuation lines included), or the whole text if none are marked"""
+    lines, keep = [], False
+    for line in conversation.splitlines():
+        if line.startswith(("User:", "Agent:")):
+            keep = line.startswith("User:")
+        if keep:
+            lines.append(line)
+    return "\n".join(lines) if lines else conversation
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+class StageMemo:
+    """Results of an earlier analysis of one conversation, keyed by stage.
+
+    A stage is reused only while its inputs are unchanged, so re-analyzing a
+    conversation that grew by a turn recomputes just the stages that depend on it.
+    """
 
-class TicketAnalyzer:
     def __init__(self):
-        self.vectorizer = TfidfVectorizer()
+        self._stages: Dict[str, Tuple[Hashable, Any]] = {}
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.computed = 0
+
+    def get_or_compute(self, stage: str, key: Hashable, compute: Callable[[], Any],
+                       cacheable: Callable[[Any], bool] = None) -> Any:
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is not None and entry[0] == key:
+                self.reused += 1
+                return entry[1]
+        value = compute()
+        with self._lock:
+            self.computed += 1
+            # Fallback error strings are retried next time rather than remembered
+            if cacheable is not None:
+                remember = cacheable(value)
+            else:
+                remember = not isinstance(value, str) or is_cacheable(value)
+            if remember:
+                self._stages[stage] = (key, value)
+        return value
+
+    def view(self) -> "StageMemo":
+        """A memo over the same stages whose reused/computed count only its own lookups"""
+        view = StageMemo.__new__(StageMemo)
+        view._stages, view._lock = self._stages, self._lock
+        view.reused = view.computed = 0
+        return view
+
+class TicketAnalyzer:
+    """Stateless ticket analysis.
+
+    An analyzer instance is shared by all request threads, so it holds no
+    per-request state: shared similarity indexes are immutable once built
+    (see support_ai.similarity) and every analysis works on local variables only.
+
+    Each stage (model call per task, similarity search, rules) is announced to
+    the `hooks` registry before and after it runs.
+    """
 
-    def query_llm(self, prompt: str) -> str:
+    hooks = HOOKS
+
+    def query_llm(self, prompt: str, task: str = None) -> str:
         try:
-            if "GEMINI_API_KEY" not in os.environ:
-                logging.error("GEMINI_API_KEY not found.")
-                return "Error: GEMINI_API_KEY not set."
-            
-            genai.configure(api_key=os.environ["GEMINI_API_KEY"])
-            model = genai.GenerativeModel('gemma-3-4b-it')
-            logging.info(f"Querying model 'gemma-3-4b-it'...")
-            
-            response = model.generate_content(prompt)
+            text = get_client().generate(prompt, task=task)
             logging.info("Successfully received response from model.")
-            return response.text.strip()
+            return text.strip()
+        except MissingAPIKeyError:
+            logging.error("GEMINI_API_KEY not found.")
+            return "Error: GEMINI_API_KEY not set."
         except Exception as e:
             logging.error(f"Error in query_llm: {e}")
             return "Could not generate a response due to a backend error."
 
+    def query_cached(self, task: str, conversation: str, prompt: str) -> str:
+        """query_llm behind the semantic cache for near-duplicate conversations"""
+        cache = get_semantic_cache()
+        if cache is None:
+            return self.query_llm(prompt, task=task)
+        return cache.get_or_compute(task, conversation, lambda: self.query_llm(prompt, task=task),
+                                    cacheable=is_cacheable)
+
     def generate_solution(self, conversation_text: str) -> str:
         prompt = f"""
 You are a detailed-oriented Support Agent.
@@ -63,13 +147,13 @@ Conversation History:
 ---
 Your Response:
         """
-        return self.query_llm(prompt)
+        return self.query_llm(prompt, task="chat")
 
     def generate_summary(self, conversation: str) -> str:
         prompt = f"""Summarize this support chat in one sentence:
 
 {conversation}"""
-        return self.query_llm(prompt)
+        return self.query_cached("summary", conversation, prompt)
     def derive_technical_solution(self, conversation: str) -> str:
         prompt = f"""Review the technical support conversation below.
 Extract and summarize the technical solution that was proposed or the recommended next steps to fix the issue.
@@ -77,13 +161,13 @@ Do NOT reply as a chat agent. Just state the solution clearly.
 
 Conversation:
 {conversation}"""
-        return self.query_llm(prompt)
+        return self.query_cached("solution", conversation, prompt)
 
     def extract_issue(self, conversation: str) -> str:
         prompt = f"""What is the single main technical problem related to the software product in this chat? Be specific and brief.
 
 {conversation}"""
-        return self.query_llm(prompt)
+        return self.query_cached("issue", conversation, prompt)
 
     def determine_priority(self, issue: str, sentiment: str) -> str:
         issue_lower = issue.lower()
@@ -104,31 +188,29 @@ Conversation:
         return 'Technical'
 
     def calculate_similarity(self, text1: Any, text2: Any) -> float:
+        return self.calculate_similarities([(text1, text2)])[0]
+
+    def calculate_similarities(self, pairs: List[Tuple[Any, Any]], historical_data: Dict = None) -> List[float]:
+        """Score many (text1, text2) pairs against the shared prefit vocabulary"""
         try:
-            text1, text2 = str(text1).lower().strip(), str(text2).lower().strip()
-            if not text1 or not text2: return 0.0
-            vectors = self.vectorizer.fit_transform([text1, text2])
-            return round(cosine_similarity(vectors[0:1], vectors[1:2])[0][0], 2)
-        except: return 0.0
+            scores = get_pairwise(historical_data).score_pairs(pairs)
+            return [round(float(score), 2) for score in scores]
+        except Exception as e:
+            logging.error(f"Error in calculate_similarities: {e}")
+            return [0.0] * len(pairs)
 
     def find_similar_cases(self, issue: str, historical_data: Dict) -> List[Dict]:
         if not historical_data or not historical_data.get('issues'): return []
-        self.vectorizer = TfidfVectorizer() # Re-initialize for fresh vocabulary
-        
-        all_issues = historical_data['issues'] + [issue]
-        tfidf_matrix = self.vectorizer.fit_transform(all_issues)
-        
-        similarities = cosine_similarity(tfidf_matrix[-1], tfidf_matrix[:-1])[0]
-        
-        top_indices = similarities.argsort()[-3:][::-1]
-        
+        with span("similarity_search"):
+            neighbours = get_index(historical_data).top_k(issue, k=3)
+
         similar_cases = []
-        for i in top_indices:
-            if similarities[i] > 0.1:
+        for i, score in neighbours:
+            if score > 0.1:
                 similar_cases.append({
                     "issue": historical_data['issues'][i],
                     "solution": historical_data['solutions'][i],
-                    "similarity": float(similarities[i])
+                    "similarity": score
                 })
         return similar_cases
 
@@ -136,7 +218,7 @@ Conversation:
         prompt = f"""Analyze the sentiment of the last customer message in this chat and respond with one word (Positive/Negative/Neutral):
 
 {conversation}"""
-        return self.query_llm(prompt)
+        return self.query_llm(prompt, task="sentiment")
 
     def calculate_confidence(self, similar_cases: List[Dict]) -> float:
         if not similar_cases: return 0.1 # Return a low base score if no matches
@@ -144,19 +226,88 @@ Conversation:
         confidence = 0.25 + (best_similarity * 0.7)
         return round(min(confidence, 0.95), 2)
 
-    def analyze_ticket(self, conversation: str, historical_data: Dict) -> AnalysisResult:
-        issue = self.extract_issue(conversation)
-        sentiment = self.analyze_sentiment(conversation)
-        priority = self.determine_priority(issue, sentiment)
-        team = self.determine_team(issue)
-        similar_cases = self.find_similar_cases(issue, historical_data)
-        confidence = self.calculate_confidence(similar_cases)
-        summary = self.generate_summary(conversation)
-        solution = self.derive_technical_solution(conversation) # Use dedicated solution extractor
-        
+    def fallback_issue(self, conversation: str) -> str:
+        return _clip(customer_messages(conversation)[0], 200)
+
+    def fallback_sentiment(self, conversation: str) -> str:
+        text = " ".join(customer_messages(conversation)).lower()
+        if any(word in text for word in NEGATIVE_WORDS): return 'Negative'
+        if any(word in text for word in POSITIVE_WORDS): return 'Positive'
+        return 'Neutral'
+
+    def fallback_summary(self, conversation: str) -> str:
+        return f"Customer reported: {_clip(customer_messages(conversation)[0], 160)}"
+
+    def fallback_solution(self, similar_cases: List[Dict], team: str) -> str:
+        # Best TF-IDF match from the historical tickets
+        if similar_cases:
+            return max(similar_cases, key=lambda case: case['similarity'])['solution']
+        return f"No automated solution yet; routed to the {team} team for review."
+
+    def _model_stages(self, stages: Dict[str, Callable[[], str]], deadline: Deadline = None) -> Dict[str, str]:
+        """Results of the stages that produced a usable answer; without a deadline
+        they run one after another in this thread, with one they run concurrently
+        and whatever is unfinished at the deadline is left out"""
+        if deadline is None:
+            results = {name: compute() for name, compute in stages.items()}
+        else:
+            results = run_within(stages, deadline)
+        return {name: value for name, value in results.items() if is_cacheable(value)}
+
+    def analyze_ticket(self, conversation: str, historical_data: Dict, memo: StageMemo = None,
+                       deadline: Deadline = None) -> AnalysisResult:
+        """Run every analysis stage; with a `memo` from an earlier run over the same
+        conversation, stages whose inputs did not change are reused.
+
+        Model stages that fail, or are still running when `deadline` passes, are
+        replaced by local fallbacks (first customer message, keyword sentiment and
+        priority, best historical match) and the result is marked partial.
+        """
+        def stage(name: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+            return memo.get_or_compute(name, key, compute) if memo is not None else compute()
+
+        def rules():
+            with span("rules"):
+                return self.determine_priority(issue, sentiment), self.determine_team(issue)
+
+        degraded = []
+        def settle(name: str, results: Dict[str, str], fallback: Callable[[], str]) -> str:
+            if name in results:
+                return results[name]
+            degraded.append(name)
+            DEGRADED_STAGES.inc(stage=name)
+            return fallback()
+
+        # Issue and sentiment are remembered per customer turns, so an agent reply alone doesn't
+        # re-run them; the model still reads the whole conversation
+        customer_key = hashlib.sha256(customer_transcript(conversation).encode("utf-8")).hexdigest()
+        text_key = hashlib.sha256(conversation.encode("utf-8")).hexdigest()
+        with deadline_scope(deadline) if deadline is not None else nullcontext():
+            results = self._model_stages({
+                "issue": lambda: stage("issue", customer_key, lambda: self.extract_issue(conversation)),
+                "sentiment": lambda: stage("sentiment", customer_key, lambda: self.analyze_sentiment(conversation)),
+            }, deadline)
+            issue = settle("issue", results, lambda: self.fallback_issue(conversation))
+            sentiment = settle("sentiment", results, lambda: self.fallback_sentiment(conversation))
+            priority, team = stage("rules", (issue, sentiment), rules)
+            history_key = (issue, data_version(historical_data or {}))
+            similar_cases = stage("similar_cases", history_key, lambda: self.find_similar_cases(issue, historical_data))
+            confidence = self.calculate_confidence(similar_cases)
+            # Once a live submission turns out Critical/High, its remaining model calls jump the queue
+            urgent = priority in ('Critical', 'High') and current_priority() is None
+            with priority_scope("critical") if urgent else nullcontext():
+                results = self._model_stages({
+                    "summary": lambda: stage("summary", text_key, lambda: self.generate_summary(conversation)),
+                    # Use dedicated solution extractor
+                    "solution": lambda: stage("solution", text_key, lambda: self.derive_technical_solution(conversation)),
+                }, deadline)
+            summary = settle("summary", results, lambda: self.fallback_summary(conversation))
+            solution = settle("solution", results, lambda: self.fallback_solution(similar_cases, team))
+
         return AnalysisResult(
             summary=summary, issue=issue, solution=solution, priority=priority,
-            team=team, confidence=confidence, similar_cases=similar_cases, sentiment=sentiment
+            team=team, confidence=confidence, similar_cases=similar_cases, sentiment=sentiment,
+            partial=bool(degraded), degraded_stages=degraded
         )
 
     def generate_email_draft(self, ticket_data: Dict) -> str:
@@ -173,4 +324,4 @@ Conversation:
         5. Sign off as "AutoTriage.AI Support Team".
         
         Draft:"""
-        return self.query_llm(prompt)
\ No newline at end of file
+        return self.query_llm(prompt, task="email_draft")
\ No newline at end of file
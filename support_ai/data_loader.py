@@ -1,10 +1,31 @@
 import pandas as pd
-from typing import Dict, List, Any
+import bisect
+import itertools
+from collections import defaultdict
+from typing import Dict, List, Any, Iterable, Union
 import logging
+import re
+
+# Process-wide, so a version never repeats even across loaders
+_versions = itertools.count(1)
+
+# Columns every loaded dataset has, and the value used where a row lacks one
+REQUIRED_COLUMNS = {
+    'Issue Category': 'Unknown Issue',
+    'Sentiment': 'Neutral',
+    'Priority': 'Medium',
+    'Solution': 'No solution provided',
+    'Resolution Status': 'Pending',
+    'Resolution Time': 24.0  # Default 24 hours
+}
 
 class TicketDataLoader:
     def __init__(self, file_path: str):
         self.logger = logging.getLogger(__name__)
+        # Changes whenever the rows change; get_training_data() passes it on so
+        # indexes built over the data (support_ai.similarity) know when to rebuild
+        self.version = next(_versions)
+        self.date_column = 'Date of Resolution'
         try:
             # Read the CSV file
             self.df = pd.read_csv(file_path)
@@ -30,6 +51,7 @@ class TicketDataLoader:
             
             # Convert date column if it exists
             if date_column:
+                self.date_column = date_column
                 try:
                     # Try multiple date formats
                     self.df[date_column] = pd.to_datetime(
@@ -47,26 +69,45 @@ class TicketDataLoader:
                 self.logger.warning("No date column found. Adding default dates.")
                 self.df['Date of Resolution'] = pd.Timestamp.now()
             
-            # Ensure all required columns exist
-            required_columns = {
-                'Issue Category': 'Unknown Issue',
-                'Sentiment': 'Neutral',
-                'Priority': 'Medium',
-                'Solution': 'No solution provided',
-                'Resolution Status': 'Pending',
-                'Resolution Time': 24.0  # Default 24 hours
-            }
-            
-            # Add missing columns with default values
-            for col, default_value in required_columns.items():
+            # Add missing required columns with default values
+            for col, default_value in REQUIRED_COLUMNS.items():
                 if col not in self.df.columns:
                     self.df[col] = default_value
             
         except Exception as e:
             self.logger.error(f"Error initializing TicketDataLoader: {str(e)}")
             # Create empty DataFrame with required columns
-            self.df = pd.DataFrame(columns=list(required_columns.keys()))
-            self.df.loc[0] = list(required_columns.values())
+            self.df = pd.DataFrame(columns=list(REQUIRED_COLUMNS.keys()))
+            self.df.loc[0] = list(REQUIRED_COLUMNS.values())
+
+        self._build_category_index()
+
+    @staticmethod
+    def normalize_category(category: Any) -> str:
+        """Normalize a category label for fuzzy matching ("Network-Connectivity issue " -> "network connectivity issue")"""
+        return re.sub(r"[^a-z0-9]+", " ", str(category).lower()).strip()
+
+    def _build_category_index(self) -> None:
+        """Build category -> row offset indexes once so lookups don't scan the DataFrame"""
+        self._category_index: Dict[str, List[int]] = defaultdict(list)
+        self._normalized_index: Dict[str, List[int]] = defaultdict(list)
+        # Sorted normalized keys: a prefix's matches are one contiguous range (bisect)
+        self._sorted_keys: List[str] = []
+        self._index_categories(self.df["Issue Category"].tolist(), start=0)
+
+    def _index_categories(self, categories: Iterable[Any], start: int) -> None:
+        new_keys = []
+        for offset, category in enumerate(categories, start):
+            self._category_index[category].append(offset)
+            key = self.normalize_category(category)
+            if key not in self._normalized_index:
+                new_keys.append(key)
+            self._normalized_index[key].append(offset)
+        if len(new_keys) > 64:
+            self._sorted_keys = sorted(self._normalized_index)
+        else:
+            for key in new_keys:
+                bisect.insort(self._sorted_keys, key)
     
     def get_training_data(self) -> Dict[str, List]:
         """Prepare historical data for the recommender system"""
@@ -77,7 +118,8 @@ class TicketDataLoader:
                 "priorities": self.df["Priority"].tolist(),
                 "solutions": self.df["Solution"].tolist(),
                 "resolution_times": self.df["Resolution Time"].tolist(),
-                "statuses": self.df["Resolution Status"].tolist()
+                "statuses": self.df["Resolution Status"].tolist(),
+                "version": self.version
             }
         except Exception as e:
             self.logger.error(f"Error preparing training data: {str(e)}")
@@ -88,11 +130,56 @@ class TicketDataLoader:
                 "priorities": [],
                 "solutions": [], 
                 "resolution_times": [], 
-                "statuses": []
+                "statuses": [],
+                "version": self.version
             }
     
-    def get_similar_cases(self, issue_category: str, limit: int = 3) -> List[Dict[str, Any]]:
-        """Get similar historical cases for a given issue category"""
-        similar_cases = self.df[self.df["Issue Category"] == issue_category].head(limit)
-        return similar_cases.to_dict('records')
+    def _lookup_offsets(self, issue_category: str, fuzzy: bool) -> List[int]:
+        offsets = self._category_index.get(issue_category)
+        if offsets or not fuzzy:
+            return offsets or []
+        key = self.normalize_category(issue_category)
+        offsets = self._normalized_index.get(key)
+        if offsets:
+            return offsets
+        # Prefix match on the normalized key, e.g. "network" -> "network connectivity issue"
+        if not key:
+            return []
+        # Normalized keys only hold [a-z0-9 ], so key + "\x7f" sorts after every key with that prefix
+        first = bisect.bisect_left(self._sorted_keys, key)
+        last = bisect.bisect_left(self._sorted_keys, key + "\x7f", first)
+        return sorted(row for name in self._sorted_keys[first:last] for row in self._normalized_index[name])
+
+    def get_similar_cases(self, issue_category: Union[str, List[str]], limit: int = 3, fuzzy: bool = False) -> List[Dict[str, Any]]:
+        """Get similar historical cases for a given issue category (or list of categories)"""
+        if isinstance(issue_category, (list, tuple, set)):
+            offsets = []
+            for category in issue_category:
+                offsets.extend(self._lookup_offsets(category, fuzzy)[:limit])
+        else:
+            offsets = self._lookup_offsets(issue_category, fuzzy)[:limit]
+        if not offsets:
+            return []
+        return self.df.iloc[offsets].to_dict('records')
+
+    def get_similar_cases_bulk(self, issue_categories: Iterable[str], limit: int = 3, fuzzy: bool = False) -> Dict[str, List[Dict[str, Any]]]:
+        """Get similar cases for many categories at once, keyed by the requested category"""
+        return {category: self.get_similar_cases(category, limit, fuzzy) for category in issue_categories}
 
+    def append_rows(self, rows: Union[pd.DataFrame, List[Dict[str, Any]]]) -> None:
+        """Append historical tickets and keep the category indexes in sync"""
+        new_rows = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(rows)
+        if new_rows.empty:
+            return
+        # Missing columns and values get the same defaults as a loaded CSV
+        new_rows = new_rows.reindex(columns=self.df.columns)
+        for col, default_value in REQUIRED_COLUMNS.items():
+            if col in new_rows.columns:
+                new_rows[col] = new_rows[col].fillna(default_value)
+        if self.date_column in new_rows.columns:
+            new_rows[self.date_column] = pd.to_datetime(new_rows[self.date_column], format='mixed', dayfirst=False,
+                                                        errors='coerce').fillna(pd.Timestamp.now())
+        start = len(self.df)
+        self.df = pd.concat([self.df, new_rows], ignore_index=True)
+        self._index_categories(new_rows["Issue Category"].tolist(), start=start)
+        self.version = next(_versions)
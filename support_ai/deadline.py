@@ -0,0 +1,85 @@
+"""Per-request latency budgets.
+
+A Deadline is set for a block with deadline_scope() and read by the model
+client, so model calls still waiting for admission give up once the budget
+is spent instead of running for a request that has already moved on.
+run_within() runs stages on a shared pool and stops waiting for them at the
+deadline; a stage that is already talking to the backend cannot be
+interrupted, its late result is simply not used by the request (it still
+lands in the semantic cache and stage memos for the next attempt).
+"""
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Deadline:
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires
+
+    def bound(self, timeout: Optional[float]) -> float:
+        """The smaller of a timeout and the time left"""
+        return self.remaining() if timeout is None else min(timeout, self.remaining())
+
+
+_deadline: contextvars.ContextVar = contextvars.ContextVar("support_ai_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[None]:
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _deadline.get()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _stage_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Threads start lazily on first submit, so a pre-fork parent never owns any
+            _executor = ThreadPoolExecutor(max_workers=int(os.environ.get("ANALYSIS_STAGE_WORKERS", 16)),
+                                           thread_name_prefix="stage")
+        return _executor
+
+
+def run_within(stages: Dict[str, Callable[[], Any]], deadline: Deadline) -> Dict[str, Any]:
+    """Run independent stages concurrently (each in a copy of the caller's context,
+    so priority and deadline scopes carry over); stages that have not finished
+    by the deadline are missing from the result"""
+    if deadline.expired:
+        return {}
+    executor = _stage_executor()
+    futures = {name: executor.submit(contextvars.copy_context().run, fn) for name, fn in stages.items()}
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result(timeout=deadline.remaining())
+        except FutureTimeout:
+            # Stops it only if it has not started; a running stage finishes unobserved
+            future.cancel()
+    return results
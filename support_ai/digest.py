@@ -0,0 +1,295 @@
+"""Running triage aggregates for hourly and daily digest reports.
+
+Writers (the API on ticket save and analysis upgrade, the dashboard on
+resolve) append one small JSON event per ticket change to a per-day log file.
+Appends from several processes (pre-fork workers, Streamlit) interleave
+safely, and nothing rescans ticket_results/.
+
+DigestStore folds only the events it has not seen yet into hourly buckets
+(counts by team, priority and sentiment, a confidence histogram and
+time-to-resolution stats) and persists the buckets with the log offsets it
+has consumed. A digest merges the 1 or 24 buckets of its window, so its cost
+does not depend on how many tickets exist.
+"""
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+CONFIDENCE_BINS = 10
+# Upper bounds (hours) of the time-to-resolution histogram; the last bin is open-ended
+RESOLUTION_BOUNDS = (1, 4, 8, 24, 48, 72, 168)
+CLASS_FIELDS = ("team", "priority", "sentiment")
+
+
+def ticket_created_at(ticket: Dict[str, Any]) -> Optional[float]:
+    """Epoch seconds a ticket was created, from created_at or the TICKET_YYYYmmdd_HHMMSS id"""
+    try:
+        if ticket.get("created_at"):
+            return datetime.fromisoformat(ticket["created_at"]).timestamp()
+        stamp = "_".join(str(ticket.get("ticket_id", "")).split("_")[1:3])
+        return datetime.strptime(stamp, "%Y%m%d_%H%M%S").timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _classes(ticket: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "team": ticket.get("assigned_team", "Unknown"),
+        "priority": str(ticket.get("priority_level", "Unknown")).title(),
+        "sentiment": str(ticket.get("sentiment", "Unknown")).title(),
+        "confidence": float(ticket.get("confidence_score") or 0.0),
+    }
+
+
+class DigestLog:
+    """Append-only ticket event log, one file per UTC day"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.counters = {"appended": 0, "failed": 0}
+
+    def append(self, event: Dict[str, Any]) -> None:
+        """Best effort: a full disk must not fail the ticket write that triggered the event"""
+        line = (json.dumps(event, separators=(",", ":")) + "\n").encode("utf-8")
+        path = os.path.join(self.directory, time.strftime("events-%Y%m%d.jsonl", time.gmtime(event["at"])))
+        try:
+            # One O_APPEND write per event, so lines from concurrent processes never interleave mid-line
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            logging.error(f"Could not record digest event: {e}")
+            with self._lock:
+                self.counters["failed"] += 1
+            return
+        with self._lock:
+            self.counters["appended"] += 1
+
+    def record_created(self, ticket: Dict[str, Any]) -> None:
+        now = time.time()
+        self.append({"type": "created", "at": now, "created_at": ticket_created_at(ticket) or now,
+                     "partial": bool(ticket.get("partial")), **_classes(ticket)})
+
+    def record_updated(self, before: Dict[str, Any], after: Dict[str, Any]) -> None:
+        """A stored ticket was re-classified (e.g. an upgraded partial analysis)"""
+        old, new = _classes(before), _classes(after)
+        if old != new or bool(before.get("partial")) != bool(after.get("partial")):
+            self.append({"type": "updated", "at": time.time(), "created_at": ticket_created_at(after) or time.time(),
+                         "before": {**old, "partial": bool(before.get("partial"))},
+                         "after": {**new, "partial": bool(after.get("partial"))}})
+
+    def record_resolved(self, ticket: Dict[str, Any], resolved_at: float = None) -> None:
+        self.append({"type": "resolved", "at": resolved_at or time.time(), "created_at": ticket_created_at(ticket),
+                     **_classes(ticket)})
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counters)
+
+
+def _empty_bucket() -> Dict[str, Any]:
+    return {
+        "created": 0, "resolved": 0, "partial": 0,
+        "team": {}, "priority": {}, "sentiment": {},
+        "confidence": [0] * CONFIDENCE_BINS,
+        "resolution": {"count": 0, "sum": 0.0, "max": 0.0, "histogram": [0] * (len(RESOLUTION_BOUNDS) + 1)},
+        "resolution_by_priority": {},
+    }
+
+
+def _hour(epoch: float) -> str:
+    return str(int(epoch // 3600 * 3600))
+
+
+class DigestStore:
+    """Hourly aggregates folded incrementally from the event log and persisted in state.json"""
+
+    def __init__(self, directory: str, retention_hours: int = 24 * 14):
+        self.directory = directory
+        self.retention_hours = retention_hours
+        self.state_path = os.path.join(directory, "state.json")
+        self._lock = threading.Lock()
+        self.state = self._load()
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"offsets": {}, "totals": {"created": 0, "resolved": 0}, "hours": {}}
+
+    def _bucket(self, epoch: float) -> Dict[str, Any]:
+        return self.state["hours"].setdefault(_hour(epoch), _empty_bucket())
+
+    def _classify(self, bucket: Dict[str, Any], classes: Dict[str, Any], sign: int) -> None:
+        for field in CLASS_FIELDS:
+            counts = bucket[field]
+            counts[classes[field]] = counts.get(classes[field], 0) + sign
+            if counts[classes[field]] == 0:
+                del counts[classes[field]]
+        bucket["confidence"][min(int(classes["confidence"] * CONFIDENCE_BINS), CONFIDENCE_BINS - 1)] += sign
+        bucket["partial"] += sign * int(bool(classes.get("partial")))
+
+    def apply(self, event: Dict[str, Any]) -> None:
+        kind = event["type"]
+        if kind == "created":
+            bucket = self._bucket(event["created_at"])
+            bucket["created"] += 1
+            self._classify(bucket, event, 1)
+            self.state["totals"]["created"] += 1
+        elif kind == "updated":
+            bucket = self._bucket(event["created_at"])
+            self._classify(bucket, event["before"], -1)
+            self._classify(bucket, event["after"], 1)
+        elif kind == "resolved":
+            bucket = self._bucket(event["at"])
+            bucket["resolved"] += 1
+            self.state["totals"]["resolved"] += 1
+            if event.get("created_at"):
+                hours = max(0.0, (event["at"] - event["created_at"]) / 3600)
+                resolution = bucket["resolution"]
+                resolution["count"] += 1
+                resolution["sum"] += hours
+                resolution["max"] = max(resolution["max"], hours)
+                resolution["histogram"][sum(hours > bound for bound in RESOLUTION_BOUNDS)] += 1
+                by_priority = bucket["resolution_by_priority"].setdefault(event["priority"], [0, 0.0])
+                by_priority[0] += 1
+                by_priority[1] += hours
+
+    def refresh(self) -> int:
+        """Fold new log lines into the aggregates and persist them; returns how many were applied"""
+        with self._lock:
+            applied = 0
+            offsets = self.state["offsets"]
+            for path in sorted(glob.glob(os.path.join(self.directory, "events-*.jsonl"))):
+                name = os.path.basename(path)
+                with open(path, 'rb') as f:
+                    f.seek(offsets.get(name, 0))
+                    data = f.read()
+                # A line still being written has no newline yet; pick it up next time
+                complete = data[:data.rfind(b"\n") + 1]
+                for line in complete.splitlines():
+                    try:
+                        self.apply(json.loads(line))
+                        applied += 1
+                    except (ValueError, KeyError) as e:
+                        logging.error(f"Skipping bad digest event in {name}: {e}")
+                offsets[name] = offsets.get(name, 0) + len(complete)
+            self._prune()
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.state, f)
+            os.replace(tmp_path, self.state_path)
+            return applied
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention_hours * 3600
+        for hour in [hour for hour in self.state["hours"] if int(hour) < cutoff]:
+            del self.state["hours"][hour]
+        # Day files are kept two extra days (late writers), then dropped once fully read
+        for name in list(self.state["offsets"]):
+            path = os.path.join(self.directory, name)
+            day = datetime.strptime(name, "events-%Y%m%d.jsonl").timestamp()
+            if day < cutoff - 2 * 86400 and os.path.exists(path) and os.path.getsize(path) == self.state["offsets"][name]:
+                os.remove(path)
+                del self.state["offsets"][name]
+
+    def digest(self, start: float, end: float) -> Dict[str, Any]:
+        """Merge the hourly buckets in [start, end)"""
+        merged = _empty_bucket()
+        with self._lock:
+            hour = int(start // 3600 * 3600)
+            while hour < end:
+                bucket = self.state["hours"].get(str(hour))
+                hour += 3600
+                if bucket is None:
+                    continue
+                for key in ("created", "resolved", "partial"):
+                    merged[key] += bucket[key]
+                for field in CLASS_FIELDS:
+                    for name, count in bucket[field].items():
+                        merged[field][name] = merged[field].get(name, 0) + count
+                merged["confidence"] = [a + b for a, b in zip(merged["confidence"], bucket["confidence"])]
+                resolution, other = merged["resolution"], bucket["resolution"]
+                resolution["count"] += other["count"]
+                resolution["sum"] += other["sum"]
+                resolution["max"] = max(resolution["max"], other["max"])
+                resolution["histogram"] = [a + b for a, b in zip(resolution["histogram"], other["histogram"])]
+                for priority, (count, total) in bucket["resolution_by_priority"].items():
+                    entry = merged["resolution_by_priority"].setdefault(priority, [0, 0.0])
+                    entry[0] += count
+                    entry[1] += total
+            totals = dict(self.state["totals"])
+        merged["start"], merged["end"] = start, end
+        merged["open"] = totals["created"] - totals["resolved"]
+        return merged
+
+    def hourly(self, now: float = None) -> Dict[str, Any]:
+        """The last complete hour"""
+        end = int((now or time.time()) // 3600 * 3600)
+        return self.digest(end - 3600, end)
+
+    def daily(self, now: float = None) -> Dict[str, Any]:
+        """The 24 complete hours before now"""
+        end = int((now or time.time()) // 3600 * 3600)
+        return self.digest(end - 24 * 3600, end)
+
+
+def resolution_percentile(digest: Dict[str, Any], q: float) -> Optional[float]:
+    """Upper bound (hours) of the histogram bin holding the q-th resolution time; None if open-ended or empty"""
+    resolution = digest["resolution"]
+    if not resolution["count"]:
+        return None
+    target, seen = q * resolution["count"], 0
+    for bound, count in zip(RESOLUTION_BOUNDS + (None,), resolution["histogram"]):
+        seen += count
+        if seen >= target:
+            return bound
+    return None
+
+
+def rebuild_from_results(results_dir: str, log: DigestLog) -> int:
+    """One-off backfill of the event log from existing ticket files (open and resolved).
+    Resolution times use the resolved file's mtime, so they are approximate."""
+    count = 0
+    for path in glob.glob(os.path.join(results_dir, "*.json")) + glob.glob(os.path.join(results_dir, "*.json.resolved")):
+        try:
+            with open(path, 'r') as f:
+                ticket = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Skipping {path}: {e}")
+            continue
+        created = ticket_created_at(ticket) or os.path.getmtime(path)
+        log.append({"type": "created", "at": created, "created_at": created,
+                    "partial": bool(ticket.get("partial")), **_classes(ticket)})
+        if path.endswith(".resolved"):
+            log.record_resolved(ticket, resolved_at=os.path.getmtime(path))
+        count += 1
+    return count
+
+
+def digest_dir() -> str:
+    return os.environ.get("DIGEST_DIR") or os.path.join(os.environ.get("TICKET_RESULTS_DIR", "ticket_results"), "digest")
+
+
+_log = None
+_log_lock = threading.Lock()
+
+def get_digest_log() -> Optional[DigestLog]:
+    """Process-wide event log under DIGEST_DIR (default <TICKET_RESULTS_DIR>/digest); None when DIGEST_ENABLED=0"""
+    global _log
+    if os.environ.get("DIGEST_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+    with _log_lock:
+        if _log is None:
+            _log = DigestLog(digest_dir())
+        return _log
@@ -0,0 +1,105 @@
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from .analyzer import TicketAnalyzer, is_cacheable
+from .metrics import span
+from .tickets import update_ticket
+
+
+def draft_fingerprint(ticket: Dict[str, Any]) -> str:
+    """Hash of the ticket fields the email draft is written from"""
+    source = f"{ticket.get('extracted_issue')}\x00{ticket.get('suggested_solution')}"
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def stored_draft(ticket: Dict[str, Any]) -> Optional[str]:
+    """The pre-generated draft, unless the issue or solution changed since it was written"""
+    draft = ticket.get("email_draft")
+    if isinstance(draft, dict) and draft.get("solution_hash") == draft_fingerprint(ticket):
+        return draft.get("text")
+    return None
+
+
+def attach_draft(ticket: Dict[str, Any], text: str, fingerprint: str = None) -> None:
+    ticket["email_draft"] = {
+        "text": text,
+        "solution_hash": fingerprint or draft_fingerprint(ticket),
+        "generated_at": datetime.now().isoformat(),
+    }
+
+
+class DraftPregenerator:
+    """Write email drafts for urgent tickets in the background, right after they are saved.
+
+    The draft is stored in the ticket file with a hash of the issue and solution
+    it was written from, so the inbox can show it instantly and ignores it once
+    the ticket's solution changes (e.g. after an analysis upgrade, which
+    schedules a fresh draft). Drafts are model calls at "draft" priority, behind
+    live chat and submissions.
+    """
+
+    def __init__(self, analyzer: TicketAnalyzer, priorities=("Critical", "High"), workers: int = 1):
+        self.analyzer = analyzer
+        self.priorities = set(priorities)
+        # Threads start lazily on first submit, so a pre-fork parent never owns any
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="draft")
+        self._lock = threading.Lock()
+        self.counters = {"scheduled": 0, "generated": 0, "stale": 0, "missing": 0, "failed": 0}
+
+    @classmethod
+    def from_env(cls, analyzer: TicketAnalyzer, environ: Dict[str, str]) -> Optional["DraftPregenerator"]:
+        if environ.get("EMAIL_DRAFT_PREGENERATE", "1").lower() in ("0", "false", "no"):
+            return None
+        priorities = [p.strip().title() for p in environ.get("EMAIL_DRAFT_PRIORITIES", "Critical,High").split(",")]
+        return cls(analyzer, priorities=[p for p in priorities if p],
+                   workers=int(environ.get("EMAIL_DRAFT_WORKERS", 1)))
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def wants(self, ticket: Dict[str, Any]) -> bool:
+        # Partial tickets are drafted once their analysis is upgraded
+        return (str(ticket.get("priority_level", "")).title() in self.priorities
+                and not ticket.get("partial") and stored_draft(ticket) is None)
+
+    def schedule(self, path: str, ticket: Dict[str, Any]) -> bool:
+        """Queue a draft for the ticket saved at `path` if its priority calls for one"""
+        if not self.wants(ticket):
+            return False
+        self._count("scheduled")
+        self._executor.submit(self._run, path, dict(ticket))
+        return True
+
+    def _run(self, path: str, ticket: Dict[str, Any]) -> None:
+        try:
+            fingerprint = draft_fingerprint(ticket)
+            with span("draft_pregenerate"):
+                text = self.analyzer.generate_email_draft(ticket)
+            if not is_cacheable(text):
+                self._count("failed")
+                return
+
+            def attach(current: Dict[str, Any]) -> bool:
+                # Dropped if the solution changed while the draft was being written
+                if draft_fingerprint(current) != fingerprint:
+                    return False
+                attach_draft(current, text, fingerprint)
+                return True
+
+            stored = update_ticket(path, attach)
+            if stored is None:
+                self._count("missing")
+            else:
+                self._count("generated" if stored_draft(stored) == text else "stale")
+        except Exception as e:
+            logging.error(f"Pre-generating a draft for {path} failed: {e}")
+            self._count("failed")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counters)
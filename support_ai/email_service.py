@@ -1,23 +1,13 @@
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from functools import lru_cache
 import os
 import logging
+from .templates import compile_template
 
-class EmailService:
-    def __init__(self):
-        self.smtp_server = os.environ.get("SMTP_SERVER", "smtp.gmail.com")
-        self.smtp_port = int(os.environ.get("SMTP_PORT", 587))
-        self.sender_email = os.environ.get("SMTP_EMAIL")
-        self.sender_password = os.environ.get("SMTP_PASSWORD")
-        self.boss_email = os.environ.get("BOSS_EMAIL")
-
-    def _get_html_template(self, title, ticket_data, note=None, is_critical=False):
-        """Generates an HTML email body."""
-        color = "#e53e3e" if is_critical else "#3182ce"
-        bg_color = "#fff5f5" if is_critical else "#ebf8ff"
-        
-        html = f"""
+# Parsed once; the stylesheet and layout are static, only the ticket fields are filled per message
+EMAIL_TEMPLATE = compile_template('''
         <html>
         <head>
             <style>
@@ -38,26 +28,16 @@ class EmailService:
                 </div>
                 <div class="content">
                     <div class="card">
-                        <div class="field"><span class="label">Ticket ID:</span> {ticket_data.get('ticket_id', 'Unknown')}</div>
-                        <div class="field"><span class="label">Priority:</span> <strong>{ticket_data.get('priority_level', 'N/A')}</strong></div>
-                        <div class="field"><span class="label">Team:</span> {ticket_data.get('assigned_team', 'N/A')}</div>
+                        <div class="field"><span class="label">Ticket ID:</span> {ticket_id}</div>
+                        <div class="field"><span class="label">Priority:</span> <strong>{priority}</strong></div>
+                        <div class="field"><span class="label">Team:</span> {team}</div>
                     </div>
 
                     <h3>⚠️ Issue Reported</h3>
-                    <p>{ticket_data.get('extracted_issue', 'No issue extracted.')}</p>
-        """
-
-        if note:
-            html += f"""
-                    <div style="background-color: #f0fff4; padding: 15px; border: 1px solid #c6f6d5; border-radius: 4px; margin-top: 20px;">
-                        <h4 style="margin-top: 0; color: #2f855a;">📝 Admin Note</h4>
-                        <p style="margin-bottom: 0;">{note}</p>
-                    </div>
-            """
-
-        html += f"""
+                    <p>{issue}</p>
+        {note_block}
                     <h3>📄 Full Summary</h3>
-                    <p>{ticket_data.get('summary', 'No summary available.')}</p>
+                    <p>{summary}</p>
                     
                     <div class="footer">
                         <p>AutoTriage.AI Notification System</p>
@@ -66,8 +46,43 @@ class EmailService:
             </div>
         </body>
         </html>
-        """
-        return html
+        ''', safe=("note_block",))
+EMAIL_NOTE = compile_template('''
+                    <div style="background-color: #f0fff4; padding: 15px; border: 1px solid #c6f6d5; border-radius: 4px; margin-top: 20px;">
+                        <h4 style="margin-top: 0; color: #2f855a;">📝 Admin Note</h4>
+                        <p style="margin-bottom: 0;">{note}</p>
+                    </div>
+            ''')
+
+@lru_cache(maxsize=2)
+def _email_template(is_critical: bool):
+    """The shell with the colour scheme baked in"""
+    if is_critical:
+        return EMAIL_TEMPLATE.partial(color="#e53e3e", bg_color="#fff5f5")
+    return EMAIL_TEMPLATE.partial(color="#3182ce", bg_color="#ebf8ff")
+
+
+class EmailService:
+    def __init__(self):
+        self.smtp_server = os.environ.get("SMTP_SERVER", "smtp.gmail.com")
+        self.smtp_port = int(os.environ.get("SMTP_PORT", 587))
+        self.sender_email = os.environ.get("SMTP_EMAIL")
+        self.sender_password = os.environ.get("SMTP_PASSWORD")
+        self.boss_email = os.environ.get("BOSS_EMAIL")
+        # Plain SMTP for local relays and test sinks that don't speak TLS
+        self.use_starttls = os.environ.get("SMTP_STARTTLS", "true").lower() not in ("0", "false", "no")
+
+    def _get_html_template(self, title, ticket_data, note=None, is_critical=False):
+        """Generates an HTML email body."""
+        return _email_template(is_critical).render(
+            title=title,
+            ticket_id=ticket_data.get('ticket_id', 'Unknown'),
+            priority=ticket_data.get('priority_level', 'N/A'),
+            team=ticket_data.get('assigned_team', 'N/A'),
+            issue=ticket_data.get('extracted_issue', 'No issue extracted.'),
+            note_block=EMAIL_NOTE.render(note=note) if note else "",
+            summary=ticket_data.get('summary', 'No summary available.'),
+        )
 
     def send_critical_alert(self, ticket_data):
         """Sends an email alert to the boss for Critical tickets."""
@@ -86,7 +101,8 @@ class EmailService:
             msg.attach(MIMEText(html_body, 'html'))
 
             server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
+            if self.use_starttls:
+                server.starttls()
             server.login(self.sender_email, self.sender_password)
             server.sendmail(self.sender_email, self.boss_email, msg.as_string())
             server.quit()
@@ -116,7 +132,8 @@ class EmailService:
             msg.attach(MIMEText(html_body, 'html'))
 
             server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
+            if self.use_starttls:
+                server.starttls()
             server.login(self.sender_email, self.sender_password)
             server.sendmail(self.sender_email, target_email, msg.as_string())
             server.quit()
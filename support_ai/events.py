@@ -0,0 +1,265 @@
+"""Per-channel event bus for the Server-Sent Events chat transport.
+
+A channel (one per chat session) fans events out to every open stream for
+it. Each channel keeps its last few events so a reconnecting EventSource
+(which sends Last-Event-ID) catches up on what it missed. Subscriber queues
+are bounded: a stalled client loses its oldest events instead of growing
+memory without limit. Beyond `max_channels`, the least recently used
+channels without open streams are forgotten.
+
+EventBus lives in one process. SharedEventBus (used when SHARED_STATE_DB is
+set, e.g. by serve_prefork.py) carries events between processes, so a stream
+held by one worker gets replies produced by another.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterator, List, Optional
+
+from .shared_db import SharedDB, shared_db_path
+
+
+class Subscription:
+    def __init__(self, channel: str, max_queue: int):
+        self.channel = channel
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        # Highest event id queued, so a replayed event is not delivered twice
+        self.last_id = 0
+
+    def put(self, event) -> bool:
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return True
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+
+class _Channel:
+    __slots__ = ("subscribers", "history", "next_id")
+
+    def __init__(self, history: int):
+        self.subscribers = []
+        self.history = deque(maxlen=history)
+        self.next_id = 1
+
+
+class EventBus:
+    def __init__(self, max_queue: int = 100, history: int = 50, max_channels: int = 10000):
+        self.max_queue = max_queue
+        self.history = history
+        self.max_channels = max_channels
+        self._channels: "OrderedDict[str, _Channel]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"published": 0, "delivered": 0, "dropped": 0, "replayed": 0, "evicted": 0}
+
+    def _channel(self, channel: str) -> _Channel:
+        state = self._channels.get(channel)
+        if state is None:
+            state = self._channels[channel] = _Channel(self.history)
+            if len(self._channels) > self.max_channels:
+                idle = [key for key, other in self._channels.items() if not other.subscribers and key != channel]
+                for key in idle[:len(self._channels) - self.max_channels]:
+                    del self._channels[key]
+                    self.counters["evicted"] += 1
+        self._channels.move_to_end(channel)
+        return state
+
+    def subscribe(self, channel: str, last_event_id: Optional[str] = None) -> Subscription:
+        """Open a stream on a channel, replaying buffered events after last_event_id
+        (all of them for a new stream, so nothing published just before it connected is lost)"""
+        subscription = Subscription(channel, self.max_queue)
+        after = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+        with self._lock:
+            state = self._channel(channel)
+            state.subscribers.append(subscription)
+            for event in state.history:
+                if event[0] > after:
+                    subscription.put(event)
+                    self.counters["replayed"] += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            state = self._channels.get(subscription.channel)
+            if state is None:
+                return
+            state.subscribers = [s for s in state.subscribers if s is not subscription]
+            self.counters["dropped"] += subscription.dropped
+
+    def publish(self, channel: str, event: str, data: Any) -> None:
+        with self._lock:
+            state = self._channel(channel)
+            record = (state.next_id, event, json.dumps(data))
+            state.next_id += 1
+            state.history.append(record)
+            subscribers = list(state.subscribers)
+            self.counters["published"] += 1
+            self.counters["delivered"] += len(subscribers)
+        for subscription in subscribers:
+            subscription.put(record)
+
+    def close(self, channel: str) -> None:
+        """Forget a finished channel; open streams get a final 'closed' event and end"""
+        self.publish(channel, "closed", {})
+        with self._lock:
+            state = self._channels.pop(channel, None)
+        for subscription in (state.subscribers if state else []):
+            subscription.put(None)
+
+    def stream(self, subscription: Subscription, heartbeat: float = 15.0) -> Iterator[str]:
+        """SSE frames for one subscriber; comment lines keep idle connections (and proxies) alive"""
+        # Tells EventSource how long to wait before reconnecting
+        yield "retry: 3000\n\n"
+        try:
+            while True:
+                try:
+                    record = subscription.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                if record is None:
+                    return
+                event_id, event, data = record
+                yield f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+                if event == "closed":
+                    return
+        finally:
+            self.unsubscribe(subscription)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.counters, "channels": len(self._channels),
+                    "subscribers": sum(len(state.subscribers) for state in self._channels.values())}
+
+
+EVENT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    event_id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL,
+    event TEXT NOT NULL, data TEXT NOT NULL, created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_channel ON events (channel, event_id);
+CREATE INDEX IF NOT EXISTS events_created ON events (created);
+"""
+
+
+class SharedEventBus(EventBus):
+    """EventBus whose events go through a SQLite file, for processes sharing one listening socket.
+
+    Publishing inserts a row, from whichever worker ran the chat turn. Each
+    process runs one poller thread (started with its first stream) that reads
+    rows newer than the last it saw and queues them for the streams it holds,
+    so a stream gets its session's events wherever they were published, with
+    up to `poll_interval` extra latency. Event ids are row ids: increasing per
+    channel, so Last-Event-ID replay works across workers too. Rows are
+    deleted after `retention` seconds.
+    """
+
+    def __init__(self, path: str, max_queue: int = 100, history: int = 50, poll_interval: float = 0.1,
+                 retention: float = 3600.0):
+        super().__init__(max_queue=max_queue, history=history)
+        self.db = SharedDB(path, EVENT_SCHEMA)
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._subscribers: Dict[str, List[Subscription]] = {}
+        self._poller = None
+        self._poller_pid = None
+        self._seen = 0
+
+    @classmethod
+    def from_env(cls, environ: Dict[str, str]) -> "SharedEventBus":
+        return cls(environ["SHARED_STATE_DB"], poll_interval=float(environ.get("EVENT_POLL_INTERVAL", 0.1)))
+
+    def _deliver(self, subscription: Subscription, record) -> None:
+        if record[0] > subscription.last_id:
+            subscription.last_id = record[0]
+            subscription.put(record)
+
+    def _ensure_poller(self) -> None:
+        # Called with self._lock held; a forked child starts its own poller
+        if self._poller is None or self._poller_pid != os.getpid():
+            self._seen = self.db.connect().execute("SELECT COALESCE(MAX(event_id), 0) FROM events").fetchone()[0]
+            self._poller = threading.Thread(target=self._poll, name="event-poller", daemon=True)
+            self._poller_pid = os.getpid()
+            self._poller.start()
+
+    def _poll(self) -> None:
+        last_cleanup = time.time()
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                conn = self.db.connect()
+                rows = conn.execute("SELECT event_id, channel, event, data FROM events WHERE event_id > ? "
+                                    "ORDER BY event_id", (self._seen,)).fetchall()
+                with self._lock:
+                    for event_id, channel, event, data in rows:
+                        self._seen = event_id
+                        subscribers = self._subscribers.get(channel, ())
+                        self.counters["delivered"] += len(subscribers)
+                        for subscription in subscribers:
+                            self._deliver(subscription, (event_id, event, data))
+                if time.time() - last_cleanup > 60:
+                    last_cleanup = time.time()
+                    conn.execute("DELETE FROM events WHERE created < ?", (last_cleanup - self.retention,))
+            except Exception as e:
+                logging.error(f"Event poller error: {e}")
+
+    def subscribe(self, channel: str, last_event_id: Optional[str] = None) -> Subscription:
+        subscription = Subscription(channel, self.max_queue)
+        after = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+        with self._lock:
+            self._ensure_poller()
+            self._subscribers.setdefault(channel, []).append(subscription)
+            # Replay under the lock, so the poller cannot queue a newer event first
+            rows = self.db.connect().execute(
+                "SELECT event_id, event, data FROM events WHERE channel = ? AND event_id > ? "
+                "ORDER BY event_id DESC LIMIT ?", (channel, after, self.history)).fetchall()
+            for record in reversed(rows):
+                self._deliver(subscription, tuple(record))
+                self.counters["replayed"] += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = [s for s in self._subscribers.get(subscription.channel, ()) if s is not subscription]
+            if subscribers:
+                self._subscribers[subscription.channel] = subscribers
+            else:
+                self._subscribers.pop(subscription.channel, None)
+            self.counters["dropped"] += subscription.dropped
+
+    def publish(self, channel: str, event: str, data: Any) -> None:
+        self.db.connect().execute("INSERT INTO events (channel, event, data, created) VALUES (?, ?, ?, ?)",
+                                  (channel, event, json.dumps(data), time.time()))
+        with self._lock:
+            self.counters["published"] += 1
+
+    def close(self, channel: str) -> None:
+        """Streams for the channel, in any process, end after the 'closed' event"""
+        self.publish(channel, "closed", {})
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.counters, "channels": len(self._subscribers),
+                    "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()), "shared": 1}
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+def get_event_bus() -> EventBus:
+    """Process-wide event bus; shared between processes through SHARED_STATE_DB when that is set"""
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            _bus = SharedEventBus.from_env(os.environ) if shared_db_path() else EventBus()
+        return _bus
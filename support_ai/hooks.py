@@ -0,0 +1,47 @@
+"""Before/after hook points for pipeline stages.
+
+Every stage timed with support_ai.metrics.span() (model calls, similarity
+search, rules, agents, the pipeline itself) is announced here, so profilers and
+tracers can subscribe without monkeypatching:
+
+    def trace(event, stage, context):
+        # event is "before" or "after"; after-events carry "duration" and "error"
+        ...
+
+    HOOKS.subscribe(trace)
+"""
+import logging
+import threading
+from typing import Any, Callable, Dict, List
+
+Hook = Callable[[str, str, Dict[str, Any]], None]
+
+
+class HookRegistry:
+    def __init__(self):
+        self._hooks: List[Hook] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, hook: Hook) -> Hook:
+        with self._lock:
+            # Copy-on-write so emit() can iterate without holding the lock
+            self._hooks = self._hooks + [hook]
+        return hook
+
+    def unsubscribe(self, hook: Hook) -> None:
+        with self._lock:
+            self._hooks = [h for h in self._hooks if h is not hook]
+
+    def __bool__(self) -> bool:
+        return bool(self._hooks)
+
+    def emit(self, event: str, stage: str, context: Dict[str, Any]) -> None:
+        for hook in self._hooks:
+            try:
+                hook(event, stage, context)
+            except Exception as e:
+                # A broken subscriber must never break a request
+                logging.error(f"Stage hook {hook!r} failed: {e}")
+
+
+HOOKS = HookRegistry()
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import threading
+from typing import Dict, Any, Optional
+
+from ..deadline import DeadlineExceeded, current_deadline
+from ..metrics import count_tokens, span
+from .hedging import HedgeCancelled, Hedger
+from .providers import MissingAPIKeyError, ModelProvider, provider_from_env
+from .resilience import ResilientCaller
+from .routing import ModelRouter
+from .scheduler import PriorityScheduler, priority_rank, priority_scope, resolve_priority
+from .singleflight import SingleFlight
+
+DEFAULT_MODEL = 'gemma-3-4b-it'
+
+
+class ModelClient:
+    """Single entry point for model calls shared by TicketAnalyzer and the agents.
+
+    Identical prompts that are in flight at the same time (a chat submitted
+    twice, several staff drafting the same email) share one backend call, and
+    every backend call goes through one ResilientCaller (rate limit, adaptive
+    concurrency, retries, circuit breaker). The backend itself is a pluggable
+    ModelProvider chosen with MODEL_PROVIDER. Calls tagged with a task are
+    routed through the per-task model cascade in MODEL_ROUTES. Backend calls
+    are admitted by priority class (see support_ai.llm.scheduler) and, with
+    MODEL_HEDGE_ENABLED=1, slow ones are hedged (see support_ai.llm.hedging).
+    """
+
+    def __init__(self, model_name: Optional[str] = None, backend: Optional[ModelProvider] = None,
+                 resilience: Optional[ResilientCaller] = None, router: Optional[ModelRouter] = None,
+                 scheduler: Optional[PriorityScheduler] = None, hedger: Optional[Hedger] = None,
+                 hedge_backend: Optional[ModelProvider] = None, hedge_resilience: Optional[ResilientCaller] = None):
+        self.model_name = model_name or os.environ.get("MODEL_NAME", DEFAULT_MODEL)
+        self.backend = backend or provider_from_env()
+        self.single_flight = SingleFlight()
+        self.resilience = resilience or ResilientCaller.from_env(os.environ)
+        self.router = router or ModelRouter.from_env(os.environ)
+        # Admits as many calls as the adaptive concurrency limit allows, highest priority first;
+        # None when MODEL_SCHEDULER_ENABLED=0
+        self.scheduler = scheduler or PriorityScheduler.from_env(lambda: int(self.resilience.concurrency.limit),
+                                                                 os.environ)
+        # None unless MODEL_HEDGE_ENABLED=1; hedges go to MODEL_HEDGE_PROVIDER if set, else the same backend
+        self.hedger = hedger or Hedger.from_env(os.environ)
+        hedge_kind = os.environ.get("MODEL_HEDGE_PROVIDER")
+        self.hedge_backend = hedge_backend or (provider_from_env({**os.environ, "MODEL_PROVIDER": hedge_kind})
+                                               if self.hedger is not None and hedge_kind else None)
+        self.hedge_model_name = os.environ.get("MODEL_HEDGE_MODEL") or None
+        # The alternate backend has its own rate limit, concurrency limit and breaker, and does not
+        # wait for the primary backend's scheduler
+        self.hedge_resilience = (hedge_resilience or ResilientCaller.from_env(os.environ)
+                                 if self.hedge_backend is not None else None)
+
+    def generate(self, prompt: str, task: Optional[str] = None, priority: Optional[str] = None) -> str:
+        with span("llm", task=task or "default"), priority_scope(priority or resolve_priority(task)):
+            route = self.router.route_for(task)
+            if route is None:
+                text = self._call(None, self.model_name, prompt)
+            else:
+                text = self.router.run(task, route, prompt, self._call)
+        count_tokens(task or "default", prompt, text)
+        return text
+
+    def _call(self, provider: Optional[ModelProvider], model_name: str, prompt: str) -> str:
+        provider = provider or self.backend
+        key = (provider.name, model_name, hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+        return self.single_flight.do(key, lambda: self._generate(provider, model_name, prompt),
+                                     rank=priority_rank(resolve_priority()))
+
+    def _generate(self, provider: ModelProvider, model_name: str, prompt: str) -> str:
+        # Configuration errors fail fast instead of being retried or tripping the breaker
+        provider.validate()
+        if self.hedger is None:
+            return self._attempt(provider, model_name, prompt)
+        hedge_provider = self.hedge_backend or provider
+        hedge_model = self.hedge_model_name if self.hedge_backend is not None and self.hedge_model_name else model_name
+        # The primary is admitted here, on the caller's thread and in priority order, so the
+        # hedger's pool never holds calls still waiting for a slot and its clock starts at admission
+        release = None
+        if self.scheduler is not None:
+            self.scheduler.acquire(resolve_priority(), self._queue_timeout())
+            release = self.scheduler.release
+        return self.hedger.call(lambda cancelled: self._attempt(provider, model_name, prompt, cancelled,
+                                                                admitted=True),
+                                lambda cancelled: self._attempt(hedge_provider, hedge_model, prompt, cancelled),
+                                on_primary_done=release)
+
+    def _queue_timeout(self) -> float:
+        deadline = current_deadline()
+        if deadline is not None and deadline.expired:
+            # The caller has stopped waiting: drop the call rather than spend capacity on it
+            raise DeadlineExceeded("Request deadline passed before the model call started")
+        return deadline.bound(self.resilience.queue_timeout) if deadline is not None else self.resilience.queue_timeout
+
+    def _attempt(self, provider: ModelProvider, model_name: str, prompt: str,
+                 cancelled: Optional[threading.Event] = None, admitted: bool = False) -> str:
+        timeout = self._queue_timeout()
+        deadline = current_deadline()
+        alternate = self.hedge_backend is not None and provider is self.hedge_backend
+        resilience = self.hedge_resilience if alternate else self.resilience
+        if cancelled is not None:
+            if cancelled.is_set():
+                raise HedgeCancelled("Hedged twin already answered")
+            # The alternate hedge backend has not been validated yet
+            provider.validate()
+
+        def retryable(error: BaseException) -> bool:
+            return not (deadline is not None and deadline.expired) and not (cancelled is not None and cancelled.is_set())
+
+        def call() -> str:
+            # A hedge twin already answered while this attempt waited for admission
+            if cancelled is not None and cancelled.is_set():
+                raise HedgeCancelled("Hedged twin already answered")
+            return resilience.call(lambda: provider(model_name, prompt), retryable=retryable)
+
+        if self.scheduler is None or admitted or alternate:
+            return call()
+        with self.scheduler.slot(resolve_priority(), timeout):
+            return call()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.backend.name,
+            "single_flight": self.single_flight.stats(),
+            "resilience": self.resilience.stats(),
+            "routes": self.router.stats(),
+            "scheduler": self.scheduler.stats() if self.scheduler is not None else None,
+            "hedging": self.hedger.stats() if self.hedger is not None else None,
+            "hedge_resilience": self.hedge_resilience.stats() if self.hedge_resilience is not None else None,
+        }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client() -> ModelClient:
+    """Process-wide model client shared by all model callers"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ModelClient()
+        return _client
+
+
+def set_client(client: ModelClient) -> None:
+    """Replace the process-wide client (e.g. a stub backend in benchmarks)"""
+    global _client
+    with _client_lock:
+        _client = client
@@ -0,0 +1,186 @@
+"""Hedged model calls.
+
+A call that has not returned by a high percentile of recent latency is
+duplicated (to the same backend or an alternate one) and the first answer
+wins. Hedges are paid for from a budget that grows by `max_rate` per call,
+so at most that fraction of calls is ever duplicated, and nothing is hedged
+until enough latencies have been seen to know what "slow" is.
+
+The caller admits the primary attempt (see support_ai.llm.scheduler) before
+handing it to the hedger, so the pool only ever holds calls that are already
+running and "slow" is measured from admission, not from the end of the queue.
+While there is too little history to hedge, the primary runs on the caller's
+thread.
+
+The losing attempt is cancelled: if it is still waiting for admission it
+never reaches the backend, if it is already in flight its answer is dropped.
+Primary latencies are recorded even when the hedge won, so the stats compare
+the tail callers saw against the tail they would have seen without hedging.
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+
+from ..metrics import REGISTRY
+
+HEDGE_LATENCY = REGISTRY.histogram("support_ai_llm_hedged_call_seconds",
+                                   "Model call latency with hedging (effective) and of the first attempt alone (primary)")
+
+
+class HedgeCancelled(RuntimeError):
+    """Raised inside an attempt whose twin already answered"""
+
+
+def _percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+class Hedger:
+    def __init__(self, percentile: float = 0.95, max_rate: float = 0.05, window: int = 500,
+                 min_samples: int = 20, min_delay: float = 0.05, burst: float = 10.0, workers: int = 64):
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.burst = burst
+        self._primary = deque(maxlen=window)
+        self._effective = deque(maxlen=window)
+        self._budget = 0.0
+        self._lock = threading.Lock()
+        # Threads start lazily on first submit, so a pre-fork parent never owns any
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hedge")
+        self.counters = {"calls": 0, "hedged": 0, "hedge_won": 0, "primary_won": 0, "over_budget": 0,
+                         "loser_cancelled_early": 0}
+
+    @classmethod
+    def from_env(cls, environ: Dict[str, str]) -> Optional["Hedger"]:
+        if environ.get("MODEL_HEDGE_ENABLED", "0").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(
+            percentile=float(environ.get("MODEL_HEDGE_PERCENTILE", 0.95)),
+            max_rate=float(environ.get("MODEL_HEDGE_MAX_RATE", 0.05)),
+            min_delay=float(environ.get("MODEL_HEDGE_MIN_DELAY", 0.05)),
+            workers=int(environ.get("MODEL_HEDGE_WORKERS", 64)),
+        )
+
+    def delay(self) -> Optional[float]:
+        """How long to wait before hedging; None while there is too little history"""
+        with self._lock:
+            if len(self._primary) < self.min_samples:
+                return None
+            return max(self.min_delay, _percentile(self._primary, self.percentile))
+
+    def _take_budget(self) -> bool:
+        with self._lock:
+            if self._budget >= 1.0:
+                self._budget -= 1.0
+                self.counters["hedged"] += 1
+                return True
+            self.counters["over_budget"] += 1
+            return False
+
+    def _add_primary(self, started: float) -> None:
+        latency = time.monotonic() - started
+        HEDGE_LATENCY.observe(latency, kind="primary")
+        with self._lock:
+            self._primary.append(latency)
+
+    def _observe_primary(self, started: float, on_done: Optional[Callable[[], None]]) -> Callable[[Any], None]:
+        def done(future) -> None:
+            if on_done is not None:
+                on_done()
+            if not future.cancelled() and future.exception() is None:
+                self._add_primary(started)
+        return done
+
+    def call(self, primary: Callable[[threading.Event], Any], hedge: Callable[[threading.Event], Any],
+             on_primary_done: Optional[Callable[[], None]] = None) -> Any:
+        """Run primary(cancelled); if it is slow, also run hedge(cancelled) and return
+        whichever answers first. Each attempt should check its event before it
+        starts talking to the backend and raise HedgeCancelled if it is set.
+        on_primary_done() runs once the primary has finished or was dropped, even
+        if that is after call() returned (e.g. to release its admission slot)."""
+        with self._lock:
+            self.counters["calls"] += 1
+            self._budget = min(self.burst, self._budget + self.max_rate)
+        started = time.monotonic()
+        delay = self.delay()
+        cancel_primary, cancel_hedge = threading.Event(), threading.Event()
+        if delay is None:
+            # Nothing can be hedged yet, so don't hand the call to the pool
+            try:
+                result = primary(cancel_primary)
+            finally:
+                if on_primary_done is not None:
+                    on_primary_done()
+            self._add_primary(started)
+            self._record(started)
+            return result
+        # Attempts run in a copy of the caller's context, so priority and deadline scopes carry over
+        try:
+            first = self._executor.submit(contextvars.copy_context().run, primary, cancel_primary)
+        except BaseException:
+            if on_primary_done is not None:
+                on_primary_done()
+            raise
+        first.add_done_callback(self._observe_primary(started, on_primary_done))
+        done, _ = wait([first], timeout=delay)
+        if done or not self._take_budget():
+            result = first.result()
+            self._record(started)
+            return result
+
+        second = self._executor.submit(contextvars.copy_context().run, hedge, cancel_hedge)
+        pending = {first: cancel_primary, second: cancel_hedge}
+        error = None
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.pop(future)
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                for loser, cancelled in pending.items():
+                    cancelled.set()
+                    if loser.cancel():
+                        self._count("loser_cancelled_early")
+                    else:
+                        loser.add_done_callback(self._count_early_cancel)
+                self._count("hedge_won" if future is second else "primary_won")
+                self._record(started)
+                return future.result()
+        # Both attempts failed
+        raise error
+
+    def _count_early_cancel(self, future) -> None:
+        if isinstance(future.exception(), HedgeCancelled):
+            self._count("loser_cancelled_early")
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def _record(self, started: float) -> None:
+        latency = time.monotonic() - started
+        HEDGE_LATENCY.observe(latency, kind="effective")
+        with self._lock:
+            self._effective.append(latency)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self.counters["calls"]
+            return {
+                **self.counters,
+                # Extra backend calls as a fraction of calls (an upper bound: some losers never started)
+                "extra_cost": round(self.counters["hedged"] / calls, 4) if calls else 0.0,
+                "delay_seconds": round(max(self.min_delay, _percentile(self._primary, self.percentile)), 4)
+                                 if len(self._primary) >= self.min_samples else None,
+                "primary_p50": round(_percentile(self._primary, 0.5), 4),
+                "primary_p99": round(_percentile(self._primary, 0.99), 4),
+                "effective_p50": round(_percentile(self._effective, 0.5), 4),
+                "effective_p99": round(_percentile(self._effective, 0.99), 4),
+            }
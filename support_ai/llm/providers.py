@@ -0,0 +1,176 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+import warnings
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+from .resilience import BackendError, RateLimitError, TransientError
+
+
+class MissingAPIKeyError(RuntimeError):
+    pass
+
+
+class ModelProvider(ABC):
+    """A model backend: turns (model name, prompt) into text.
+
+    Providers are stateless apart from connection settings, so one instance is
+    shared by every caller in the process.
+    """
+
+    name = "base"
+
+    def validate(self) -> None:
+        """Raise if the provider is not configured (called before any retries)"""
+
+    @abstractmethod
+    def generate(self, model_name: str, prompt: str) -> str:
+        pass
+
+    def __call__(self, model_name: str, prompt: str) -> str:
+        return self.generate(model_name, prompt)
+
+
+# genai.configure mutates process-wide client state, so do it once per key
+_genai_lock = threading.Lock()
+_genai_configured_key = None
+
+def configure_genai(api_key: str) -> None:
+    global _genai_configured_key
+    import google.generativeai as genai
+    with _genai_lock:
+        if _genai_configured_key != api_key:
+            genai.configure(api_key=api_key)
+            _genai_configured_key = api_key
+
+
+def _gemini_error(error: Exception) -> Exception:
+    """Map the SDK's quota and transient errors onto RateLimitError / TransientError"""
+    try:
+        from google.api_core import exceptions as api_exceptions
+    except ImportError:
+        return error
+    if isinstance(error, (api_exceptions.ResourceExhausted, api_exceptions.TooManyRequests)):
+        return RateLimitError(f"Gemini quota exhausted: {error}")
+    if isinstance(error, (api_exceptions.ServiceUnavailable, api_exceptions.InternalServerError,
+                          api_exceptions.DeadlineExceeded, api_exceptions.GatewayTimeout)):
+        return TransientError(f"Gemini call failed: {error}")
+    return error
+
+
+class GeminiProvider(ModelProvider):
+    """Google Generative AI (Gemini / Gemma) hosted models"""
+
+    name = "gemini"
+
+    def validate(self) -> None:
+        if "GEMINI_API_KEY" not in os.environ:
+            raise MissingAPIKeyError("GEMINI_API_KEY not set.")
+
+    def generate(self, model_name: str, prompt: str) -> str:
+        # Imported lazily so local and stub deployments don't need the SDK
+        with warnings.catch_warnings():
+            # Suppress the "google.generativeai" deprecation warning
+            warnings.filterwarnings("ignore", category=FutureWarning)
+            import google.generativeai as genai
+        configure_genai(os.environ["GEMINI_API_KEY"])
+        model = genai.GenerativeModel(model_name)
+        logging.info(f"Querying model '{model_name}'...")
+        try:
+            response = model.generate_content(prompt)
+        except Exception as e:
+            mapped = _gemini_error(e)
+            if mapped is e:
+                raise
+            raise mapped from e
+        return response.text
+
+
+class OpenAICompatibleProvider(ModelProvider):
+    """Local HTTP backend speaking the OpenAI chat completions API.
+
+    Works with llama.cpp's server, Ollama, vLLM, LM Studio and
+    tools/fake_model_server.py.
+    """
+
+    name = "local"
+
+    def __init__(self, base_url: str = "http://127.0.0.1:8080", api_key: Optional[str] = None,
+                 timeout: float = 60.0):
+        self.url = base_url.rstrip("/") + "/v1/chat/completions"
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def generate(self, model_name: str, prompt: str) -> str:
+        body = json.dumps({
+            "model": model_name,
+            "messages": [{"role": "user", "content": prompt}],
+        }).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(self.url, data=body, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.load(response)
+        except urllib.error.HTTPError as e:
+            if e.code == 429:
+                raise RateLimitError(f"HTTP 429 from {self.url}") from e
+            if e.code >= 500 or e.code == 408:
+                raise TransientError(f"HTTP {e.code} from {self.url}") from e
+            raise BackendError(f"HTTP {e.code} from {self.url}") from e
+        except (urllib.error.URLError, OSError) as e:
+            raise TransientError(f"Could not reach {self.url}: {e}") from e
+        return payload["choices"][0]["message"]["content"]
+
+
+def stub_reply(prompt: str) -> str:
+    """Deterministic, prompt-shaped reply used by the stub backend and the fake model server"""
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+    lowered = prompt.lower()
+    if "one word" in lowered:
+        return "Negative" if "urgent" in lowered or "!" in prompt else "Neutral"
+    if "summarize" in lowered:
+        return f"Customer reported a software issue that was troubleshot by the agent ({digest})."
+    if "main technical problem" in lowered or "extract the main issue" in lowered:
+        return f"Software installation error ({digest})"
+    if "email" in lowered:
+        return f"Dear Customer,\n\nThank you for your patience. Please follow the steps above.\n\nAutoTriage.AI Support Team ({digest})"
+    return f"Please restart the application and try again ({digest})."
+
+
+class StubProvider(ModelProvider):
+    """Offline, deterministic backend for tests and benchmarks"""
+
+    name = "stub"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    def generate(self, model_name: str, prompt: str) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return stub_reply(prompt)
+
+
+def provider_from_env(environ: Dict[str, str] = None) -> ModelProvider:
+    """Build the provider selected by MODEL_PROVIDER (gemini, local or stub)"""
+    environ = os.environ if environ is None else environ
+    kind = environ.get("MODEL_PROVIDER", "gemini").lower()
+    if kind == "gemini":
+        return GeminiProvider()
+    if kind == "local":
+        return OpenAICompatibleProvider(
+            environ.get("LOCAL_MODEL_URL", "http://127.0.0.1:8080"),
+            api_key=environ.get("LOCAL_MODEL_API_KEY"),
+            timeout=float(environ.get("LOCAL_MODEL_TIMEOUT", 60.0)),
+        )
+    if kind == "stub":
+        return StubProvider(latency=float(environ.get("STUB_MODEL_LATENCY", 0.0)))
+    raise ValueError(f"Unknown MODEL_PROVIDER '{kind}' (expected gemini, local or stub)")
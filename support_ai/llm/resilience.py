@@ -0,0 +1,303 @@
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from ..deadline import current_deadline
+
+
+class BackendError(RuntimeError):
+    """A model backend call failed"""
+
+
+class RateLimitError(BackendError):
+    """The provider rejected the call for quota reasons (HTTP 429 / ResourceExhausted)"""
+
+
+class TransientError(BackendError):
+    """A failure worth retrying: timeout, connection error, server-side 5xx"""
+
+
+class CircuitOpenError(BackendError):
+    """The circuit breaker is open; the call was not attempted"""
+
+
+class QueueTimeoutError(BackendError):
+    """Waited too long for a rate-limit token or a concurrency slot"""
+
+
+def is_rate_limit(error: BaseException) -> bool:
+    if isinstance(error, RateLimitError):
+        return True
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return code == 429 or getattr(code, "value", None) == 429
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Only quota pushback and transient failures are retried; a queue timeout
+    means the caller already waited its share, and other errors (bad request,
+    auth) would fail the same way again"""
+    if isinstance(error, (QueueTimeoutError, CircuitOpenError)):
+        return False
+    return is_rate_limit(error) or isinstance(error, (TransientError, TimeoutError, ConnectionError))
+
+
+class TokenBucket:
+    """Client-side rate limiter: `rate` calls per second with bursts up to `burst`"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait = min(wait, remaining)
+                self._cond.wait(wait)
+
+
+class AdaptiveConcurrency:
+    """AIMD concurrency limit.
+
+    The limit grows by one every `limit` successful calls (additive increase) and
+    is halved on a rate-limit error or when latency exceeds `latency_target`
+    (multiplicative decrease).
+    """
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 32,
+                 latency_target: Optional[float] = None, backoff: float = 0.5):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.in_flight = 0
+        self.waiting = 0
+        self.total_wait = 0.0
+        self.admitted = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None):
+        start = time.monotonic()
+        with self._cond:
+            self.waiting += 1
+            try:
+                while self.in_flight >= int(self.limit):
+                    remaining = None if timeout is None else timeout - (time.monotonic() - start)
+                    if remaining is not None and remaining <= 0:
+                        raise QueueTimeoutError("Timed out waiting for a model concurrency slot")
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+            self.admitted += 1
+            self.total_wait += time.monotonic() - start
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify()
+
+    def on_success(self, latency: float) -> None:
+        if self.latency_target is not None and latency > self.latency_target:
+            self._decrease()
+            return
+        with self._cond:
+            self.limit = min(self.maximum, self.limit + 1.0 / max(self.limit, 1.0))
+            self._cond.notify()
+
+    def on_overload(self) -> None:
+        self._decrease()
+
+    def _decrease(self) -> None:
+        with self._cond:
+            # Collapse a burst of failures from calls already in flight into one decrease
+            now = time.monotonic()
+            if now - self._last_decrease < 0.1:
+                return
+            self._last_decrease = now
+            self.limit = max(self.minimum, self.limit * self.backoff)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "admitted": self.admitted,
+                "avg_wait_seconds": round(self.total_wait / self.admitted, 4) if self.admitted else 0.0,
+            }
+
+
+class CircuitBreaker:
+    """Stop calling a failing backend for `reset_timeout` seconds after
+    `failure_threshold` consecutive failures, then let one probe call through."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logging.warning(f"Model circuit breaker opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def release(self) -> None:
+        """A call let through by allow() ended without a verdict on the backend
+        (queue timeout, rate limit); a half-open breaker lets the next probe through"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures, "rejected": self.rejected}
+
+
+def backoff_delays(retries: int, base: float = 0.5, cap: float = 8.0):
+    """Exponential backoff with full jitter"""
+    for attempt in range(retries):
+        yield random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class ResilientCaller:
+    """Rate limiting, adaptive concurrency, retries and a circuit breaker around
+    one backend callable. Shared by every model caller in the process."""
+
+    def __init__(self, rate: float = 10.0, burst: int = 10, max_concurrency: int = 16,
+                 initial_concurrency: int = 4, latency_target: Optional[float] = None,
+                 max_retries: int = 3, queue_timeout: float = 60.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = AdaptiveConcurrency(initial_concurrency, 1, max_concurrency, latency_target)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.max_retries = max_retries
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "successes": 0, "failures": 0, "retries": 0, "rate_limited": 0}
+
+    @classmethod
+    def from_env(cls, environ: Dict[str, str]) -> "ResilientCaller":
+        latency_target = environ.get("MODEL_LATENCY_TARGET")
+        return cls(
+            rate=float(environ.get("MODEL_RATE_LIMIT", 10.0)),
+            burst=int(environ.get("MODEL_BURST", 10)),
+            max_concurrency=int(environ.get("MODEL_MAX_CONCURRENCY", 16)),
+            latency_target=float(latency_target) if latency_target else None,
+            max_retries=int(environ.get("MODEL_MAX_RETRIES", 3)),
+        )
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def call(self, fn: Callable[[], Any], retryable: Callable[[BaseException], bool] = None) -> Any:
+        self._count("calls")
+        delays = backoff_delays(self.max_retries)
+        while True:
+            try:
+                return self._attempt(fn)
+            except Exception as e:
+                if not is_retryable(e) or (retryable is not None and not retryable(e)):
+                    self._count("failures")
+                    raise
+                delay = next(delays, None)
+                deadline = current_deadline()
+                if delay is None or (deadline is not None and deadline.remaining() <= delay):
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                logging.warning(f"Model call failed ({e}); retrying in {delay:.2f}s")
+                time.sleep(delay)
+
+    def _attempt(self, fn: Callable[[], Any]) -> Any:
+        if not self.breaker.allow():
+            raise CircuitOpenError("Model backend circuit is open")
+        settled = False
+        deadline = current_deadline()
+        try:
+            # Neither wait outlives the request's deadline
+            if not self.bucket.acquire(deadline.bound(self.queue_timeout) if deadline else self.queue_timeout):
+                raise QueueTimeoutError("Timed out waiting for the model rate limiter")
+            with self.concurrency.slot(deadline.bound(self.queue_timeout) if deadline else self.queue_timeout):
+                start = time.monotonic()
+                try:
+                    result = fn()
+                except Exception as e:
+                    if is_rate_limit(e):
+                        # Quota pushback is handled by backing off, not by opening the circuit
+                        self._count("rate_limited")
+                        self.concurrency.on_overload()
+                    else:
+                        self.breaker.record_failure()
+                        settled = True
+                    raise
+                self.concurrency.on_success(time.monotonic() - start)
+            self.breaker.record_success()
+            settled = True
+        finally:
+            if not settled:
+                # Otherwise a half-open probe would stay "in flight" and block every later call
+                self.breaker.release()
+        self._count("successes")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        return {**counters, "concurrency": self.concurrency.stats(), "circuit": self.breaker.stats()}
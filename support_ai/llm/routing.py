@@ -0,0 +1,210 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .providers import ModelProvider, provider_from_env
+
+# Task names used by TicketAnalyzer and the agents
+TASKS = ("summary", "sentiment", "issue", "solution", "chat", "email_draft")
+
+SENTIMENTS = ("positive", "negative", "neutral")
+_HEDGES = ("i'm not sure", "i am not sure", "i cannot", "i can't", "as an ai", "unable to")
+
+
+def _clean(text: str) -> str:
+    return (text or "").strip()
+
+
+def score_sentiment(text: str) -> float:
+    words = re.findall(r"[a-z]+", _clean(text).lower())
+    if len(words) == 1 and words[0] in SENTIMENTS:
+        return 1.0
+    return 0.5 if any(word in SENTIMENTS for word in words) else 0.0
+
+
+def score_short_answer(text: str, max_words: int) -> float:
+    """Non-empty, reasonably short and not a refusal"""
+    text = _clean(text)
+    if not text:
+        return 0.0
+    lowered = text.lower()
+    if any(hedge in lowered for hedge in _HEDGES):
+        return 0.2
+    return 1.0 if len(text.split()) <= max_words else 0.6
+
+
+def score_free_text(text: str) -> float:
+    text = _clean(text)
+    if not text:
+        return 0.0
+    lowered = text.lower()
+    return 0.3 if any(hedge in lowered for hedge in _HEDGES) else 1.0
+
+
+def score_email(text: str) -> float:
+    score = score_free_text(text)
+    return score if "autotriage.ai support team" in _clean(text).lower() else min(score, 0.5)
+
+
+# Confidence in [0, 1] that a task's output is usable
+VALIDATORS: Dict[str, Callable[[str], float]] = {
+    "sentiment": score_sentiment,
+    "issue": lambda text: score_short_answer(text, 40),
+    "summary": lambda text: score_short_answer(text, 80),
+    "solution": score_free_text,
+    "chat": score_free_text,
+    "email_draft": score_email,
+}
+
+
+class Tier:
+    def __init__(self, model: str, provider: Optional[ModelProvider] = None, cost_per_1k_tokens: float = 0.0):
+        self.model = model
+        self.provider = provider
+        self.cost_per_1k_tokens = cost_per_1k_tokens
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "Tier":
+        provider = None
+        if config.get("provider"):
+            environ = dict(os.environ, MODEL_PROVIDER=config["provider"])
+            if config.get("url"):
+                environ["LOCAL_MODEL_URL"] = config["url"]
+            provider = provider_from_env(environ)
+        return cls(config["model"], provider, float(config.get("cost_per_1k_tokens", 0.0)))
+
+
+class Route:
+    """Cascade of tiers for one task: answer with the first tier whose output
+    scores at least `min_confidence`, escalating to the next tier otherwise"""
+
+    def __init__(self, tiers: List[Tier], min_confidence: float = 0.7):
+        self.tiers = tiers
+        self.min_confidence = min_confidence
+
+    @classmethod
+    def from_config(cls, config: Any) -> "Route":
+        if isinstance(config, str):
+            config = {"tiers": [{"model": config}]}
+        elif isinstance(config, list):
+            config = {"tiers": config}
+        tiers = [Tier.from_config({"model": t} if isinstance(t, str) else t) for t in config["tiers"]]
+        return cls(tiers, float(config.get("min_confidence", 0.7)))
+
+
+class RouteStats:
+    __slots__ = ("calls", "errors", "escalations", "latency", "tokens", "cost")
+
+    def __init__(self):
+        self.calls = self.errors = self.escalations = self.tokens = 0
+        self.latency = self.cost = 0.0
+
+
+class ModelRouter:
+    """Per-task routing table loaded from MODEL_ROUTES.
+
+    MODEL_ROUTES is a path to a JSON file (re-read when it changes) or inline
+    JSON mapping task -> route, e.g.::
+
+        {"sentiment": {"tiers": [{"model": "gemma-3-1b-it", "cost_per_1k_tokens": 0.01},
+                                 {"model": "gemma-3-12b-it", "cost_per_1k_tokens": 0.1}],
+                       "min_confidence": 0.8},
+         "chat": "gemma-3-4b-it"}
+
+    Tasks without a route use the client's default model.
+    """
+
+    def __init__(self, source: Optional[str] = None):
+        self.source = source
+        self.routes: Dict[str, Route] = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._stats: Dict[tuple, RouteStats] = {}
+        self.reload()
+
+    @classmethod
+    def from_env(cls, environ: Dict[str, str]) -> "ModelRouter":
+        return cls(environ.get("MODEL_ROUTES"))
+
+    def reload(self) -> None:
+        if not self.source:
+            return
+        try:
+            if os.path.exists(self.source):
+                mtime = os.path.getmtime(self.source)
+                if mtime == self._mtime:
+                    return
+                with open(self.source) as f:
+                    config = json.load(f)
+                self._mtime = mtime
+            else:
+                if self._mtime == "inline":
+                    return
+                config = json.loads(self.source)
+                self._mtime = "inline"
+            routes = {task: Route.from_config(route) for task, route in config.items()}
+        except Exception as e:
+            logging.error(f"Could not load model routes from MODEL_ROUTES: {e}")
+            return
+        with self._lock:
+            self.routes = routes
+        logging.info(f"Loaded model routes for: {', '.join(sorted(routes)) or 'no tasks'}")
+
+    def route_for(self, task: Optional[str]) -> Optional[Route]:
+        if not task:
+            return None
+        self.reload()
+        return self.routes.get(task)
+
+    def _record(self, task: str, model: str, latency: float, tokens: int, cost: float,
+                error: bool = False, escalated: bool = False) -> None:
+        with self._lock:
+            stats = self._stats.setdefault((task, model), RouteStats())
+            stats.calls += 1
+            stats.latency += latency
+            stats.tokens += tokens
+            stats.cost += cost
+            stats.errors += int(error)
+            stats.escalations += int(escalated)
+
+    def run(self, task: str, route: Route, prompt: str,
+            call: Callable[[Optional[ModelProvider], str, str], str]) -> str:
+        """Walk the cascade; `call(provider, model, prompt)` does one model call"""
+        validator = VALIDATORS.get(task, score_free_text)
+        for i, tier in enumerate(route.tiers):
+            last = i == len(route.tiers) - 1
+            start = time.monotonic()
+            try:
+                text = call(tier.provider, tier.model, prompt)
+            except Exception:
+                self._record(task, tier.model, time.monotonic() - start, 0, 0.0, error=True, escalated=not last)
+                if last:
+                    raise
+                continue
+            latency = time.monotonic() - start
+            # Rough token estimate (~4 characters per token) for cost tracking
+            tokens = (len(prompt) + len(text)) // 4
+            cost = tokens / 1000 * tier.cost_per_1k_tokens
+            confident = validator(text) >= route.min_confidence
+            self._record(task, tier.model, latency, tokens, cost, escalated=not confident and not last)
+            if confident or last:
+                return text
+        raise RuntimeError(f"Route for task '{task}' has no tiers")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                f"{task}/{model}": {
+                    "calls": s.calls,
+                    "errors": s.errors,
+                    "escalation_rate": round(s.escalations / s.calls, 3) if s.calls else 0.0,
+                    "avg_latency_seconds": round(s.latency / s.calls, 4) if s.calls else 0.0,
+                    "tokens": s.tokens,
+                    "cost": round(s.cost, 6),
+                }
+                for (task, model), s in self._stats.items()
+            }
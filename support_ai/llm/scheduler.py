@@ -0,0 +1,156 @@
+"""Priority-aware admission of model calls.
+
+Every backend call waits here for one of the resilience layer's concurrency
+slots. Waiting calls are ordered by weighted fair queuing across priority
+classes (virtual finish tags, one unit of cost per call), so a backlog of
+batch work gets only its share of capacity while live chat goes first. A call
+that has waited longer than `max_wait` is admitted ahead of everything else,
+so no class starves.
+
+The class of a call comes from the innermost priority_scope(), else from its
+task (chat replies are interactive, email drafts are drafts), else "standard".
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Union
+
+from ..metrics import REGISTRY
+from .resilience import QueueTimeoutError
+
+# Highest first; weights are relative shares of capacity under contention
+DEFAULT_WEIGHTS = {"interactive": 16.0, "critical": 8.0, "standard": 4.0, "draft": 2.0, "batch": 1.0}
+TASK_PRIORITIES = {"chat": "interactive", "email_draft": "draft"}
+
+QUEUE_WAIT = REGISTRY.histogram("support_ai_llm_queue_wait_seconds", "Time model calls waited for admission")
+
+_priority: contextvars.ContextVar = contextvars.ContextVar("support_ai_llm_priority", default=None)
+
+
+@contextmanager
+def priority_scope(name: str) -> Iterator[None]:
+    """Run model calls made inside the block (in this thread/context) at the given priority class"""
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> Optional[str]:
+    """The explicitly scoped priority class, or None"""
+    return _priority.get()
+
+
+def resolve_priority(task: Optional[str] = None) -> str:
+    return _priority.get() or TASK_PRIORITIES.get(task, "standard")
+
+
+def priority_rank(name: str) -> int:
+    """Orders classes by urgency (higher is more urgent); unknown classes rank as standard"""
+    order = list(reversed(DEFAULT_WEIGHTS))
+    return order.index(name if name in DEFAULT_WEIGHTS else "standard")
+
+
+class _Waiter:
+    __slots__ = ("tag", "enqueued")
+
+    def __init__(self, tag: float):
+        self.tag = tag
+        self.enqueued = time.monotonic()
+
+
+class PriorityScheduler:
+    def __init__(self, capacity: Union[int, Callable[[], int]], weights: Dict[str, float] = None,
+                 max_wait: float = 10.0, poll_interval: float = 0.05):
+        # A callable capacity follows a moving limit (the AIMD concurrency limit)
+        self._capacity = capacity if callable(capacity) else (lambda: capacity)
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self._queues = {name: deque() for name in self.weights}
+        self._last_finish = {name: 0.0 for name in self.weights}
+        self._virtual_time = 0.0
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        self.counters = {name: {"admitted": 0, "aged": 0, "timeouts": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+                         for name in self.weights}
+
+    @classmethod
+    def from_env(cls, capacity: Union[int, Callable[[], int]], environ: Dict[str, str]) -> Optional["PriorityScheduler"]:
+        if environ.get("MODEL_SCHEDULER_ENABLED", "1").lower() in ("0", "false", "no"):
+            return None
+        weights = dict(DEFAULT_WEIGHTS)
+        for part in filter(None, environ.get("MODEL_SCHEDULER_WEIGHTS", "").split(",")):
+            name, _, weight = part.partition("=")
+            if name.strip() in weights:
+                weights[name.strip()] = float(weight)
+        return cls(capacity, weights, max_wait=float(environ.get("MODEL_SCHEDULER_MAX_WAIT", 10.0)))
+
+    def _next(self, now: float) -> Optional[_Waiter]:
+        heads = [(name, queue[0]) for name, queue in self._queues.items() if queue]
+        if not heads:
+            return None
+        aged = [head for head in heads if now - head[1].enqueued >= self.max_wait]
+        if aged:
+            return min(aged, key=lambda head: head[1].enqueued)[1]
+        return min(heads, key=lambda head: head[1].tag)[1]
+
+    def acquire(self, priority: str, timeout: Optional[float] = None) -> None:
+        """Wait for admission; every acquire() must be paired with one release()"""
+        name = priority if priority in self._queues else "standard"
+        with self._cond:
+            tag = max(self._virtual_time, self._last_finish[name]) + 1.0 / self.weights[name]
+            self._last_finish[name] = tag
+            waiter = _Waiter(tag)
+            self._queues[name].append(waiter)
+            while True:
+                now = time.monotonic()
+                if self.in_flight < max(1, self._capacity()) and self._next(now) is waiter:
+                    break
+                if timeout is not None and now - waiter.enqueued >= timeout:
+                    self._queues[name].remove(waiter)
+                    self.counters[name]["timeouts"] += 1
+                    self._cond.notify_all()
+                    raise QueueTimeoutError(f"Timed out waiting for a {name} model slot")
+                # Capacity can grow without a release (AIMD increase), so re-check periodically
+                self._cond.wait(self.poll_interval)
+            self._queues[name].popleft()
+            self._virtual_time = max(self._virtual_time, tag)
+            self.in_flight += 1
+            waited = now - waiter.enqueued
+            stats = self.counters[name]
+            stats["admitted"] += 1
+            stats["aged"] += int(waited >= self.max_wait)
+            stats["wait_seconds"] += waited
+            stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+            # The next head may be admissible too
+            self._cond.notify_all()
+        QUEUE_WAIT.observe(waited, priority=name)
+
+    def release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority: str, timeout: Optional[float] = None) -> Iterator[None]:
+        self.acquire(priority, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "in_flight": self.in_flight,
+                "capacity": self._capacity(),
+                "classes": {
+                    name: {**{k: round(v, 4) if isinstance(v, float) else v for k, v in counters.items()},
+                           "queued": len(self._queues[name]), "weight": self.weights[name]}
+                    for name, counters in self.counters.items()
+                },
+            }
@@ -0,0 +1,76 @@
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "duplicates", "rank")
+
+    def __init__(self, rank: int):
+        self.done = threading.Event()
+        self.rank = rank
+        self.result = None
+        self.error = None
+        self.duplicates = 0
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    in flight wait and receive the same result (or exception). Nothing is cached
+    once the call completes.
+
+    A caller only joins a flight started at the same or a higher `rank`
+    (priority): a more urgent caller does not wait behind a call that is
+    queued as background work, it starts its own and later callers join that.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executed = 0
+        self.coalesced = 0
+        self.overtaken = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], rank: int = 0) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and call.rank >= rank:
+                call.duplicates += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                if call is not None:
+                    self.overtaken += 1
+                call = _Call(rank)
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                # An overtaking caller may have replaced this flight
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "overtaken": self.overtaken,
+                "in_flight": len(self._calls),
+            }
@@ -0,0 +1,203 @@
+"""Lightweight Prometheus-style metrics.
+
+Counters, gauges and histograms with labels, a `span()` timer for pipeline
+stages, and text exposition for a /metrics endpoint. Each metric is a dict
+guarded by its own lock, so recording costs a lock and a few additions.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from .hooks import HOOKS
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def expose(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return self.header() + [f"{self.name}{_format_labels(k)} {v}" for k, v in values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [bucket counts..., sum, count]
+        self._values: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                row[index] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def expose(self) -> List[str]:
+        with self._lock:
+            values = {k: list(v) for k, v in self._values.items()}
+        lines = self.header()
+        for key, row in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, row):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', repr(bound))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {row[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {row[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {row[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Dict[str, float]]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help_text: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._get_or_create(Counter, name, help_text)
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text)
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, buckets=buckets)
+
+    def register_collector(self, collector: Callable[[], Dict[str, float]]) -> None:
+        """Add a callback returning {metric_name: value} gauges sampled at scrape time"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def expose(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        for collector in collectors:
+            try:
+                for name, value in collector().items():
+                    lines.append(f"# TYPE {name.split('{')[0]} gauge")
+                    lines.append(f"{name} {value}")
+            except Exception:
+                continue
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram("support_ai_stage_duration_seconds", "Time spent per pipeline stage")
+STAGE_IN_FLIGHT = REGISTRY.gauge("support_ai_stage_in_flight", "Stages currently executing")
+STAGE_ERRORS = REGISTRY.counter("support_ai_stage_errors_total", "Stages that raised an exception")
+LLM_TOKENS = REGISTRY.counter("support_ai_llm_tokens_total", "Estimated LLM tokens (about 4 characters per token)")
+
+
+@contextmanager
+def span(stage: str, **labels):
+    """Time a stage into the stage histogram, track it as in flight and
+    announce it to the before/after stage hooks"""
+    hooks_active = bool(HOOKS)
+    if hooks_active:
+        HOOKS.emit("before", stage, dict(labels))
+    labels["stage"] = stage
+    STAGE_IN_FLIGHT.inc(**labels)
+    error = None
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        error = e
+        STAGE_ERRORS.inc(**labels)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_SECONDS.observe(duration, **labels)
+        STAGE_IN_FLIGHT.dec(**labels)
+        if hooks_active:
+            context = {k: v for k, v in labels.items() if k != "stage"}
+            HOOKS.emit("after", stage, dict(context, duration=duration, error=error))
+
+
+def count_tokens(task: str, prompt: str, completion: str) -> None:
+    LLM_TOKENS.inc(len(prompt) // 4, task=task, kind="prompt")
+    LLM_TOKENS.inc(len(completion) // 4, task=task, kind="completion")
+
+
+def flatten_stats(prefix: str, stats: Dict, out: Dict[str, float] = None) -> Dict[str, float]:
+    """Turn a nested stats() dict into {metric_name: value} for numeric leaves"""
+    out = {} if out is None else out
+    for key, value in stats.items():
+        name = f"{prefix}_{key}".replace("/", "_").replace("-", "_").replace(".", "_")
+        if isinstance(value, dict):
+            flatten_stats(name, value, out)
+        elif isinstance(value, bool):
+            out[name] = int(value)
+        elif isinstance(value, (int, float)):
+            out[name] = value
+    return out
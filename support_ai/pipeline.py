@@ -1,10 +1,28 @@
 from typing import Dict, Any
 from .analyzer import TicketAnalyzer
+from .deadline import Deadline
+from .drafts import DraftPregenerator
+from .metrics import span
+from .profiling import profile, requested_mode
+from .speculative import SpeculativeAnalyzer
+from .upgrade import ResultUpgrader
 import logging
+import os
 
 class SupportPipeline:
     def __init__(self):
         self.analyzer = TicketAnalyzer()
+        # None when SPECULATIVE_ANALYSIS_ENABLED=0
+        self.speculative = SpeculativeAnalyzer.from_env(self.analyzer, os.environ)
+        # Seconds allowed for one analysis; 0 waits for the model however long it takes
+        self.deadline = float(os.environ.get("ANALYSIS_DEADLINE", 0))
+        # None when ANALYSIS_UPGRADE_ENABLED=0
+        self.upgrader = ResultUpgrader.from_env(self.analyzer, os.environ)
+        # None when EMAIL_DRAFT_PREGENERATE=0
+        self.drafts = DraftPregenerator.from_env(self.analyzer, os.environ)
+        if self.upgrader is not None:
+            # An upgraded ticket has a new solution, so its draft is written (again) from that
+            self.upgrader.on_upgraded = self.schedule_draft
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
     
@@ -17,7 +35,26 @@ class SupportPipeline:
             return False
         return True
     
-    def process(self, chat_text: str, ticket_data: Dict[str, Any]) -> Dict[str, Any]:
+    def speculate(self, conversation_id: str, chat_text: str, ticket_data: Dict[str, Any]) -> None:
+        """Start analyzing a live conversation in the background, ahead of process()"""
+        if self.speculative is not None and conversation_id and self.validate_input(chat_text, ticket_data):
+            self.speculative.speculate(conversation_id, chat_text, ticket_data)
+
+    def schedule_upgrade(self, ticket_path: str, chat_text: str, ticket_data: Dict[str, Any]) -> None:
+        """Re-analyze a saved partial ticket in the background and update its file"""
+        if self.upgrader is not None:
+            self.upgrader.schedule(ticket_path, chat_text, ticket_data)
+
+    def schedule_draft(self, ticket_path: str, ticket: Dict[str, Any]) -> None:
+        """Pre-generate the email draft for a saved High/Critical ticket in the background"""
+        if self.drafts is not None:
+            self.drafts.schedule(ticket_path, ticket)
+
+    def process(self, chat_text: str, ticket_data: Dict[str, Any], conversation_id: str = None,
+                deadline: float = None) -> Dict[str, Any]:
+        """Analyze a conversation within `deadline` seconds (default ANALYSIS_DEADLINE);
+        model stages still unfinished by then are replaced by fallbacks and the
+        result is marked partial"""
         try:
             # Validate inputs
             if not self.validate_input(chat_text, ticket_data):
@@ -25,11 +62,21 @@ class SupportPipeline:
 
             # Analyze the ticket
             self.logger.info("Starting ticket analysis...")
-            result = self.analyzer.analyze_ticket(chat_text, ticket_data)
+            budget = self.deadline if deadline is None else deadline
+            deadline = Deadline(budget) if budget and budget > 0 else None
+            # SUPPORT_AI_PROFILE=cprofile|sample profiles every run
+            with span("pipeline"), profile("pipeline", requested_mode()):
+                if self.speculative is not None and conversation_id:
+                    # Reuses whatever speculate() already worked out for this conversation
+                    result = self.speculative.analyze(conversation_id, chat_text, ticket_data, deadline)
+                else:
+                    result = self.analyzer.analyze_ticket(chat_text, ticket_data, deadline=deadline)
             
             # Validate results
             if result.confidence < 0.3:
                 self.logger.warning(f"Low confidence score: {result.confidence}")
+            if result.partial:
+                self.logger.warning(f"Partial analysis, fallbacks used for: {', '.join(result.degraded_stages)}")
             
             # Convert to dictionary format
             return {
@@ -42,7 +89,9 @@ class SupportPipeline:
                 "confidence_score": result.confidence,
                 "similar_cases": result.similar_cases,
                 "action_items": result.action_items,
-                "sentiment": result.sentiment
+                "sentiment": result.sentiment,
+                "partial": result.partial,
+                "degraded_stages": result.degraded_stages or []
             }
         except Exception as e:
             self.logger.error(f"Error in pipeline: {str(e)}")
@@ -0,0 +1,178 @@
+"""On-demand profiling for pipeline runs and Flask requests.
+
+Turn it on for every run with SUPPORT_AI_PROFILE=cprofile|sample, or per
+request with an `X-Profile: cprofile` (or `sample`) header. The header is
+ignored unless the server opted in with SUPPORT_AI_PROFILE_HEADER=1 and the
+request carries the shared SUPPORT_AI_PROFILE_TOKEN in `X-Profile-Token`.
+Output goes to SUPPORT_AI_PROFILE_DIR (default `profiles/`), one file per run,
+keeping the newest SUPPORT_AI_PROFILE_MAX_FILES (default 100):
+
+- cprofile: a `.prof` pstats dump (snakeviz, `flameprof`, `python -m pstats`)
+- sample:   a `.folded` collapsed-stack file from a wall-clock sampler over the
+            profiled thread (flamegraph.pl, speedscope, inferno)
+"""
+import cProfile
+import glob
+import hmac
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+MODES = ("cprofile", "sample")
+
+_active = threading.local()
+
+
+def requested_mode(header_value: Optional[str] = None) -> Optional[str]:
+    """Profiling mode from a request header value, falling back to SUPPORT_AI_PROFILE"""
+    value = (header_value or os.environ.get("SUPPORT_AI_PROFILE", "")).strip().lower()
+    if value in ("1", "true", "yes"):
+        return "cprofile"
+    return value if value in MODES else None
+
+
+def header_allowed(token: Optional[str]) -> bool:
+    """Whether a request may turn profiling on with the header: only if the server opted in
+    and the request carries the shared token"""
+    if os.environ.get("SUPPORT_AI_PROFILE_HEADER", "0").lower() not in ("1", "true", "yes"):
+        return False
+    expected = os.environ.get("SUPPORT_AI_PROFILE_TOKEN", "")
+    if not expected:
+        logging.warning("SUPPORT_AI_PROFILE_HEADER is set but SUPPORT_AI_PROFILE_TOKEN is not; ignoring X-Profile")
+        return False
+    return bool(token) and hmac.compare_digest(token.encode("utf-8"), expected.encode("utf-8"))
+
+
+def _prune(directory: str, keep: int) -> None:
+    """Delete the oldest profiles beyond `keep`"""
+    paths = glob.glob(os.path.join(directory, "*.prof")) + glob.glob(os.path.join(directory, "*.folded"))
+    if len(paths) <= keep:
+        return
+    paths.sort(key=lambda path: os.path.getmtime(path) if os.path.exists(path) else 0.0)
+    for path in paths[:len(paths) - keep]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _output_path(label: str, extension: str) -> str:
+    directory = os.environ.get("SUPPORT_AI_PROFILE_DIR", "profiles")
+    os.makedirs(directory, exist_ok=True)
+    # Room for the file about to be written
+    _prune(directory, max(0, int(os.environ.get("SUPPORT_AI_PROFILE_MAX_FILES", 100)) - 1))
+    safe_label = re.sub(r"[^A-Za-z0-9_.-]+", "_", label).strip("_") or "run"
+    name = f"{safe_label}_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}.{extension}"
+    return os.path.join(directory, name)
+
+
+class SamplingProfiler:
+    """Wall-clock sampler for one thread, producing collapsed stacks"""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="support-ai-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def profile(label: str, mode: Optional[str]) -> Iterator[dict]:
+    """Profile the enclosed block in this thread; yields a dict that gets the output path.
+
+    Nested calls (e.g. a profiled request running a profiled pipeline) are
+    folded into the outermost profile.
+    """
+    info = {"path": None}
+    if mode not in MODES or getattr(_active, "on", False):
+        yield info
+        return
+
+    _active.on = True
+    try:
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield info
+            finally:
+                profiler.disable()
+                info["path"] = _output_path(label, "prof")
+                profiler.dump_stats(info["path"])
+        else:
+            sampler = SamplingProfiler(threading.get_ident())
+            sampler.start()
+            try:
+                yield info
+            finally:
+                sampler.stop()
+                info["path"] = _output_path(label, "folded")
+                sampler.write(info["path"])
+        logging.info(f"Profile for '{label}' written to {info['path']}")
+    finally:
+        _active.on = False
+
+
+def install_flask_profiling(app, header: str = "X-Profile", token_header: str = "X-Profile-Token") -> None:
+    """Profile individual Flask requests when SUPPORT_AI_PROFILE, or an allowed header, asks for it.
+
+    The output path is returned in an `X-Profile-Output` response header.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _start_profile():
+        value = request.headers.get(header)
+        if value and not header_allowed(request.headers.get(token_header)):
+            value = None
+        mode = requested_mode(value)
+        if mode:
+            g.profile_cm = profile(f"{request.endpoint or 'request'}", mode)
+            g.profile_info = g.profile_cm.__enter__()
+
+    @app.after_request
+    def _attach_profile_path(response):
+        profile_cm = g.pop("profile_cm", None)
+        if profile_cm is not None:
+            profile_cm.__exit__(None, None, None)
+            if g.profile_info.get("path"):
+                response.headers["X-Profile-Output"] = g.profile_info["path"]
+        return response
+
+    @app.teardown_request
+    def _stop_profile(exc):
+        # Requests that raised never reach after_request
+        profile_cm = g.pop("profile_cm", None)
+        if profile_cm is not None:
+            profile_cm.__exit__(None, None, None)
@@ -0,0 +1,240 @@
+from datetime import datetime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Any, Dict, Iterable, List, Tuple
+import smtplib
+import time
+
+from .digest import RESOLUTION_BOUNDS, resolution_percentile
+from .templates import CompiledTemplate, compile_template
+
+_stamp = (0, "")
+
+def report_timestamp() -> str:
+    """Generation time for reports, formatted once per second rather than per report"""
+    global _stamp
+    second = int(time.time())
+    if _stamp[0] != second:
+        # One tuple swap, so concurrent readers see either the old or the new pair
+        _stamp = (second, datetime.fromtimestamp(second).strftime("%Y-%m-%d %H:%M:%S"))
+    return _stamp[1]
+
+
+# Digest body; its sections are lists of DIGEST_ROW, bounded by the number of
+# teams/priorities/bins rather than by how many tickets the window holds
+DIGEST_FRAGMENT = compile_template("\n".join([
+    '<div class="card">',
+    '<div class="card-header">',
+    '<h2>{title}</h2>',
+    '<div style="color:#e2e8f0;margin-top:5px;">{window} (generated {timestamp})</div>',
+    '</div>',
+    '<div class="card-body">',
+    '<div class="metric"><strong>New Tickets:</strong> {created}</div>',
+    '<div class="metric"><strong>Resolved:</strong> {resolved}</div>',
+    '<div class="metric"><strong>Open (all time):</strong> {open}</div>',
+    '<div class="metric"><strong>Provisional Analyses:</strong> {partial}</div>',
+    '</div>',
+    '</div>',
+    '<div class="card">',
+    '<div class="card-body">',
+    '<h3>By Team</h3>{teams}',
+    '<h3>By Priority</h3>{priorities}',
+    '<h3>By Sentiment</h3>{sentiments}',
+    '<h3>Confidence</h3>{confidence}',
+    '</div>',
+    '</div>',
+    '<div class="card">',
+    '<div class="card-body">',
+    '<h3>Time to Resolution</h3>{resolution}',
+    '</div>',
+    '</div>',
+]), safe=("teams", "priorities", "sentiments", "confidence", "resolution"))
+
+DIGEST_ROW = compile_template('<div class="metric"><strong>{label}:</strong> {value}</div>')
+
+
+def _hours(value) -> str:
+    return "n/a" if value is None else f"{value:.1f}h"
+
+
+class BaseReportGenerator:
+    """Incident reports rendered from compiled templates and sent over SMTP.
+
+    Subclasses supply the static `shell` (a document with a safe {content}
+    slot), the per-ticket `fragment` and the optional `comments` fragment
+    (inserted into the fragment's safe {comments} slot). All three are parsed
+    once at import, so a report costs one pass over the ticket fields, and
+    many tickets render in one pass (one timestamp, one shell) with
+    generate_ticket_reports() or generate_combined_report().
+
+    generate_digest_report() renders a triage digest (see support_ai.digest)
+    into the same shell; it only reads the digest's aggregates.
+    """
+
+    shell: CompiledTemplate
+    fragment: CompiledTemplate
+    comments: CompiledTemplate
+    digest = DIGEST_FRAGMENT
+
+    def __init__(self, smtp_settings: Dict[str, Any]):
+        """Initialize the ReportGenerator with SMTP settings"""
+        self.smtp_settings = smtp_settings.copy()
+        
+        # Ensure port is an integer
+        if isinstance(self.smtp_settings.get('port'), str):
+            self.smtp_settings['port'] = int(self.smtp_settings['port'])
+
+    def render_fragment(self, ticket_data: Dict[str, Any], timestamp: str) -> str:
+        """The per-ticket part of a report, without the document shell"""
+        return self.fragment.render(
+            ticket_id=ticket_data.get('ticket_id', 'N/A'),
+            timestamp=timestamp,
+            priority=ticket_data.get('priority', 'N/A'),
+            confidence=ticket_data.get('confidence', 0.0),
+            team=ticket_data.get('team', 'N/A'),
+            sentiment=ticket_data.get('sentiment', 'N/A').title(),
+            summary=ticket_data.get('summary', 'Not available.'),
+            issue=ticket_data.get('issue', 'Not available.'),
+            suggested_solution=ticket_data.get('suggested_solution', 'No recommendations available.'),
+            comments=self.comments.render(admin_comments=ticket_data['admin_comments'])
+                     if ticket_data.get('admin_comments') else '',
+        )
+
+    def generate_ticket_report(self, ticket_data: Dict[str, Any], timestamp: str = None) -> str:
+        """Generate HTML report from ticket data"""
+        timestamp = timestamp or report_timestamp()
+        return self.shell.render(content=self.render_fragment(ticket_data, timestamp))
+
+    def generate_ticket_reports(self, tickets: Iterable[Dict[str, Any]]) -> List[str]:
+        """One report per ticket, stamped with the same generation time"""
+        timestamp = report_timestamp()
+        return [self.generate_ticket_report(ticket, timestamp) for ticket in tickets]
+
+    def generate_combined_report(self, tickets: Iterable[Dict[str, Any]]) -> str:
+        """All tickets in one document"""
+        timestamp = report_timestamp()
+        return self.shell.render(content="\n".join(self.render_fragment(ticket, timestamp) for ticket in tickets))
+
+    def generate_digest_report(self, digest: Dict[str, Any], title: str = "Triage Digest") -> str:
+        """HTML digest from merged aggregates (DigestStore.hourly()/daily())"""
+        def rows(counts: Dict[str, int]):
+            return "".join(DIGEST_ROW.render_many(
+                {"label": name, "value": count}
+                for name, count in sorted(counts.items(), key=lambda item: -item[1]))) or "<p>None</p>"
+
+        bins = len(digest["confidence"])
+        confidence = {f"{i / bins:.1f}-{(i + 1) / bins:.1f}": count
+                      for i, count in enumerate(digest["confidence"]) if count}
+        resolution = digest["resolution"]
+        lines = [
+            {"label": "Resolved with known age", "value": resolution["count"]},
+            {"label": "Mean", "value": _hours(resolution["sum"] / resolution["count"] if resolution["count"] else None)},
+            {"label": "Median (at most)", "value": _hours(resolution_percentile(digest, 0.5))},
+            {"label": "90th percentile (at most)", "value": _hours(resolution_percentile(digest, 0.9))},
+            {"label": "Longest", "value": _hours(resolution["max"] if resolution["count"] else None)},
+        ]
+        lines += [{"label": f"Mean for {priority}", "value": _hours(total / count)}
+                  for priority, (count, total) in sorted(digest["resolution_by_priority"].items())]
+        if resolution["count"] and resolution["histogram"][-1]:
+            lines.append({"label": f"Over {RESOLUTION_BOUNDS[-1]}h", "value": resolution["histogram"][-1]})
+        window = " - ".join(datetime.fromtimestamp(t).strftime("%Y-%m-%d %H:%M") for t in (digest["start"], digest["end"]))
+        return self.shell.render(content=self.digest.render(
+            title=title, window=window, timestamp=report_timestamp(),
+            created=digest["created"], resolved=digest["resolved"], open=digest["open"], partial=digest["partial"],
+            teams=rows(digest["team"]), priorities=rows(digest["priority"]), sentiments=rows(digest["sentiment"]),
+            confidence=rows(confidence), resolution="".join(DIGEST_ROW.render_many(lines)),
+        ))
+
+    def send_report(self, recipient: str, subject: str, ticket_data: Dict[str, Any]) -> Tuple[bool, str]:
+        """Send the report via email"""
+        return self.send_html(recipient, subject, self.generate_ticket_report(ticket_data))
+
+    def send_digest(self, recipient: str, subject: str, digest: Dict[str, Any]) -> Tuple[bool, str]:
+        """Send a digest report via email"""
+        return self.send_html(recipient, subject, self.generate_digest_report(digest, title=subject))
+
+    def send_html(self, recipient: str, subject: str, html_content: str) -> Tuple[bool, str]:
+        """Send an already rendered report"""
+        server = None
+        try:
+            # Validate SMTP settings
+            required_settings = ['server', 'port', 'username', 'password']
+            if not all(key in self.smtp_settings for key in required_settings):
+                missing = [key for key in required_settings if key not in self.smtp_settings]
+                error_msg = f"Missing SMTP settings: {', '.join(missing)}"
+                print(f"Debug - {error_msg}")
+                return False, error_msg
+
+            # Prepare email message
+            msg = MIMEMultipart('alternative')
+            msg['Subject'] = subject
+            msg['From'] = self.smtp_settings['username']
+            msg['To'] = recipient
+            
+            # Attach HTML report
+            msg.attach(MIMEText(html_content, 'html'))
+
+            # Connect to SMTP server
+            print(f"Debug - Connecting to SMTP server {self.smtp_settings['server']}:{self.smtp_settings['port']}...")
+            server = smtplib.SMTP(self.smtp_settings['server'], self.smtp_settings['port'])
+            server.set_debuglevel(1)  # Enable SMTP debug output
+            
+            # Initial EHLO
+            server.ehlo()
+            print("Debug - Initial EHLO completed")
+            
+            # Start TLS encryption (settings may turn it off for plain relays)
+            if self.smtp_settings.get('starttls', True):
+                print("Debug - Starting TLS...")
+                server.starttls()
+
+                # Re-run EHLO after TLS
+                server.ehlo()
+                print("Debug - TLS encryption established")
+            
+            # Login with credentials
+            print(f"Debug - Attempting login for {self.smtp_settings['username']}...")
+            server.login(
+                self.smtp_settings['username'],
+                self.smtp_settings['password'].strip()
+            )
+            print("Debug - Login successful")
+            
+            # Send email
+            print("Debug - Sending message...")
+            server.send_message(msg)
+            print("Debug - Message sent successfully")
+            
+            # Clean up
+            if server:
+                server.quit()
+            return True, "Email sent successfully"
+            
+        except smtplib.SMTPAuthenticationError as e:
+            error_msg = "Authentication failed. Please verify your Gmail App Password. "
+            error_msg += "Make sure you have:\n"
+            error_msg += "1. Enabled 2-Step Verification in your Google Account\n"
+            error_msg += "2. Generated an App Password specifically for this application\n"
+            error_msg += "3. Copied the 16-character password correctly without spaces"
+            print(f"Debug - Authentication Error: {str(e)}")
+            return False, error_msg
+            
+        except smtplib.SMTPException as e:
+            error_msg = f"SMTP error occurred: {str(e)}"
+            print(f"Debug - SMTP Error: {str(e)}")
+            return False, error_msg
+            
+        except Exception as e:
+            error_msg = f"Unexpected error: {str(e)}"
+            print(f"Debug - Unexpected Error: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return False, error_msg
+            
+        finally:
+            # Always try to clean up the connection
+            if server:
+                try:
+                    server.quit()
+                except Exception:
+                    pass
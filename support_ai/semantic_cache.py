@@ -0,0 +1,251 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+
+
+class _Entry:
+    __slots__ = ("vector", "result", "created", "text", "hits", "row")
+
+    def __init__(self, vector, result: str, text: str):
+        self.vector = vector
+        self.result = result
+        self.created = time.monotonic()
+        # Full text, to recognize an earlier or later version of the same conversation
+        self.text = text
+        self.hits = 0
+        self.row = -1
+
+
+class _Rows:
+    """Stacked entry vectors of one task. Inserts append to a small tail that is
+    sealed into a block every BLOCK rows, so no insert restacks the other rows;
+    removed entries leave a dead row until the cache compacts."""
+
+    BLOCK = 64
+
+    def __init__(self):
+        self.blocks: List[Any] = []
+        self.tail: List[Any] = []
+        self._tail_matrix = None
+        # Row -> entry key, None once the entry is gone
+        self.keys: List[Optional[str]] = []
+        self.dead = 0
+
+    def append(self, key: str, vector) -> int:
+        self.keys.append(key)
+        self.tail.append(vector)
+        self._tail_matrix = None
+        if len(self.tail) == self.BLOCK:
+            self.blocks.append(sp.vstack(self.tail, format="csr"))
+            self.tail = []
+        return len(self.keys) - 1
+
+    def remove(self, row: int) -> None:
+        self.keys[row] = None
+        self.dead += 1
+
+    def scores(self, vector) -> np.ndarray:
+        # One dense copy of the query; sparse-times-dense per block is cheaper than transposing
+        # the sparse query for every block
+        query = vector.toarray().ravel()
+        parts = [block.dot(query) for block in self.blocks]
+        if self.tail:
+            if self._tail_matrix is None:
+                self._tail_matrix = sp.vstack(self.tail, format="csr")
+            parts.append(self._tail_matrix.dot(query))
+        return np.concatenate(parts) if parts else np.zeros(0)
+
+
+_TURN_START = re.compile(r"^\w[\w ]*:")
+
+def _turns(text: str) -> List[str]:
+    """Split "Role: message" lines into turns; lines without a role continue the turn before"""
+    turns: List[str] = []
+    for line in text.splitlines():
+        if turns and not _TURN_START.match(line):
+            turns[-1] += "\n" + line
+        else:
+            turns.append(line)
+    return turns
+
+
+def _same_conversation(a: str, b: str) -> bool:
+    """One text is the other plus more whole turns: the same chat at a different point"""
+    if a == b:
+        return False
+    short, long = sorted((_turns(a), _turns(b)), key=len)
+    return len(short) < len(long) and long[:len(short)] == short
+
+
+class SemanticCache:
+    """Reuse analysis results for near-duplicate conversations.
+
+    Conversations are hashed into word uni/bi-gram vectors (no fitting, so the
+    cache is safe to share between threads). A lookup returns the cached result
+    of the most similar recent conversation for the same task if the cosine
+    similarity is at least `threshold`. An entry for the same conversation at
+    an earlier (or later) turn is never a match: one new turn keeps the
+    similarity high, but the answer is stale. Entries are evicted LRU beyond
+    `max_entries` per task and expire after `ttl` seconds.
+
+    Every hit is written to the audit log. With `audit_sample_rate` > 0 a
+    fraction of hits also recompute the result and log how close the cached
+    answer was, to keep an eye on hit quality.
+    """
+
+    def __init__(self, threshold: float = 0.92, max_entries: int = 1000, ttl: float = 3600.0,
+                 audit_path: Optional[str] = None, audit_sample_rate: float = 0.0):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.audit_path = audit_path
+        self.audit_sample_rate = audit_sample_rate
+        self._vectorizer = HashingVectorizer(ngram_range=(1, 2), n_features=2 ** 20,
+                                             alternate_sign=False, norm="l2")
+        self._lock = threading.Lock()
+        self._audit_lock = threading.Lock()
+        self._entries: Dict[str, "OrderedDict[str, _Entry]"] = {}
+        self._rows: Dict[str, _Rows] = {}
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "skipped_same_conversation": 0}
+
+    @classmethod
+    def from_env(cls, environ: Dict[str, str]) -> Optional["SemanticCache"]:
+        if environ.get("SEMANTIC_CACHE_ENABLED", "1").lower() in ("0", "false", "no"):
+            return None
+        return cls(
+            threshold=float(environ.get("SEMANTIC_CACHE_THRESHOLD", 0.92)),
+            max_entries=int(environ.get("SEMANTIC_CACHE_MAX_ENTRIES", 1000)),
+            ttl=float(environ.get("SEMANTIC_CACHE_TTL", 3600)),
+            audit_path=environ.get("SEMANTIC_CACHE_AUDIT_LOG"),
+            audit_sample_rate=float(environ.get("SEMANTIC_CACHE_AUDIT_SAMPLE_RATE", 0.0)),
+        )
+
+    def _vector(self, text: str):
+        return self._vectorizer.transform([text.lower()])
+
+    def _expire(self, task: str, entries: "OrderedDict[str, _Entry]") -> None:
+        now = time.monotonic()
+        # Entries are in LRU order, not insertion order, so check them all
+        expired = [key for key, entry in entries.items() if now - entry.created > self.ttl]
+        for key in expired:
+            self._rows[task].remove(entries.pop(key).row)
+        self.counters["expired"] += len(expired)
+
+    def _compact(self, task: str, entries: "OrderedDict[str, _Entry]") -> None:
+        """Drop dead rows once they outnumber the live ones (amortized O(1) per removal)"""
+        rows = self._rows[task]
+        if rows.dead <= max(_Rows.BLOCK, len(entries)):
+            return
+        rows = self._rows[task] = _Rows()
+        for key, entry in entries.items():
+            entry.row = rows.append(key, entry.vector)
+
+    def lookup(self, task: str, text: str) -> Optional[Dict[str, Any]]:
+        """Best cached match for the task at or above the threshold, if any"""
+        vector = self._vector(text)
+        with self._lock:
+            entries = self._entries.get(task)
+            if not entries:
+                self.counters["misses"] += 1
+                return None
+            self._expire(task, entries)
+            if not entries:
+                self.counters["misses"] += 1
+                return None
+            self._compact(task, entries)
+            rows = self._rows[task]
+            scores = rows.scores(vector)
+            candidates = np.flatnonzero(scores >= self.threshold)
+            for best in candidates[np.argsort(-scores[candidates], kind="stable")]:
+                key = rows.keys[best]
+                if key is None:
+                    continue
+                entry = entries[key]
+                if _same_conversation(entry.text, text):
+                    self.counters["skipped_same_conversation"] += 1
+                    continue
+                entry.hits += 1
+                # LRU order only; the stacked rows keep their own key order
+                entries.move_to_end(key)
+                self.counters["hits"] += 1
+                return {"result": entry.result, "similarity": float(scores[best]), "matched": entry.text[:200],
+                        "key": key}
+            self.counters["misses"] += 1
+            return None
+
+    def store(self, task: str, text: str, result: str) -> None:
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        entry = _Entry(self._vector(text), result, text)
+        with self._lock:
+            entries = self._entries.setdefault(task, OrderedDict())
+            rows = self._rows.setdefault(task, _Rows())
+            previous = entries.pop(key, None)
+            if previous is not None:
+                rows.remove(previous.row)
+            entry.row = rows.append(key, entry.vector)
+            entries[key] = entry
+            while len(entries) > self.max_entries:
+                rows.remove(entries.popitem(last=False)[1].row)
+                self.counters["evictions"] += 1
+            self._compact(task, entries)
+
+    def get_or_compute(self, task: str, text: str, compute: Callable[[], str],
+                       cacheable: Callable[[str], bool] = lambda result: bool(result)) -> str:
+        hit = self.lookup(task, text)
+        if hit is None:
+            result = compute()
+            if cacheable(result):
+                self.store(task, text, result)
+            return result
+
+        audit = {"task": task, "similarity": round(hit["similarity"], 4),
+                 "query": text[:200], "matched": hit["matched"], "result": hit["result"][:200]}
+        if self.audit_sample_rate and random.random() < self.audit_sample_rate:
+            fresh = compute()
+            audit["fresh_result"] = fresh[:200]
+            audit["agreement"] = round(float((self._vector(fresh) @ self._vector(hit["result"]).T).toarray()[0][0]), 4)
+        self._audit(audit)
+        return hit["result"]
+
+    def _audit(self, record: Dict[str, Any]) -> None:
+        record["ts"] = time.time()
+        if not self.audit_path:
+            logging.info(f"Semantic cache hit for '{record['task']}' (similarity {record['similarity']})")
+            return
+        with self._audit_lock:
+            with open(self.audit_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+                "entries": {task: len(entries) for task, entries in self._entries.items()},
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_cache_loaded = False
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Process-wide semantic cache, or None when SEMANTIC_CACHE_ENABLED=0"""
+    global _cache, _cache_loaded
+    with _cache_lock:
+        if not _cache_loaded:
+            _cache = SemanticCache.from_env(os.environ)
+            _cache_loaded = True
+        return _cache
@@ -0,0 +1,280 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from .shared_db import KeyLocks, SharedDB, shared_db_path
+
+
+class Session:
+    __slots__ = ("session_id", "turns", "text", "size", "created", "touched", "lock")
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.turns: List[Dict[str, str]] = []
+        # The conversation as the analyzer reads it, extended turn by turn
+        # instead of being re-joined from the whole history on every request
+        self.text = ""
+        self.size = 0
+        self.created = self.touched = time.monotonic()
+        # Serializes model turns, so replies are appended in message order
+        self.lock = threading.Lock()
+
+    def append(self, role: str, content: str) -> int:
+        line = f"{role.title()}: {content}"
+        self.turns.append({"role": role, "content": content})
+        self.text = f"{self.text}\n{line}" if self.text else line
+        # Rough footprint: the text plus the turn dict copy of the content
+        added = 2 * len(line) + 100
+        self.size += added
+        return added
+
+
+class SessionStore:
+    """Server-side chat history, so clients send only the new message each turn.
+
+    Sessions are kept in LRU order and dropped after `ttl` seconds idle, beyond
+    `max_sessions`, or (least recently used first) while the total estimated
+    size is above `max_bytes`.
+    """
+
+    def __init__(self, max_sessions: int = 10000, ttl: float = 1800.0, max_bytes: int = 64 * 1024 * 1024):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"created": 0, "turns": 0, "expired": 0, "evicted_lru": 0, "evicted_memory": 0,
+                         "closed": 0, "missing": 0}
+
+    @classmethod
+    def from_env(cls, environ: Dict[str, str]) -> "SessionStore":
+        return cls(
+            max_sessions=int(environ.get("SESSION_MAX_SESSIONS", 10000)),
+            ttl=float(environ.get("SESSION_TTL", 1800)),
+            max_bytes=int(environ.get("SESSION_MAX_BYTES", 64 * 1024 * 1024)),
+        )
+
+    def _drop(self, session_id: str, counter: str) -> None:
+        session = self._sessions.pop(session_id)
+        self._bytes -= session.size
+        self.counters[counter] += 1
+
+    def _expire(self, now: float) -> None:
+        # LRU order is also last-touched order, so expired sessions are at the front
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.touched <= self.ttl:
+                break
+            self._drop(session_id, "expired")
+
+    def _enforce_limits(self, keep: str) -> None:
+        while len(self._sessions) > self.max_sessions:
+            self._drop(next(iter(self._sessions)), "evicted_lru")
+        while self._bytes > self.max_bytes and len(self._sessions) > 1:
+            oldest = next(iter(self._sessions))
+            if oldest == keep:
+                break
+            self._drop(oldest, "evicted_memory")
+
+    def create(self, turns: List[Dict[str, str]] = ()) -> Session:
+        """New session, optionally seeded with turns the client already shows (e.g. a greeting)"""
+        session = Session(uuid.uuid4().hex)
+        for turn in turns:
+            session.append(turn["role"], turn["content"])
+        with self._lock:
+            self._expire(time.monotonic())
+            self._sessions[session.session_id] = session
+            self._bytes += session.size
+            self.counters["created"] += 1
+            self._enforce_limits(keep=session.session_id)
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                self.counters["missing"] += 1
+                return None
+            session.touched = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def append(self, session_id: str, role: str, content: str) -> Optional[Session]:
+        """Add a turn; None if the session expired or was evicted"""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                self.counters["missing"] += 1
+                return None
+            self._bytes += session.append(role, content)
+            session.touched = now
+            self._sessions.move_to_end(session_id)
+            self.counters["turns"] += 1
+            self._enforce_limits(keep=session_id)
+            return session
+
+    def close(self, session_id: str) -> Optional[Session]:
+        """Remove and return a finished session (e.g. after ticket submission)"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._drop(session_id, "closed")
+            return session
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire(time.monotonic())
+            return {**self.counters, "active": len(self._sessions), "bytes": self._bytes,
+                    "max_bytes": self.max_bytes}
+
+
+SESSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY, turns TEXT NOT NULL, text TEXT NOT NULL,
+    size INTEGER NOT NULL, created REAL NOT NULL, touched REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_touched ON sessions (touched);
+"""
+
+
+class SharedSessionStore(SessionStore):
+    """SessionStore kept in a SQLite file, for processes that share one listening socket.
+
+    Any worker can serve any turn of a chat: sessions live in the shared file
+    and `Session.lock` is a cross-process lock, so model turns of one session
+    stay serialized whichever workers they land on. Returned sessions are
+    snapshots; changes go through append(). Limits and expiry are the same as
+    SessionStore's, using wall-clock time. Counters are per process; active
+    and bytes are read from the file.
+    """
+
+    def __init__(self, path: str, max_sessions: int = 10000, ttl: float = 1800.0,
+                 max_bytes: int = 64 * 1024 * 1024):
+        super().__init__(max_sessions=max_sessions, ttl=ttl, max_bytes=max_bytes)
+        self.db = SharedDB(path, SESSION_SCHEMA)
+        self.locks = KeyLocks(path)
+
+    @classmethod
+    def from_env(cls, environ: Dict[str, str]) -> "SharedSessionStore":
+        return cls(
+            environ["SHARED_STATE_DB"],
+            max_sessions=int(environ.get("SESSION_MAX_SESSIONS", 10000)),
+            ttl=float(environ.get("SESSION_TTL", 1800)),
+            max_bytes=int(environ.get("SESSION_MAX_BYTES", 64 * 1024 * 1024)),
+        )
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += amount
+
+    def _session(self, row) -> Session:
+        session = Session(row[0])
+        session.turns, session.text, session.size = json.loads(row[1]), row[2], row[3]
+        session.created, session.touched = row[4], row[5]
+        session.lock = self.locks.lock(row[0])
+        return session
+
+    def _expire_rows(self, conn, now: float) -> None:
+        expired = conn.execute("DELETE FROM sessions WHERE touched < ?", (now - self.ttl,)).rowcount
+        if expired:
+            self._count("expired", expired)
+
+    def _enforce_rows(self, conn, keep: str) -> None:
+        extra = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] - self.max_sessions
+        if extra > 0:
+            conn.execute("DELETE FROM sessions WHERE session_id IN "
+                         "(SELECT session_id FROM sessions ORDER BY touched LIMIT ?)", (extra,))
+            self._count("evicted_lru", extra)
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM sessions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for session_id, size in conn.execute("SELECT session_id, size FROM sessions ORDER BY touched").fetchall():
+            if total <= self.max_bytes or session_id == keep:
+                break
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            total -= size
+            self._count("evicted_memory")
+
+    def create(self, turns: List[Dict[str, str]] = ()) -> Session:
+        session = Session(uuid.uuid4().hex)
+        for turn in turns:
+            session.append(turn["role"], turn["content"])
+        session.created = session.touched = now = time.time()
+        conn = self.db.connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._expire_rows(conn, now)
+            conn.execute("INSERT INTO sessions VALUES (?, ?, ?, ?, ?, ?)",
+                         (session.session_id, json.dumps(session.turns), session.text, session.size, now, now))
+            self._enforce_rows(conn, keep=session.session_id)
+        self._count("created")
+        session.lock = self.locks.lock(session.session_id)
+        return session
+
+    def _touch(self, session_id: str, role: str = None, content: str = None) -> Optional[Session]:
+        now = time.time()
+        conn = self.db.connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._expire_rows(conn, now)
+            row = conn.execute("SELECT * FROM sessions WHERE session_id = ?", (session_id or "",)).fetchone()
+            if row is None:
+                self._count("missing")
+                return None
+            session = self._session(row)
+            session.touched = now
+            if role is not None:
+                session.append(role, content)
+            conn.execute("UPDATE sessions SET turns = ?, text = ?, size = ?, touched = ? WHERE session_id = ?",
+                         (json.dumps(session.turns), session.text, session.size, now, session_id))
+            if role is not None:
+                self._enforce_rows(conn, keep=session_id)
+        if role is not None:
+            self._count("turns")
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        return self._touch(session_id)
+
+    def append(self, session_id: str, role: str, content: str) -> Optional[Session]:
+        return self._touch(session_id, role, content)
+
+    def close(self, session_id: str) -> Optional[Session]:
+        conn = self.db.connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT * FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        self._count("closed")
+        return self._session(row)
+
+    def stats(self) -> Dict[str, Any]:
+        active, size = self.db.connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions WHERE touched >= ?",
+            (time.time() - self.ttl,)).fetchone()
+        with self._lock:
+            return {**self.counters, "active": active, "bytes": size, "max_bytes": self.max_bytes, "shared": 1}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_session_store() -> SessionStore:
+    """Process-wide session store configured from SESSION_* environment variables;
+    shared between processes through SHARED_STATE_DB when that is set"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SharedSessionStore.from_env(os.environ) if shared_db_path() else SessionStore.from_env(os.environ)
+        return _store
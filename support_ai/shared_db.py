@@ -0,0 +1,118 @@
+"""SQLite file shared by the processes of one deployment (pre-fork workers).
+
+Chat sessions and the event bus use it when SHARED_STATE_DB names a file, so a
+request can land on any worker. Connections are opened per thread and per
+process (never inherited across fork), in WAL mode with a busy timeout, so
+readers don't block the writer and short write bursts queue instead of failing.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class SharedDB:
+    def __init__(self, path: str, schema: str):
+        self.path = path
+        self.schema = schema
+        self._local = threading.local()
+
+    def connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.schema)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+
+class KeyLocks:
+    """Exclusive per-key locks that hold across threads and processes.
+
+    A key maps to one byte of `<path>.locks`, locked with a byte-range lock
+    (fcntl.lockf, or msvcrt.locking on Windows) that excludes other processes,
+    plus one of a fixed stripe of thread locks that excludes threads of this
+    process. Keys that share a byte or a stripe share a lock, which only costs
+    extra serialization.
+    """
+
+    def __init__(self, path: str, slots: int = 1 << 20, stripes: int = 256):
+        self.path = f"{path}.locks"
+        self.slots = slots
+        self._fd: Optional[int] = None
+        self._pid = None
+        self._thread_locks = [threading.Lock() for _ in range(stripes)]
+        self._lock = threading.Lock()
+        # msvcrt locks at the file position, so seeking and locking must not interleave across threads
+        self._seek_lock = threading.Lock()
+
+    def _file(self) -> int:
+        with self._lock:
+            if self._fd is None or self._pid != os.getpid():
+                self._fd, self._pid = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644), os.getpid()
+            return self._fd
+
+    def _lock_byte(self, slot: int) -> None:
+        if fcntl is not None:
+            fcntl.lockf(self._file(), fcntl.LOCK_EX, 1, slot)
+            return
+        fd = self._file()
+        while True:
+            with self._seek_lock:
+                os.lseek(fd, slot, os.SEEK_SET)
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                    return
+                except OSError:
+                    pass
+            time.sleep(0.01)
+
+    def _unlock_byte(self, slot: int) -> None:
+        if fcntl is not None:
+            fcntl.lockf(self._file(), fcntl.LOCK_UN, 1, slot)
+            return
+        fd = self._file()
+        with self._seek_lock:
+            os.lseek(fd, slot, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+    def lock(self, key: str) -> "_KeyLock":
+        slot = int(hashlib.sha1(key.encode("utf-8")).hexdigest()[:12], 16) % self.slots
+        return _KeyLock(self, slot, self._thread_locks[slot % len(self._thread_locks)])
+
+
+class _KeyLock:
+    __slots__ = ("locks", "slot", "thread_lock")
+
+    def __init__(self, locks: KeyLocks, slot: int, thread_lock: threading.Lock):
+        self.locks, self.slot, self.thread_lock = locks, slot, thread_lock
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        try:
+            self.locks._lock_byte(self.slot)
+        except BaseException:
+            self.thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            self.locks._unlock_byte(self.slot)
+        finally:
+            self.thread_lock.release()
+
+
+def shared_db_path() -> Optional[str]:
+    return os.environ.get("SHARED_STATE_DB") or None
@@ -0,0 +1,195 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Any, Hashable, Iterable, Optional, Tuple
+import threading
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+
+class SimilarityIndex:
+    """Prefit TF-IDF index over historical issues.
+
+    The vectorizer and matrix are built once and never mutated afterwards, so a
+    single index can be shared by every request and agent.
+    """
+
+    def __init__(self, texts: List[Any]):
+        self.texts = [str(text).lower().strip() for text in texts]
+        self.vectorizer = TfidfVectorizer()
+        if any(self.texts):
+            # Rows are L2-normalised, so a dot product is the cosine similarity
+            self.matrix = self.vectorizer.fit_transform(self.texts)
+        else:
+            self.matrix = None
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def transform(self, texts: List[Any]):
+        return self.vectorizer.transform([str(text).lower().strip() for text in texts])
+
+    def scores(self, query: Any) -> np.ndarray:
+        """Cosine similarity of the query against every indexed text"""
+        if self.matrix is None:
+            return np.zeros(len(self.texts))
+        return (self.matrix @ self.transform([query]).T).toarray().ravel()
+
+    def top_k(self, query: Any, k: int = 3, min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """Return up to k (row, score) pairs, best first, with score >= min_score"""
+        scores = self.scores(query)
+        if k <= 0 or scores.size == 0:
+            return []
+        if k < scores.size:
+            # O(n) partial selection, then sort only the k winners
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(scores.size)
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(i), float(scores[i])) for i in ranked if scores[i] >= min_score]
+
+
+# A few recent data generations (a refreshed dataset may still be in use by in-flight requests).
+# Entries hold a Future, so an index is built outside _index_lock: a large build only blocks the
+# callers waiting for that generation, not lookups of generations already built
+MAX_INDEXES = 4
+_index_cache: "OrderedDict[Hashable, Tuple[List[Any], Future]]" = OrderedDict()
+_index_lock = threading.Lock()
+
+
+def data_version(historical_data: Dict[str, Any]) -> Hashable:
+    """Identity of one generation of historical data: the loader's version
+    (TicketDataLoader bumps it on every change), else the issues list itself"""
+    version = historical_data.get('version')
+    if version is not None:
+        return ('version', version)
+    issues = historical_data.get('issues') or []
+    return ('list', id(issues), len(issues))
+
+
+def get_index(historical_data: Dict[str, List[Any]]) -> SimilarityIndex:
+    """Return the shared index for a historical dataset, building it on first use"""
+    issues = historical_data.get('issues') or []
+    key = data_version(historical_data)
+    with _index_lock:
+        cached = _index_cache.get(key)
+        # The cached entry keeps its list alive, so an id can't be reused while it is cached
+        build = cached is None or (key[0] == 'list' and cached[0] is not issues)
+        if build:
+            cached = (issues, Future())
+            _index_cache[key] = cached
+            while len(_index_cache) > MAX_INDEXES:
+                _index_cache.popitem(last=False)
+        _index_cache.move_to_end(key)
+    future = cached[1]
+    if build:
+        try:
+            future.set_result(SimilarityIndex(issues))
+        except BaseException as e:
+            # Let the next caller try again rather than cache the failure
+            with _index_lock:
+                if _index_cache.get(key) is cached:
+                    del _index_cache[key]
+            future.set_exception(e)
+            raise
+    return future.result()
+
+
+class PairwiseSimilarity:
+    """Batched pairwise cosine similarity against one global, prefit vocabulary.
+
+    Texts are hashed into a fixed character n-gram space, so unseen words stay
+    comparable and nothing is refit per comparison; IDF weights are fit once on
+    the reference corpus. The weights are swapped atomically and never mutated,
+    and vectors for repeated texts are memoised in a bounded LRU, so one instance
+    is safe to share across request threads.
+    """
+
+    def __init__(self, corpus: Optional[Iterable[Any]] = None, cache_size: int = 4096):
+        self.cache_size = cache_size
+        self._hasher = HashingVectorizer(
+            analyzer="char_wb", ngram_range=(3, 5), n_features=2 ** 18,
+            alternate_sign=False, norm=None
+        )
+        self._lock = threading.Lock()
+        self._idf: Optional[TfidfTransformer] = None
+        self._corpus_key: Optional[Hashable] = None
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
+        if corpus is not None:
+            self.fit(corpus)
+
+    @staticmethod
+    def _normalize(text: Any) -> str:
+        return str(text).lower().strip()
+
+    def fit(self, corpus: Iterable[Any]) -> "PairwiseSimilarity":
+        texts = [t for t in (self._normalize(text) for text in corpus) if t]
+        if not texts:
+            return self
+        idf = TfidfTransformer().fit(self._hasher.transform(texts))
+        with self._lock:
+            self._idf = idf
+            self._cache.clear()
+        return self
+
+    def fit_once(self, key: Hashable, corpus: Iterable[Any]) -> None:
+        """Fit on a reference corpus unless the same corpus (by key) is already loaded"""
+        if self._corpus_key == key:
+            return
+        self.fit(corpus)
+        self._corpus_key = key
+
+    def _transform(self, texts: List[str], idf: Optional[TfidfTransformer]):
+        counts = self._hasher.transform(texts)
+        if idf is not None:
+            return idf.transform(counts)
+        return normalize(counts)
+
+    def _vectors(self, texts: List[str]):
+        with self._lock:
+            idf = self._idf
+            rows = {text: self._cache.get(text) for text in set(texts)}
+            for text, row in rows.items():
+                if row is not None:
+                    self._cache.move_to_end(text)
+        missing = [text for text, row in rows.items() if row is None]
+        if missing:
+            computed = self._transform(missing, idf)
+            with self._lock:
+                for i, text in enumerate(missing):
+                    rows[text] = computed[i]
+                    # Don't cache vectors computed against weights that were just replaced
+                    if idf is self._idf:
+                        self._cache[text] = computed[i]
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return sp.vstack([rows[text] for text in texts], format="csr")
+
+    def score_pairs(self, pairs: Iterable[Tuple[Any, Any]]) -> np.ndarray:
+        """Cosine similarity for every (text1, text2) pair in one sparse operation"""
+        pairs = [(self._normalize(a), self._normalize(b)) for a, b in pairs]
+        if not pairs:
+            return np.zeros(0)
+        left = [a for a, _ in pairs]
+        right = [b for _, b in pairs]
+        matrix = self._vectors(left + right)
+        # TF-IDF rows are L2-normalised: the row-wise dot product is the cosine
+        scores = np.asarray(matrix[:len(pairs)].multiply(matrix[len(pairs):]).sum(axis=1)).ravel()
+        empty = np.array([not a or not b for a, b in pairs])
+        scores[empty] = 0.0
+        return scores
+
+    def score(self, text1: Any, text2: Any) -> float:
+        return float(self.score_pairs([(text1, text2)])[0])
+
+
+_pairwise = PairwiseSimilarity()
+
+
+def get_pairwise(historical_data: Optional[Dict[str, List[Any]]] = None) -> PairwiseSimilarity:
+    """Return the process-wide pairwise service, seeding its vocabulary from historical data"""
+    if historical_data and historical_data.get('issues'):
+        issues = historical_data['issues']
+        _pairwise.fit_once(data_version(historical_data), list(issues) + list(historical_data.get('solutions') or []))
+    return _pairwise
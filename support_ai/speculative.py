@@ -0,0 +1,143 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from .analyzer import AnalysisResult, StageMemo, TicketAnalyzer
+from .deadline import Deadline
+from .llm.scheduler import priority_scope
+from .metrics import span
+
+
+class _Conversation:
+    __slots__ = ("memo", "lock", "generation", "touched")
+
+    def __init__(self):
+        self.memo = StageMemo()
+        # Held while a speculative run of this conversation runs, so runs don't overlap
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.touched = time.monotonic()
+
+
+class SpeculativeAnalyzer:
+    """Analyze live chats in the background as turns arrive.
+
+    speculate() queues an analysis of the conversation so far (a newer turn
+    supersedes a queued older one); analyze() runs the final analysis against
+    that conversation's StageMemo, so on submit only the stages whose inputs
+    changed since the last speculative run call the model. A submit does not
+    wait for a speculative run still in flight: that run is batch work, so the
+    submit reuses whatever stages it already finished and computes the rest
+    at its own priority. Conversations are kept LRU up to `max_conversations`
+    and dropped after `ttl` seconds idle.
+    """
+
+    def __init__(self, analyzer: TicketAnalyzer, workers: int = 2, max_conversations: int = 1000,
+                 ttl: float = 1800.0):
+        self.analyzer = analyzer
+        self.max_conversations = max_conversations
+        self.ttl = ttl
+        # Threads start lazily on first submit, so a pre-fork parent never owns any
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="speculative")
+        self._conversations: "OrderedDict[str, _Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"scheduled": 0, "superseded": 0, "completed": 0, "failed": 0,
+                         "submits": 0, "submits_fully_reused": 0, "stages_reused": 0,
+                         "stages_computed": 0, "evictions": 0, "expired": 0}
+
+    @classmethod
+    def from_env(cls, analyzer: TicketAnalyzer, environ: Dict[str, str]) -> Optional["SpeculativeAnalyzer"]:
+        if environ.get("SPECULATIVE_ANALYSIS_ENABLED", "1").lower() in ("0", "false", "no"):
+            return None
+        return cls(
+            analyzer,
+            workers=int(environ.get("SPECULATIVE_WORKERS", 2)),
+            max_conversations=int(environ.get("SPECULATIVE_MAX_CONVERSATIONS", 1000)),
+            ttl=float(environ.get("SPECULATIVE_TTL", 1800)),
+        )
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += amount
+
+    def _entry(self, conversation_id: str, create: bool) -> Optional[_Conversation]:
+        with self._lock:
+            now = time.monotonic()
+            expired = [key for key, entry in self._conversations.items() if now - entry.touched > self.ttl]
+            for key in expired:
+                del self._conversations[key]
+            self.counters["expired"] += len(expired)
+
+            entry = self._conversations.get(conversation_id)
+            if entry is None and create:
+                entry = self._conversations[conversation_id] = _Conversation()
+                while len(self._conversations) > self.max_conversations:
+                    self._conversations.popitem(last=False)
+                    self.counters["evictions"] += 1
+            if entry is not None:
+                entry.touched = now
+                self._conversations.move_to_end(conversation_id)
+            return entry
+
+    def speculate(self, conversation_id: str, conversation: str, historical_data: Dict) -> None:
+        """Queue a background analysis of the conversation as it stands now"""
+        entry = self._entry(conversation_id, create=True)
+        with self._lock:
+            entry.generation += 1
+            generation = entry.generation
+            self.counters["scheduled"] += 1
+        self._executor.submit(self._run, entry, generation, conversation, historical_data)
+
+    def _run(self, entry: _Conversation, generation: int, conversation: str, historical_data: Dict) -> None:
+        with entry.lock:
+            if generation != entry.generation:
+                # A newer turn arrived while this one was queued
+                self._count("superseded")
+                return
+            try:
+                # Nobody waits on a speculative run: it only uses capacity live traffic leaves over
+                with span("speculative_analysis"), priority_scope("batch"):
+                    self._analyze(entry, conversation, historical_data)
+                self._count("completed")
+            except Exception as e:
+                logging.error(f"Speculative analysis failed: {e}")
+                self._count("failed")
+
+    def _analyze(self, entry: _Conversation, conversation: str, historical_data: Dict,
+                 deadline: Deadline = None) -> Tuple[AnalysisResult, int]:
+        """The analysis and how many stages it had to compute"""
+        # Counts this run only; a speculative run may use the same memo concurrently
+        memo = entry.memo.view()
+        result = self.analyzer.analyze_ticket(conversation, historical_data, memo=memo, deadline=deadline)
+        with self._lock:
+            self.counters["stages_reused"] += memo.reused
+            self.counters["stages_computed"] += memo.computed
+        return result, memo.computed
+
+    def analyze(self, conversation_id: str, conversation: str, historical_data: Dict,
+                deadline: Deadline = None) -> AnalysisResult:
+        """Final analysis, refreshing only the stages that changed since the last speculative run"""
+        entry = self._entry(conversation_id, create=False)
+        if entry is None:
+            return self.analyzer.analyze_ticket(conversation, historical_data, deadline=deadline)
+        with self._lock:
+            # Anything still queued is older than this request
+            entry.generation += 1
+        # No waiting on entry.lock: an in-flight speculative run is batch work and must not hold up
+        # the submit, which reuses the stages it has finished and computes the rest itself
+        result, computed = self._analyze(entry, conversation, historical_data, deadline)
+        with self._lock:
+            self.counters["submits"] += 1
+            self.counters["submits_fully_reused"] += int(computed == 0)
+        return result
+
+    def discard(self, conversation_id: str) -> None:
+        with self._lock:
+            self._conversations.pop(conversation_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.counters, "conversations": len(self._conversations)}
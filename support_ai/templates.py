@@ -0,0 +1,97 @@
+"""Compiled HTML templates for emails and reports.
+
+Templates use str.format placeholders ({name}, {name:.2f}, literal braces
+doubled). compile_template() parses a source once, caches it and generates a
+Python function that joins the literal chunks with the formatted values, so
+rendering never re-parses a large document (stylesheet included) per message.
+partial() bakes fixed values (e.g. a colour scheme) into a new compiled
+template, leaving a static shell with only the per-message slots open.
+
+Values are HTML-escaped unless their field is declared safe, which is how
+already-rendered fragments (a report body inside its shell) are inserted.
+"""
+from functools import lru_cache
+from string import Formatter
+from typing import Any, Dict, Iterable, List, Tuple, Union
+
+_Part = Union[str, Tuple[str, str]]
+
+
+def _merge(parts: List[_Part]) -> List[_Part]:
+    merged: List[_Part] = []
+    for part in parts:
+        if isinstance(part, str) and merged and isinstance(merged[-1], str):
+            merged[-1] += part
+        elif part != "":
+            merged.append(part)
+    return merged
+
+
+# html.escape(text, quote=False), spelled out so generated code can inline it
+_ESCAPE_CHAIN = '.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")'
+
+def _escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+class CompiledTemplate:
+    __slots__ = ("parts", "safe", "fields", "_render")
+
+    def __init__(self, parts: List[_Part], safe: Iterable[str] = ()):
+        # Literal strings and (field, format spec) slots, adjacent literals merged
+        self.parts = _merge(parts)
+        self.safe = frozenset(safe)
+        self.fields = frozenset(part[0] for part in self.parts if not isinstance(part, str))
+        self._render = self._generate()
+
+    def _generate(self):
+        """Build `def _render(v): return "".join((literal, str(v["x"]).replace(...), ...))` for this template"""
+        namespace = {"_format": format, "_str": str}
+        pieces = []
+        for i, part in enumerate(self.parts):
+            if isinstance(part, str):
+                namespace[f"_l{i}"] = part
+                pieces.append(f"_l{i}")
+                continue
+            name, spec = part
+            expr = f"_format(_v[{name!r}], {spec!r})" if spec else f"_str(_v[{name!r}])"
+            # Escaping inlined as method calls: no Python frame per value
+            pieces.append(expr if name in self.safe else f"{expr}{_ESCAPE_CHAIN}")
+        exec(f"def _render(_v):\n    return ''.join(({', '.join(pieces)},))", namespace)
+        return namespace["_render"]
+
+    @classmethod
+    def parse(cls, source: str, safe: Iterable[str] = ()) -> "CompiledTemplate":
+        parts: List[_Part] = []
+        for literal, field, spec, conversion in Formatter().parse(source):
+            parts.append(literal)
+            if field is None:
+                continue
+            if not field.isidentifier() or conversion:
+                raise ValueError(f"Unsupported template field '{{{field}}}': use plain names and format specs")
+            parts.append((field, spec or ""))
+        return cls(parts, safe)
+
+    def _format(self, name: str, value: Any, spec: str) -> str:
+        text = format(value, spec) if spec else str(value)
+        return text if name in self.safe else _escape(text)
+
+    def partial(self, **values) -> "CompiledTemplate":
+        """A copy with some fields filled in for good"""
+        parts = [part if isinstance(part, str) or part[0] not in values
+                 else self._format(part[0], values[part[0]], part[1])
+                 for part in self.parts]
+        return CompiledTemplate(parts, self.safe)
+
+    def render(self, values: Dict[str, Any] = None, **kwargs) -> str:
+        return self._render({**values, **kwargs} if values else kwargs)
+
+    def render_many(self, rows: Iterable[Dict[str, Any]]) -> List[str]:
+        render = self._render
+        return [render(row) for row in rows]
+
+
+@lru_cache(maxsize=256)
+def compile_template(source: str, safe: Tuple[str, ...] = ()) -> CompiledTemplate:
+    """Parse a template once per (source, safe fields)"""
+    return CompiledTemplate.parse(source, safe)
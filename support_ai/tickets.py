@@ -0,0 +1,66 @@
+"""Read-modify-write of stored ticket files.
+
+Background jobs (analysis upgrades, draft pre-generation) and the dashboard
+update tickets after they are saved, from different processes (API or
+pre-fork workers, Streamlit). Updates to one ticket hold a lock that excludes
+other threads and processes (see shared_db.KeyLocks: fcntl byte-range locks,
+msvcrt ones on Windows; the lock file is `.tickets.locks` in the results
+directory), and each is written to a unique
+temporary file renamed over the ticket, so readers never see a half-written
+ticket and concurrent writers do not overwrite each other's fields.
+Resolving a ticket (resolve_ticket) takes the same lock, so an update can not
+bring a resolved ticket back.
+"""
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from .shared_db import KeyLocks
+
+_locks: Dict[str, KeyLocks] = {}
+_locks_lock = threading.Lock()
+
+def _lock_for(path: str):
+    path = os.path.abspath(path)
+    directory = os.path.dirname(path)
+    with _locks_lock:
+        locks = _locks.get(directory)
+        if locks is None:
+            locks = _locks[directory] = KeyLocks(os.path.join(directory, ".tickets"))
+    return locks.lock(os.path.basename(path))
+
+
+def update_ticket(path: str, mutate: Callable[[Dict[str, Any]], bool]) -> Optional[Dict[str, Any]]:
+    """Apply `mutate` to the stored ticket and save it if it returns True.
+    Returns the ticket, or None if the file is gone (e.g. resolved)."""
+    with _lock_for(path):
+        try:
+            with open(path, 'r') as f:
+                ticket = json.load(f)
+        except FileNotFoundError:
+            return None
+        if mutate(ticket):
+            fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp",
+                                            dir=os.path.dirname(os.path.abspath(path)))
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(ticket, f, indent=4)
+                if not os.path.exists(path):
+                    # Moved away by a writer that does not take the lock
+                    os.unlink(tmp_path)
+                    return None
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+        return ticket
+
+
+def resolve_ticket(path: str) -> str:
+    """Mark a ticket resolved by renaming it to <path>.resolved; returns the new path"""
+    with _lock_for(path):
+        os.rename(path, path + ".resolved")
+    return path + ".resolved"
@@ -0,0 +1,122 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from .alerts import escalation_note, send_alert
+from .analyzer import TicketAnalyzer
+from .digest import get_digest_log
+from .llm.scheduler import priority_scope
+from .metrics import span
+from .tickets import update_ticket
+
+# Ticket fields that come from the analysis and are replaced by an upgrade
+ANALYSIS_FIELDS = {
+    "summary": "summary", "extracted_issue": "issue", "suggested_solution": "solution",
+    "priority_level": "priority", "assigned_team": "team", "confidence_score": "confidence",
+    "similar_cases": "similar_cases", "sentiment": "sentiment",
+}
+
+
+class ResultUpgrader:
+    """Re-analyze partial tickets in the background and rewrite their result files.
+
+    A ticket saved with fallback stages (see TicketAnalyzer.analyze_ticket) is
+    analyzed again without a deadline at batch priority, so it only uses model
+    capacity live traffic leaves over. The analysis fields of the stored ticket
+    are replaced; anything staff added to the file meanwhile is kept. Attempts
+    that are still partial (backend down) are retried after `retry_delay`
+    seconds, doubling each time, up to `max_attempts`. `on_upgraded(path, ticket)`
+    is called after each rewrite. Alerts went out for the provisional priority,
+    so an upgrade that raises the priority to High or Critical sends the
+    escalation alert.
+    """
+
+    def __init__(self, analyzer: TicketAnalyzer, workers: int = 1, max_attempts: int = 3,
+                 retry_delay: float = 30.0):
+        self.analyzer = analyzer
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upgrade")
+        self.on_upgraded: Optional[Callable[[str, Dict[str, Any]], None]] = None
+        self._lock = threading.Lock()
+        self.counters = {"scheduled": 0, "upgraded": 0, "still_partial": 0, "retried": 0,
+                         "gave_up": 0, "missing": 0, "failed": 0, "escalated": 0}
+
+    @classmethod
+    def from_env(cls, analyzer: TicketAnalyzer, environ: Dict[str, str]) -> Optional["ResultUpgrader"]:
+        if environ.get("ANALYSIS_UPGRADE_ENABLED", "1").lower() in ("0", "false", "no"):
+            return None
+        return cls(
+            analyzer,
+            workers=int(environ.get("ANALYSIS_UPGRADE_WORKERS", 1)),
+            max_attempts=int(environ.get("ANALYSIS_UPGRADE_ATTEMPTS", 3)),
+            retry_delay=float(environ.get("ANALYSIS_UPGRADE_RETRY_DELAY", 30)),
+        )
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def schedule(self, path: str, conversation: str, historical_data: Dict, attempt: int = 1) -> None:
+        """Queue an upgrade of the partial ticket stored at `path`"""
+        self._count("scheduled" if attempt == 1 else "retried")
+        self._executor.submit(self._run, path, conversation, historical_data, attempt)
+
+    def _run(self, path: str, conversation: str, historical_data: Dict, attempt: int) -> None:
+        try:
+            with span("analysis_upgrade"), priority_scope("batch"):
+                result = self.analyzer.analyze_ticket(conversation, historical_data)
+            if result.partial:
+                self._count("still_partial")
+                if attempt >= self.max_attempts:
+                    self._count("gave_up")
+                    logging.warning(f"Giving up upgrading {path}; still missing {result.degraded_stages}")
+                    return
+                timer = threading.Timer(self.retry_delay * 2 ** (attempt - 1), self.schedule,
+                                        args=(path, conversation, historical_data, attempt + 1))
+                timer.daemon = True
+                timer.start()
+                return
+            if self._rewrite(path, result):
+                self._count("upgraded")
+                logging.info(f"Upgraded partial ticket {path}")
+        except Exception as e:
+            logging.error(f"Upgrading {path} failed: {e}")
+            self._count("failed")
+
+    def _rewrite(self, path: str, result) -> bool:
+        before = {}
+
+        def apply(ticket: Dict[str, Any]) -> bool:
+            before.update(ticket)
+            previous = ticket.get("priority_level")
+            for field, attribute in ANALYSIS_FIELDS.items():
+                ticket[field] = getattr(result, attribute)
+            ticket["partial"] = False
+            ticket["degraded_stages"] = []
+            ticket["upgraded_at"] = datetime.now().isoformat()
+            if previous != result.priority:
+                logging.info(f"Upgrade of {path} changed priority {previous} -> {result.priority}")
+            return True
+
+        ticket = update_ticket(path, apply)
+        if ticket is None:
+            self._count("missing")
+            return False
+        digest_log = get_digest_log()
+        if digest_log is not None:
+            # Move the ticket from its provisional team/priority counts to the final ones
+            digest_log.record_updated(before, ticket)
+        note = escalation_note(before.get("priority_level"), ticket)
+        if note:
+            self._count("escalated")
+            send_alert(ticket, note)
+        if self.on_upgraded is not None:
+            self.on_upgraded(path, ticket)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counters)
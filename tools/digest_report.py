@@ -0,0 +1,94 @@
+"""Hourly and daily triage digest job.
+
+Folds new ticket events into the running aggregates (support_ai.digest) and
+renders the digest through the report sender; the work depends on the events
+since the last run, not on the number of stored tickets.
+
+Usage: python -m tools.digest_report [--period hourly|daily] [--send] [--recipient EMAIL]
+                                     [--output digest.html] [--schedule] [--rebuild]
+
+--schedule keeps running: an hourly digest at the top of every hour and the
+daily one at DIGEST_DAILY_HOUR (local time, default 8). Without it the job
+runs once, e.g. from cron. --rebuild backfills the event log from the existing
+ticket files; run it once before the first digest of an existing deployment.
+"""
+import argparse
+import glob
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
+
+from support_ai.digest import DigestLog, DigestStore, digest_dir, rebuild_from_results
+from utils.report_sender import ReportGenerator
+
+TITLES = {"hourly": "Hourly Triage Digest", "daily": "Daily Triage Digest"}
+
+
+def report_generator() -> ReportGenerator:
+    return ReportGenerator({
+        "server": os.environ.get("SMTP_SERVER", "smtp.gmail.com"),
+        "port": os.environ.get("SMTP_PORT", "587"),
+        "username": os.environ.get("SMTP_EMAIL", ""),
+        "password": os.environ.get("SMTP_PASSWORD", ""),
+        "starttls": os.environ.get("SMTP_STARTTLS", "true").lower() not in ("0", "false", "no"),
+    })
+
+
+def run_once(store: DigestStore, generator: ReportGenerator, period: str, send: bool,
+             recipient: str, output: str = None) -> str:
+    applied = store.refresh()
+    digest = store.daily() if period == "daily" else store.hourly()
+    html = generator.generate_digest_report(digest, title=TITLES[period])
+    logging.info(f"{TITLES[period]}: {applied} new events, {digest['created']} new tickets, "
+                 f"{digest['resolved']} resolved")
+    if output:
+        with open(output, 'w') as f:
+            f.write(html)
+    if send:
+        success, message = generator.send_html(recipient, TITLES[period], html)
+        if not success:
+            logging.error(f"Could not send {period} digest: {message}")
+    return html
+
+
+def run_schedule(store: DigestStore, generator: ReportGenerator, recipient: str) -> None:
+    daily_hour = int(os.environ.get("DIGEST_DAILY_HOUR", 8))
+    while True:
+        # Wake just after the top of the hour, once its bucket is complete
+        time.sleep(3600 - time.time() % 3600 + 1)
+        run_once(store, generator, "hourly", True, recipient)
+        if time.localtime().tm_hour == daily_hour:
+            run_once(store, generator, "daily", True, recipient)
+
+
+def main():
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--period", choices=sorted(TITLES), default="daily")
+    parser.add_argument("--send", action="store_true", help="email the digest")
+    parser.add_argument("--recipient", default=os.environ.get("DIGEST_RECIPIENT") or os.environ.get("BOSS_EMAIL"))
+    parser.add_argument("--output", help="also write the HTML here")
+    parser.add_argument("--schedule", action="store_true", help="keep running and send hourly/daily digests")
+    parser.add_argument("--rebuild", action="store_true", help="backfill events from existing ticket files first")
+    args = parser.parse_args()
+    if (args.send or args.schedule) and not args.recipient:
+        parser.error("no recipient: pass --recipient or set DIGEST_RECIPIENT/BOSS_EMAIL")
+    if args.rebuild and glob.glob(os.path.join(digest_dir(), "events-*.jsonl")):
+        parser.error(f"{digest_dir()} already has events; --rebuild would count tickets twice")
+
+    store = DigestStore(digest_dir(), retention_hours=int(os.environ.get("DIGEST_RETENTION_HOURS", 24 * 14)))
+    if args.rebuild:
+        count = rebuild_from_results(os.environ.get("TICKET_RESULTS_DIR", "ticket_results"), DigestLog(digest_dir()))
+        logging.info(f"Backfilled events for {count} tickets")
+    generator = report_generator()
+    if args.schedule:
+        run_schedule(store, generator, args.recipient)
+    else:
+        run_once(store, generator, args.period, args.send, args.recipient, args.output)
+
+
+if __name__ == "__main__":
+    main()
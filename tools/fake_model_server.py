@@ -0,0 +1,128 @@
+"""Local stand-in for the model backend, for load and failure testing.
+
+Serves an OpenAI-compatible POST /v1/chat/completions endpoint (the same shape
+llama.cpp's server and most local runtimes expose). Responses are
+deterministic per prompt; latency, errors and 429s can be injected.
+
+Usage: python -m tools.fake_model_server [--port 8089] [--latency 0.2] [--jitter 0.1]
+                                             [--error-rate 0.0] [--rate-limit-rate 0.0]
+                                             [--max-rps 0]
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from support_ai.llm.providers import stub_reply
+
+
+class FakeModelConfig:
+    def __init__(self, latency=0.2, jitter=0.1, error_rate=0.0, rate_limit_rate=0.0, max_rps=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.max_rps = max_rps
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.counters = {"requests": 0, "errors": 0, "rate_limited": 0}
+
+    def draw(self):
+        """Decide the fate of one request: (status, delay)"""
+        with self.lock:
+            self.counters["requests"] += 1
+            now = time.monotonic()
+            if now - self.window_start >= 1.0:
+                self.window_start, self.window_count = now, 0
+            self.window_count += 1
+            over_quota = self.max_rps and self.window_count > self.max_rps
+            roll = self.random.random()
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+        if over_quota or roll < self.rate_limit_rate:
+            with self.lock:
+                self.counters["rate_limited"] += 1
+            return 429, 0.0
+        if roll < self.rate_limit_rate + self.error_rate:
+            with self.lock:
+                self.counters["errors"] += 1
+            return 500, delay
+        return 200, delay
+
+
+def make_handler(config: FakeModelConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: dict) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                with config.lock:
+                    self._send(200, dict(config.counters))
+            else:
+                self._send(200, {"status": "ok"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            status, delay = config.draw()
+            time.sleep(delay)
+            if status == 429:
+                return self._send(429, {"error": {"message": "Rate limit exceeded", "code": 429}})
+            if status != 200:
+                return self._send(status, {"error": {"message": "Injected backend error", "code": status}})
+            prompt = "\n".join(m.get("content", "") for m in payload.get("messages", []))
+            prompt = prompt or payload.get("prompt", "")
+            reply = stub_reply(prompt)
+            self._send(200, {
+                "id": "fake-" + hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12],
+                "object": "chat.completion",
+                "model": payload.get("model", "fake"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": len(reply.split()),
+                          "total_tokens": len(prompt.split()) + len(reply.split())},
+            })
+
+    return Handler
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8089, **config) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), make_handler(FakeModelConfig(**config)))
+    server.daemon_threads = True
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.2, help="mean response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="uniform +/- latency jitter in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--max-rps", type=float, default=0.0, help="answer 429 above this many requests/second")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                         error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                         max_rps=args.max_rps, seed=args.seed)
+    print(f"Fake model server on http://{args.host}:{args.port}/v1/chat/completions")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
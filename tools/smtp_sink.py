@@ -0,0 +1,114 @@
+"""Local SMTP sink for load tests: accepts AUTH and mail, delivers nowhere.
+
+Speaks just enough SMTP for smtplib (EHLO, AUTH PLAIN, MAIL, RCPT,
+DATA, RSET, NOOP, QUIT) and counts what it receives. Point the app at it with
+SMTP_SERVER=127.0.0.1 SMTP_PORT=<port> SMTP_STARTTLS=0.
+
+Usage: python -m tools.smtp_sink [--port 8025] [--latency 0.0]
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+
+class SinkStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {"connections": 0, "messages": 0, "recipients": 0, "bytes": 0}
+
+    def add(self, **amounts) -> None:
+        with self.lock:
+            for name, amount in amounts.items():
+                self.counters[name] += amount
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return dict(self.counters)
+
+
+def make_handler(stats: SinkStats, latency: float):
+    class Handler(socketserver.StreamRequestHandler):
+        def reply(self, line: str) -> None:
+            self.wfile.write((line + "\r\n").encode("ascii"))
+
+        def handle(self):
+            stats.add(connections=1)
+            self.reply("220 smtp-sink ESMTP ready")
+            recipients = 0
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                command = line.decode("utf-8", "replace").strip()
+                verb = command.split(" ", 1)[0].upper()
+                if verb == "EHLO":
+                    self.reply("250-smtp-sink")
+                    self.reply("250-AUTH PLAIN")
+                    self.reply("250 8BITMIME")
+                elif verb == "HELO":
+                    self.reply("250 smtp-sink")
+                elif verb == "AUTH":
+                    if len(command.split()) < 3:
+                        # No initial response: prompt for the credentials
+                        self.reply("334 ")
+                        self.rfile.readline()
+                    self.reply("235 2.7.0 Authentication successful")
+                elif verb == "MAIL":
+                    recipients = 0
+                    self.reply("250 OK")
+                elif verb == "RCPT":
+                    recipients += 1
+                    self.reply("250 OK")
+                elif verb == "DATA":
+                    self.reply("354 End data with <CR><LF>.<CR><LF>")
+                    size = 0
+                    while True:
+                        data = self.rfile.readline()
+                        if not data or data in (b".\r\n", b".\n"):
+                            break
+                        size += len(data)
+                    if latency:
+                        time.sleep(latency)
+                    stats.add(messages=1, recipients=recipients, bytes=size)
+                    self.reply("250 OK: queued")
+                elif verb in ("RSET", "NOOP"):
+                    self.reply("250 OK")
+                elif verb == "QUIT":
+                    self.reply("221 Bye")
+                    return
+                else:
+                    self.reply("502 Command not implemented")
+
+    return Handler
+
+
+class SinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, stats: SinkStats, latency: float = 0.0):
+        self.stats = stats
+        super().__init__(address, make_handler(stats, latency))
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8025, latency: float = 0.0) -> SinkServer:
+    return SinkServer((host, port), SinkStats(), latency)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to hold each message before accepting")
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, args.latency)
+    print(f"SMTP sink on {args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(server.stats.snapshot())
+
+
+if __name__ == "__main__":
+    main()
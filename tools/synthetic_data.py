@@ -0,0 +1,257 @@
+"""Synthetic historical tickets and conversations for load testing.
+
+Tickets follow the Historical_ticket_data.csv schema; conversations follow the
+Conversation/*.txt samples (header + alternating Customer/Agent turns).
+Output is deterministic for a given seed and streamed to disk in chunks, so
+millions of rows take seconds and constant memory.
+
+Usage:
+    python -m tools.synthetic_data tickets history.csv --rows 1000000 [--seed 0]
+    python -m tools.synthetic_data conversations chats.jsonl --count 100000 [--min-turns 3] [--max-turns 9]
+    python -m tools.synthetic_data conversations chats_dir/ --count 50 --format txt
+"""
+import argparse
+import csv
+import datetime
+import json
+import os
+import sys
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+TICKET_COLUMNS = ["Ticket ID", "Issue Category", "Sentiment", "Priority", "Solution",
+                  "Resolution Status", "Date of Resolution"]
+
+# Category -> typical sentiments, priorities (with weights) and known fixes,
+# modelled on the historical sample data
+PROFILES: Dict[str, Dict[str, List]] = {
+    "Software Installation Failure": {
+        "sentiments": ["Frustrated", "Annoyed", "Confused"], "priorities": [("High", 0.7), ("Medium", 0.3)],
+        "solutions": ["Disable antivirus and retry installation", "Download from direct link",
+                      "Update to latest version of antivirus", "Run the installer as administrator"],
+        "openings": ["I've been trying to install the latest update for hours. It keeps failing at {pct}% with an 'unknown error.'",
+                     "The installer crashes at {pct}% every time on {os}.",
+                     "Setup won't finish, it rolls back at {pct}% with error code {code}."],
+        "details": ["It's {os}. I've restarted twice, same issue.", "Here's the screenshot: [image link].",
+                    "I already cleared my temp folder and retried."],
+    },
+    "Network Connectivity Issue": {
+        "sentiments": ["Confused", "Frustrated"], "priorities": [("Medium", 0.8), ("High", 0.2)],
+        "solutions": ["Check app permissions for Local Network", "Clear app cache and relog", "Reinstall the app"],
+        "openings": ["My app keeps saying 'no internet connection,' but my Wi-Fi is working fine.",
+                     "The app can't reach the server on {os}, other apps load normally.",
+                     "I get a timeout error {code} whenever I open the dashboard."],
+        "details": ["Hmm, it was off! I just turned it on, but still no luck.", "I tried mobile data too, same result.",
+                    "Rebooting the router didn't help."],
+    },
+    "Device Compatibility Error": {
+        "sentiments": ["Annoyed", "Frustrated"], "priorities": [("Critical", 0.6), ("High", 0.4)],
+        "solutions": ["Rollback app to version 4.9", "Offer a discount on a compatible thermostat",
+                      "Contact thermostat support for an update"],
+        "openings": ["After the update the app no longer detects my thermostat.",
+                     "Your app says my device model is unsupported since version {version}.",
+                     "The new release crashes on my {os} tablet."],
+        "details": ["It worked perfectly before the update.", "The model number is {code}.",
+                    "I reinstalled it twice already."],
+    },
+    "Account Synchronization Bug": {
+        "sentiments": ["Anxious", "Frustrated"], "priorities": [("High", 0.7), ("Medium", 0.3)],
+        "solutions": ["Reset sync token manually", "Force Full Sync on both devices", "Clear app cache and relog"],
+        "openings": ["My project data isn't syncing between my laptop and tablet.",
+                     "Changes on one device don't show up on the other.",
+                     "Half of my files disappeared after the last sync."],
+        "details": ["Yes, same account. Here's a log from my tablet: [file attached].",
+                    "Both devices are on version {version}.", "I logged out and back in, nothing changed."],
+    },
+    "Payment Gateway Integration Failure": {
+        "sentiments": ["Urgent", "Frustrated"], "priorities": [("Critical", 0.9), ("High", 0.1)],
+        "solutions": ["Upgrade server to TLS 1.3", "Verify SSL certificate settings", "Use a different gateway API",
+                      "Check server firewall settings"],
+        "openings": ["This is urgent! Your API is rejecting our payment gateway integration. Error: 'Invalid SSL certificate.'",
+                     "All our checkout requests fail with error {code} since this morning!",
+                     "Payments are timing out at the gateway handshake, customers can't pay!"],
+        "details": ["Here's the terminal output: [text]. See? No errors here.", "Our cert is valid and up-to-date!",
+                    "We haven't changed anything on our side."],
+    },
+    "Application Performance": {
+        "sentiments": ["Annoyed", "Frustrated", "Confused"], "priorities": [("Medium", 0.6), ("High", 0.4)],
+        "solutions": ["Clear application cache and temporary files",
+                      "Update graphics card drivers to the latest version",
+                      "Disable background applications to free up system resources"],
+        "openings": ["The app has become extremely slow since version {version}.",
+                     "Opening a project takes over a minute on {os}.", "The editor freezes every few seconds."],
+        "details": ["I have 16GB of RAM, so it shouldn't be my machine.", "Other apps run fine.",
+                    "It started after the last update."],
+    },
+    "Data Recovery": {
+        "sentiments": ["Anxious", "Urgent"], "priorities": [("Critical", 0.8), ("High", 0.2)],
+        "solutions": ["Use built-in file history or system restore to recover lost data",
+                      "Recommend professional data recovery service for physical drive failure"],
+        "openings": ["I accidentally deleted an entire project folder, please help!",
+                     "My drive failed and I can't open any of my saved files."],
+        "details": ["It was about {pct} files.", "I haven't written anything new to the disk since."],
+    },
+    "Security Concern": {
+        "sentiments": ["Anxious", "Concerned"], "priorities": [("High", 0.6), ("Medium", 0.4)],
+        "solutions": ["Advise user to immediately change their password and enable two-factor authentication",
+                      "Scan system for malware and remove any suspicious applications"],
+        "openings": ["I got a login alert from a country I've never been to.",
+                     "Someone changed my account email without my permission."],
+        "details": ["The alert came in at 3am.", "I don't recognise device {code}."],
+    },
+    "Login Credentials": {
+        "sentiments": ["Neutral", "Confused"], "priorities": [("Low", 0.8), ("Medium", 0.2)],
+        "solutions": ["Send password reset link to registered email", "Guide user to clear browser cookies and retry login"],
+        "openings": ["I forgot my password and the reset email never arrives.",
+                     "The login page keeps reloading after I enter my credentials."],
+        "details": ["I checked my spam folder too.", "I'm using {os}."],
+    },
+    "Feature Request": {
+        "sentiments": ["Positive", "Neutral"], "priorities": [("Low", 1.0)],
+        "solutions": ["Log request for 'Dark Mode' in product roadmap", "Forward suggestion to the product team"],
+        "openings": ["Love the app! Could you add a dark mode?", "It would be great to export reports as PDF."],
+        "details": ["Many of my colleagues asked for it too.", "Happy to beta test it!"],
+    },
+}
+
+AGENT_PROBES = ["Hello! Thank you for reaching out. Could you share a screenshot of the error and your OS version?",
+                "Hi! Let's resolve this together. When did this start happening?",
+                "Thanks for the details. Could you share the logs from the affected device?",
+                "Let's investigate immediately. Which version of the app are you running?"]
+AGENT_FIXES = ["This is a known issue. {solution}. Does that help?",
+               "Thanks for your patience. Please try this: {solution}.",
+               "I see the cause now. {solution}, and let me know if it works!"]
+CUSTOMER_FOLLOWUPS = ["I tried that but it still fails.", "Okay, doing that now.", "Could you explain the steps again?"]
+CUSTOMER_CLOSINGS = ["That fixed it! Thank you!", "It's working now, thanks for the quick fix!",
+                     "Okay, I'll try that and get back to you.", "Great, will this happen again?"]
+AGENT_CLOSINGS = ["Glad to hear it! Don't hesitate to reach out for future issues.",
+                  "Happy to help! We'll flag this to our dev team.", "You're welcome! Have a great day."]
+FILLERS = {"os": ["Windows 11", "Windows 10", "macOS 14", "Android 14", "iOS 17", "Ubuntu 22.04"],
+           "version": ["4.9", "5.0", "5.1.2", "6.0-beta"]}
+
+CATEGORIES = list(PROFILES)
+
+
+def _fill(template: str, rng: np.random.Generator) -> str:
+    return template.format(
+        pct=int(rng.integers(5, 100)), code=f"0x{int(rng.integers(0, 16 ** 4)):04X}",
+        os=FILLERS["os"][int(rng.integers(len(FILLERS["os"])))],
+        version=FILLERS["version"][int(rng.integers(len(FILLERS["version"])))],
+        solution="{solution}",
+    )
+
+
+def iter_ticket_chunks(rows: int, seed: int = 0, chunk_size: int = 100_000,
+                       start_date: datetime.date = datetime.date(2025, 1, 1), days: int = 365) -> Iterator[List[list]]:
+    """Yield lists of CSV rows; vectorised per chunk so generation stays I/O-bound"""
+    rng = np.random.default_rng(seed)
+    dates = [(start_date + datetime.timedelta(days=d)).strftime("%d-%m-%Y") for d in range(days)]
+    for offset in range(0, rows, chunk_size):
+        n = min(chunk_size, rows - offset)
+        categories = rng.integers(len(CATEGORIES), size=n)
+        picks = rng.random((n, 3))
+        day = rng.integers(days, size=n)
+        resolved = rng.random(n) < 0.9
+        chunk = []
+        for i in range(n):
+            category = CATEGORIES[categories[i]]
+            profile = PROFILES[category]
+            sentiment = profile["sentiments"][int(picks[i, 0] * len(profile["sentiments"]))]
+            cumulative, priority = 0.0, profile["priorities"][-1][0]
+            for name, weight in profile["priorities"]:
+                cumulative += weight
+                if picks[i, 1] < cumulative:
+                    priority = name
+                    break
+            solution = profile["solutions"][int(picks[i, 2] * len(profile["solutions"]))]
+            chunk.append([f"TECH_{offset + i + 1:08d}", category, sentiment, priority, solution,
+                          "Resolved" if resolved[i] else "Pending", dates[day[i]]])
+        yield chunk
+
+
+def write_tickets_csv(path: str, rows: int, seed: int = 0, chunk_size: int = 100_000) -> None:
+    with open(path, "w", newline="", buffering=1 << 20) as f:
+        writer = csv.writer(f)
+        writer.writerow(TICKET_COLUMNS)
+        for chunk in iter_ticket_chunks(rows, seed, chunk_size):
+            writer.writerows(chunk)
+
+
+def iter_conversations(count: int, seed: int = 0, min_turns: int = 3, max_turns: int = 9) -> Iterator[Dict]:
+    """Yield multi-turn conversations; turns use the /chat API roles ("user"/"agent")"""
+    rng = np.random.default_rng(seed)
+    pick = lambda options: options[int(rng.integers(len(options)))]
+    for n in range(count):
+        category = pick(CATEGORIES)
+        profile = PROFILES[category]
+        solution = pick(profile["solutions"])
+        turns_wanted = int(rng.integers(min_turns, max_turns + 1))
+        turns = [{"role": "user", "content": "Hi there! " + _fill(pick(profile["openings"]), rng)},
+                 {"role": "agent", "content": pick(AGENT_PROBES)}]
+        while len(turns) < turns_wanted - 2:
+            turns.append({"role": "user", "content": _fill(pick(profile["details"] + CUSTOMER_FOLLOWUPS), rng)})
+            turns.append({"role": "agent", "content": _fill(pick(AGENT_FIXES), rng).format(solution=solution)})
+        turns.append({"role": "user", "content": pick(CUSTOMER_CLOSINGS)})
+        if len(turns) < turns_wanted:
+            turns.append({"role": "agent", "content": pick(AGENT_CLOSINGS)})
+        yield {
+            "conversation_id": f"TECH_{n + 1:08d}",
+            "category": category,
+            "sentiment": pick(profile["sentiments"]),
+            "priority": profile["priorities"][0][0],
+            "turns": turns[:turns_wanted],
+        }
+
+
+def format_conversation_txt(conversation: Dict) -> str:
+    """Render in the layout of the Conversation/*.txt samples"""
+    lines = [f"Conversation ID: {conversation['conversation_id']}", "Category: Technical Support",
+             f"Sentiment: {conversation['sentiment']} | Priority: {conversation['priority']}"]
+    for turn in conversation["turns"]:
+        speaker = "Customer" if turn["role"] == "user" else "Agent"
+        lines.append(f'{speaker}: "{turn["content"]}"')
+    return "\n".join(lines) + "\n"
+
+
+def write_conversations(path: str, count: int, seed: int = 0, min_turns: int = 3, max_turns: int = 9,
+                        fmt: str = "jsonl") -> None:
+    conversations = iter_conversations(count, seed, min_turns, max_turns)
+    if fmt == "txt":
+        os.makedirs(path, exist_ok=True)
+        for conversation in conversations:
+            with open(os.path.join(path, f"{conversation['conversation_id']}.txt"), "w") as f:
+                f.write(format_conversation_txt(conversation))
+        return
+    with open(path, "w", buffering=1 << 20) as f:
+        for conversation in conversations:
+            f.write(json.dumps(conversation) + "\n")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="kind", required=True)
+    tickets = sub.add_parser("tickets", help="historical tickets CSV")
+    tickets.add_argument("path")
+    tickets.add_argument("--rows", type=int, default=100_000)
+    tickets.add_argument("--seed", type=int, default=0)
+    chats = sub.add_parser("conversations", help="multi-turn conversations (JSONL or .txt files)")
+    chats.add_argument("path")
+    chats.add_argument("--count", type=int, default=1000)
+    chats.add_argument("--seed", type=int, default=0)
+    chats.add_argument("--min-turns", type=int, default=3)
+    chats.add_argument("--max-turns", type=int, default=9)
+    chats.add_argument("--format", choices=["jsonl", "txt"], default="jsonl")
+    args = parser.parse_args()
+
+    if args.kind == "tickets":
+        write_tickets_csv(args.path, args.rows, args.seed)
+        print(f"Wrote {args.rows} tickets to {args.path}")
+    else:
+        write_conversations(args.path, args.count, args.seed, args.min_turns, args.max_turns, args.format)
+        print(f"Wrote {args.count} conversations to {args.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
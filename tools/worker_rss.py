@@ -0,0 +1,80 @@
+"""Report per-worker memory for the pre-fork server (Linux only).
+
+RSS counts shared copy-on-write pages in every worker, so it overstates the real
+cost of adding a worker. PSS splits shared pages between the processes that map
+them, and USS (private pages) is what each extra worker actually adds.
+
+Usage: python tools/worker_rss.py <parent-pid> [--watch SECONDS]
+       python tools/worker_rss.py --pid-file prefork.pid
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List
+
+
+def children(pid: int) -> List[int]:
+    result = []
+    task_dir = f"/proc/{pid}/task"
+    for tid in os.listdir(task_dir):
+        try:
+            with open(os.path.join(task_dir, tid, "children")) as f:
+                result.extend(int(child) for child in f.read().split())
+        except FileNotFoundError:
+            continue
+    return sorted(result)
+
+
+def memory(pid: int) -> Dict[str, int]:
+    """Memory counters in KiB from /proc/<pid>/smaps_rollup"""
+    counters = {"Rss": 0, "Pss": 0, "Shared_Clean": 0, "Shared_Dirty": 0,
+                "Private_Clean": 0, "Private_Dirty": 0}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            key = parts[0].rstrip(":")
+            if key in counters:
+                counters[key] = int(parts[1])
+    counters["Shared"] = counters["Shared_Clean"] + counters["Shared_Dirty"]
+    counters["Uss"] = counters["Private_Clean"] + counters["Private_Dirty"]
+    return counters
+
+
+def report(parent: int) -> None:
+    print(f"{'pid':>8} {'role':>7} {'RSS MiB':>9} {'PSS MiB':>9} {'USS MiB':>9} {'shared MiB':>11}")
+    total_pss = 0
+    for role, pid in [("parent", parent)] + [("worker", child) for child in children(parent)]:
+        try:
+            mem = memory(pid)
+        except FileNotFoundError:
+            continue
+        total_pss += mem["Pss"]
+        print(f"{pid:>8} {role:>7} {mem['Rss'] / 1024:>9.1f} {mem['Pss'] / 1024:>9.1f} "
+              f"{mem['Uss'] / 1024:>9.1f} {mem['Shared'] / 1024:>11.1f}")
+    print(f"total PSS: {total_pss / 1024:.1f} MiB")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pid", nargs="?", type=int, help="pre-fork parent PID")
+    parser.add_argument("--pid-file", help="read the parent PID from this file")
+    parser.add_argument("--watch", type=float, help="repeat every N seconds")
+    args = parser.parse_args()
+
+    if args.pid_file:
+        with open(args.pid_file) as f:
+            args.pid = int(f.read().strip())
+    if not args.pid:
+        parser.error("a parent PID or --pid-file is required")
+
+    while True:
+        report(args.pid)
+        if not args.watch:
+            return 0
+        time.sleep(args.watch)
+        print()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
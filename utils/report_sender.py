@@ -1,19 +1,8 @@
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from datetime import datetime
-from typing import Dict, Any, Tuple
+from support_ai.reports import BaseReportGenerator
+from support_ai.templates import compile_template
 
-class ReportGenerator:
-    def __init__(self, smtp_settings: Dict[str, Any]):
-        """Initialize the ReportGenerator with SMTP settings"""
-        self.smtp_settings = smtp_settings.copy()
-        
-        # Ensure port is an integer
-        if isinstance(self.smtp_settings.get('port'), str):
-            self.smtp_settings['port'] = int(self.smtp_settings['port'])
-        
-        self.email_template = '''
+# Static document shell (stylesheet, logo, footer); parsed once, the report body goes in {content}
+REPORT_SHELL = compile_template('''
 <!DOCTYPE html>
 <html>
 <head>
@@ -136,137 +125,49 @@ h3 {{
 </div>
 </body>
 </html>
-'''
+''', safe=("content",))
 
-    def generate_ticket_report(self, ticket_data: Dict[str, Any]) -> str:
-        """Generate HTML report from ticket data"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Build the basic report content
-        content = [
-            '<div class="card">',
-            '<div class="card-header">',
-            f'<h2>Incident Report - {ticket_data.get("ticket_id", "N/A")}</h2>',
-            f'<div style="color:#e2e8f0;margin-top:5px;">{timestamp}</div>',
-            '</div>',
-            '<div class="card-body">',
-            f'<div class="metric"><strong>Priority Level:</strong> {ticket_data.get("priority", "N/A")}</div>',
-            f'<div class="metric"><strong>Confidence Score:</strong> {ticket_data.get("confidence", 0.0):.2f}</div>',
-            f'<div class="metric"><strong>Assigned Team:</strong> {ticket_data.get("team", "N/A")}</div>',
-            f'<div class="metric"><strong>Sentiment:</strong> {ticket_data.get("sentiment", "N/A").title()}</div>',
-            '</div>',
-            '</div>',
-            '<div class="card">',
-            '<div class="card-body">',
-            '<h3>Issue Summary</h3>',
-            f'<div class="summary">{ticket_data.get("summary", "Not available.")}</div>',
-            '<h3>Extracted Issue</h3>',
-            f'<div class="issue">{ticket_data.get("issue", "Not available.")}</div>',
-            '</div>',
-            '</div>',
-            '<div class="card">',
-            '<div class="card-body">',
-            '<h3>Recommended Actions</h3>',
-            f'<div class="summary">{ticket_data.get("suggested_solution", "No recommendations available.")}</div>',
-            '</div>',
-            '</div>'
-        ]
-        
-        # Add admin comments if present
-        if ticket_data.get('admin_comments'):
-            content.extend([
-                '<div class="card">',
-                '<div class="card-body">',
-                '<h3>Additional Comments</h3>',
-                f'<div class="summary">{ticket_data["admin_comments"]}</div>',
-                '</div>',
-                '</div>'
-            ])
-        
-        return self.email_template.format(content="\n".join(content))
+TICKET_FRAGMENT = compile_template("\n".join([
+    '<div class="card">',
+    '<div class="card-header">',
+    '<h2>Incident Report - {ticket_id}</h2>',
+    '<div style="color:#e2e8f0;margin-top:5px;">{timestamp}</div>',
+    '</div>',
+    '<div class="card-body">',
+    '<div class="metric"><strong>Priority Level:</strong> {priority}</div>',
+    '<div class="metric"><strong>Confidence Score:</strong> {confidence:.2f}</div>',
+    '<div class="metric"><strong>Assigned Team:</strong> {team}</div>',
+    '<div class="metric"><strong>Sentiment:</strong> {sentiment}</div>',
+    '</div>',
+    '</div>',
+    '<div class="card">',
+    '<div class="card-body">',
+    '<h3>Issue Summary</h3>',
+    '<div class="summary">{summary}</div>',
+    '<h3>Extracted Issue</h3>',
+    '<div class="issue">{issue}</div>',
+    '</div>',
+    '</div>',
+    '<div class="card">',
+    '<div class="card-body">',
+    '<h3>Recommended Actions</h3>',
+    '<div class="summary">{suggested_solution}</div>',
+    '</div>',
+    '</div>',
+]) + "{comments}", safe=("comments",))
 
-    def send_report(self, recipient: str, subject: str, ticket_data: Dict[str, Any]) -> Tuple[bool, str]:
-        """Send the report via email"""
-        server = None
-        try:
-            # Validate SMTP settings
-            required_settings = ['server', 'port', 'username', 'password']
-            if not all(key in self.smtp_settings for key in required_settings):
-                missing = [key for key in required_settings if key not in self.smtp_settings]
-                error_msg = f"Missing SMTP settings: {', '.join(missing)}"
-                print(f"Debug - {error_msg}")
-                return False, error_msg
+# Added only when the ticket has admin comments
+COMMENTS_FRAGMENT = compile_template("\n" + "\n".join([
+    '<div class="card">',
+    '<div class="card-body">',
+    '<h3>Additional Comments</h3>',
+    '<div class="summary">{admin_comments}</div>',
+    '</div>',
+    '</div>',
+]))
 
-            # Prepare email message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = self.smtp_settings['username']
-            msg['To'] = recipient
-            
-            # Generate and attach HTML report
-            html_content = self.generate_ticket_report(ticket_data)
-            msg.attach(MIMEText(html_content, 'html'))
 
-            # Connect to SMTP server
-            print(f"Debug - Connecting to SMTP server {self.smtp_settings['server']}:{self.smtp_settings['port']}...")
-            server = smtplib.SMTP(self.smtp_settings['server'], self.smtp_settings['port'])
-            server.set_debuglevel(1)  # Enable SMTP debug output
-            
-            # Initial EHLO
-            server.ehlo()
-            print("Debug - Initial EHLO completed")
-            
-            # Start TLS encryption
-            print("Debug - Starting TLS...")
-            server.starttls()
-            
-            # Re-run EHLO after TLS
-            server.ehlo()
-            print("Debug - TLS encryption established")
-            
-            # Login with credentials
-            print(f"Debug - Attempting login for {self.smtp_settings['username']}...")
-            server.login(
-                self.smtp_settings['username'],
-                self.smtp_settings['password'].strip()
-            )
-            print("Debug - Login successful")
-            
-            # Send email
-            print("Debug - Sending message...")
-            server.send_message(msg)
-            print("Debug - Message sent successfully")
-            
-            # Clean up
-            if server:
-                server.quit()
-            return True, "Email sent successfully"
-            
-        except smtplib.SMTPAuthenticationError as e:
-            error_msg = "Authentication failed. Please verify your Gmail App Password. "
-            error_msg += "Make sure you have:\n"
-            error_msg += "1. Enabled 2-Step Verification in your Google Account\n"
-            error_msg += "2. Generated an App Password specifically for this application\n"
-            error_msg += "3. Copied the 16-character password correctly without spaces"
-            print(f"Debug - Authentication Error: {str(e)}")
-            return False, error_msg
-            
-        except smtplib.SMTPException as e:
-            error_msg = f"SMTP error occurred: {str(e)}"
-            print(f"Debug - SMTP Error: {str(e)}")
-            return False, error_msg
-            
-        except Exception as e:
-            error_msg = f"Unexpected error: {str(e)}"
-            print(f"Debug - Unexpected Error: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return False, error_msg
-            
-        finally:
-            # Always try to clean up the connection
-            if server:
-                try:
-                    server.quit()
-                except Exception:
-                    pass
\ No newline at end of file
+class ReportGenerator(BaseReportGenerator):
+    shell = REPORT_SHELL
+    fragment = TICKET_FRAGMENT
+    comments = COMMENTS_FRAGMENT